@@ -0,0 +1,334 @@
+"""
+Benchmark suite for the clustering trainers.
+
+Generates synthetic datasets (isotropic blobs, two moons, anisotropic
+blobs) over a grid of sizes and dimensions, runs every models/*.py train()
+and the AutoML search (find_best_model.run) on each one and records wall
+time, peak memory and the metrics each run picked. Every (dataset, model)
+pair runs in its own fresh process, so peak memory is that run's own and a
+run that exceeds --timeout is stopped and reported instead of hanging the
+suite. Everything is generated locally; no network or GPU is needed.
+
+Results are written as JSON and compared with a stored baseline
+(clustering_baseline.json): a run that got slower or bigger than the
+tolerances allow, scores clearly worse, finds a different number of
+clusters or makes AutoML pick a different winner counts as a regression,
+and the script exits with 1.
+
+    python benchmarks/clustering_benchmark.py                      # quick grid vs. baseline
+    python benchmarks/clustering_benchmark.py --grid full --timeout 1800
+    python benchmarks/clustering_benchmark.py --models kmeans,birch --sizes 1000,100000 --dims 2,200
+    python benchmarks/clustering_benchmark.py --save-baseline       # record a new baseline
+
+Timings are machine specific: record the baseline on the machine that runs
+the comparison.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import traceback
+import multiprocessing
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(BACKEND_DIR, "model_selectionAndTraining")
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "clustering_baseline.json")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+AUTOML = "automl"
+KINDS = ["blobs", "moons", "aniso"]
+GRIDS = {
+    "quick": {"sizes": [1000], "dims": [2, 20]},
+    "medium": {"sizes": [1000, 10000], "dims": [2, 20, 200]},
+    "full": {"sizes": [1000, 10000, 100000, 1000000], "dims": [2, 20, 200]},
+}
+DEFAULT_TIMEOUT = 600
+DEFAULT_MAX_CELLS = 50_000_000   # rows x features; bigger datasets are skipped (400 MB as float64)
+N_CENTERS = 5
+
+# Regression tolerances (see compare)
+TIME_TOLERANCE = 0.25        # 25% slower ...
+TIME_NOISE_SECONDS = 0.5     # ... and at least this much slower
+MEMORY_TOLERANCE = 0.20
+MEMORY_NOISE_MB = 50
+SILHOUETTE_TOLERANCE = 0.02
+
+# Benchmarks measure the trainers, not the caches / progress output around them
+os.environ.setdefault("PAPAD_TRAIN_CACHE", "0")
+os.environ.setdefault("PAPAD_EVENTS", "0")
+os.environ.setdefault("PAPAD_TRACE", "0")
+
+
+def model_scripts():
+    """Script names of the trainers in model_names.json (AutoML excluded)."""
+    with open(os.path.join(MODELS_DIR, "model_names.json"), "r", encoding="utf-8") as f:
+        return [m["name"] for m in json.load(f) if m.get("type") == "model" and m["name"] != "best_cluster_algo"]
+
+
+def make_dataset(kind, n_rows, n_features, random_state=0):
+    """A float64 (n_rows, n_features) array of the given kind."""
+    import numpy as np
+    from sklearn.datasets import make_blobs, make_moons
+
+    rng = np.random.RandomState(random_state)
+    if kind == "blobs":
+        X, _ = make_blobs(n_samples=n_rows, n_features=n_features, centers=N_CENTERS, random_state=random_state)
+    elif kind == "aniso":
+        # Blobs stretched / sheared by a random linear map
+        X, _ = make_blobs(n_samples=n_rows, n_features=n_features, centers=N_CENTERS, random_state=random_state)
+        X = X @ rng.normal(size=(n_features, n_features))
+    elif kind == "moons":
+        # Two moons in a random 2-d plane of the feature space, plus a little noise
+        moons, _ = make_moons(n_samples=n_rows, noise=0.05, random_state=random_state)
+        if n_features == 2:
+            X = moons
+        else:
+            plane, _ = np.linalg.qr(rng.normal(size=(n_features, 2)))
+            X = moons @ plane.T + rng.normal(scale=0.05, size=(n_rows, n_features))
+    else:
+        raise ValueError(f"Unknown dataset kind: {kind}")
+    return np.ascontiguousarray(X, dtype=np.float64)
+
+
+def _run_case(conn, case, verbose):
+    """Child process: builds the dataset, runs one trainer and sends back the measurements."""
+    work_dir = tempfile.mkdtemp(prefix="papad_bench_")
+    try:
+        if not verbose:
+            devnull = open(os.devnull, "w")
+            sys.stdout = sys.stderr = devnull
+        for path in (MODELS_DIR, BACKEND_DIR):
+            if path not in sys.path:
+                sys.path.insert(0, path)
+        import importlib
+        import pandas as pd
+        import find_best_model
+        from models.feature_store import build_feature_matrix
+        from telemetry import peak_rss_mb
+
+        X = make_dataset(case["dataset"], case["rows"], case["features"])
+        features = build_feature_matrix(pd.DataFrame(X, columns=[f"f{i}" for i in range(X.shape[1])]), run_dir=work_dir)
+        del X
+        rss_before = round(peak_rss_mb(children=True), 1)  # AutoML candidate processes too
+
+        start = time.perf_counter()
+        if case["model"] == AUTOML:
+            winner = find_best_model.run(None, None, None, None, None, None, "target", work_dir, features=features)
+            metrics, chosen = winner["metrics"], winner["internal_name"]
+        else:
+            module = importlib.import_module(f"models.{case['model']}")
+            save_path = os.path.join(work_dir, f"{case['model']}_model")
+            metrics = module.train(None, None, None, None, None, None, "target", save_path, features=features)
+            chosen = None
+        wall = time.perf_counter() - start
+
+        normalized = find_best_model.normalize_metrics(metrics or {})
+        if isinstance(metrics, dict) and "n_clusters" in metrics:
+            normalized["n_clusters"] = metrics["n_clusters"]
+        features.close()
+        conn.send({
+            "status": "ok",
+            "wall_s": round(wall, 3),
+            "peak_rss_mb": round(peak_rss_mb(children=True), 1),
+            "data_rss_mb": rss_before,
+            "metrics": {k: _plain(v) for k, v in normalized.items()},
+            "chosen": chosen,
+        })
+    except BaseException as e:
+        conn.send({"status": "error", "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()})
+    finally:
+        conn.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _plain(value):
+    if isinstance(value, int) or type(value).__name__.startswith("int"):
+        return int(value)
+    try:
+        return round(float(value), 4)
+    except (TypeError, ValueError):
+        return value
+
+
+def run_case(case, timeout, verbose=False):
+    ctx = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_run_case, args=(child, case, verbose))
+    proc.start()
+    child.close()
+
+    result = None
+    if parent.poll(timeout or None):
+        try:
+            result = parent.recv()
+        except EOFError:
+            pass
+    if result is None:
+        status = "timeout" if proc.is_alive() else f"crashed (exit code {proc.exitcode})"
+        result = {"status": status}
+    if proc.is_alive():
+        proc.kill()
+    proc.join()
+    return {**case, **result}
+
+
+def build_cases(kinds, sizes, dims, models, max_cells):
+    cases = []
+    for kind in kinds:
+        for n_rows in sizes:
+            for n_features in dims:
+                for model in models:
+                    case = {"dataset": kind, "rows": n_rows, "features": n_features, "model": model}
+                    if n_rows * n_features > max_cells:
+                        case["status"] = "skipped"
+                    cases.append(case)
+    return cases
+
+
+def case_key(case):
+    return f"{case['dataset']}/{case['rows']}x{case['features']}/{case['model']}"
+
+
+def compare(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """Returns (regressions, notes): lists of "key: reason" strings."""
+    base = {case_key(r): r for r in baseline.get("results", [])}
+    regressions, notes = [], []
+    for r in results:
+        key = case_key(r)
+        b = base.get(key)
+        if b is None:
+            notes.append(f"{key}: not in the baseline")
+            continue
+        if b.get("status") != "ok":
+            if r.get("status") == "ok":
+                notes.append(f"{key}: now runs (baseline: {b.get('status')})")
+            continue
+        if r.get("status") != "ok":
+            regressions.append(f"{key}: {r.get('status')} (baseline ran in {b['wall_s']}s)")
+            continue
+
+        slower = r["wall_s"] - b["wall_s"]
+        if slower > TIME_NOISE_SECONDS and r["wall_s"] > b["wall_s"] * (1 + time_tolerance):
+            regressions.append(f"{key}: {r['wall_s']}s vs {b['wall_s']}s")
+        elif -slower > TIME_NOISE_SECONDS and r["wall_s"] < b["wall_s"] / (1 + time_tolerance):
+            notes.append(f"{key}: faster, {r['wall_s']}s vs {b['wall_s']}s")
+
+        grown = r["peak_rss_mb"] - b["peak_rss_mb"]
+        if grown > MEMORY_NOISE_MB and r["peak_rss_mb"] > b["peak_rss_mb"] * (1 + memory_tolerance):
+            regressions.append(f"{key}: peak {r['peak_rss_mb']} MB vs {b['peak_rss_mb']} MB")
+
+        rm, bm = r.get("metrics", {}), b.get("metrics", {})
+        sil, base_sil = rm.get("silhouette"), bm.get("silhouette")
+        if isinstance(sil, float) and isinstance(base_sil, float) and sil < base_sil - SILHOUETTE_TOLERANCE:
+            regressions.append(f"{key}: silhouette {sil} vs {base_sil}")
+        if rm.get("n_clusters") != bm.get("n_clusters"):
+            regressions.append(f"{key}: {rm.get('n_clusters')} clusters vs {bm.get('n_clusters')}")
+        if r.get("chosen") != b.get("chosen"):
+            regressions.append(f"{key}: AutoML picked {r.get('chosen')} vs {b.get('chosen')}")
+    return regressions, notes
+
+
+def machine_info():
+    import numpy as np
+    import sklearn
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def parse_list(text, cast=str):
+    return [cast(item) for item in text.split(",") if item.strip()] if text else None
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--grid", choices=sorted(GRIDS), default="quick", help="preset sizes / dims")
+    parser.add_argument("--sizes", help="comma separated row counts (overrides --grid)")
+    parser.add_argument("--dims", help="comma separated feature counts (overrides --grid)")
+    parser.add_argument("--kinds", help=f"comma separated dataset kinds ({', '.join(KINDS)})")
+    parser.add_argument("--models", help=f"comma separated model scripts and/or '{AUTOML}' (default: all)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per run (0 = none)")
+    parser.add_argument("--max-cells", type=int, default=DEFAULT_MAX_CELLS, help="skip datasets with more rows x features")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/clustering_<time>.json)")
+    parser.add_argument("--verbose", action="store_true", help="show the trainers' own output")
+    options = parser.parse_args(argv[1:])
+
+    grid = GRIDS[options.grid]
+    sizes = parse_list(options.sizes, int) or grid["sizes"]
+    dims = parse_list(options.dims, int) or grid["dims"]
+    kinds = parse_list(options.kinds) or KINDS
+    models = parse_list(options.models) or model_scripts() + [AUTOML]
+
+    unknown = [k for k in kinds if k not in KINDS] + [m for m in models if m != AUTOML and m not in model_scripts()]
+    if unknown:
+        print(f"[ERROR] Unknown dataset kinds / models: {unknown}")
+        return 2
+
+    cases = build_cases(kinds, sizes, dims, models, options.max_cells)
+    print(f"{len(cases)} runs ({len(kinds)} kinds x {len(sizes)} sizes x {len(dims)} dims x {len(models)} models)\n")
+    print(f"{'run':<44} {'status':<10} {'wall':>9} {'peak MB':>9} {'silhouette':>11} {'clusters':>9}")
+
+    results = []
+    for case in cases:
+        result = case if case.get("status") == "skipped" else run_case(case, options.timeout, options.verbose)
+        results.append(result)
+        metrics = result.get("metrics", {})
+        wall = f"{result['wall_s']:.2f}s" if "wall_s" in result else "-"
+        peak = f"{result['peak_rss_mb']:.0f}" if "peak_rss_mb" in result else "-"
+        sil = metrics.get("silhouette", "-")
+        clusters = result.get("chosen") or metrics.get("n_clusters", "-")
+        print(f"{case_key(case):<44} {result['status'][:10]:<10} {wall:>9} {peak:>9} {str(sil):>11} {str(clusters):>9}", flush=True)
+        if result["status"] == "error" and options.verbose:
+            print(result.get("traceback", ""))
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "grid": {"kinds": kinds, "sizes": sizes, "dims": dims, "models": models, "timeout": options.timeout},
+        "results": results,
+    }
+
+    output = options.baseline if options.save_baseline else options.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"clustering_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nResults saved to {output}")
+    if options.save_baseline:
+        return 0
+
+    if not os.path.exists(options.baseline):
+        print(f"[WARNING] No baseline at {options.baseline}; run with --save-baseline to record one.")
+        return 0
+    with open(options.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions, notes = compare(results, baseline, options.time_tolerance, options.memory_tolerance)
+
+    for note in notes:
+        print(f"   {note}")
+    if regressions:
+        print(f"\n[ERROR] {len(regressions)} regression(s) against {options.baseline}:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    print(f"\nNo regressions against {options.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
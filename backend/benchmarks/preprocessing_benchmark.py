@@ -0,0 +1,304 @@
+"""
+Microbenchmarks for the normal preprocessing components.
+
+Generates a tall (10M x 10) and a wide (100k x 2000) frame with mixed
+dtypes -- skewed / normal floats with missing values, small-range ints,
+low-cardinality string categories and an int target as the last column,
+like an uploaded dataset -- and runs every component's apply() on each,
+then the whole handler chain (the components in
+normal_preprocessing_modules.json order, one after the other). Components
+that don't accept missing values (polynomial_features, pca, binning) get their
+frame with the gaps filled first, outside the timed part; in the chain
+they run after handle_missing_values as they would in the app. A chain
+that loses every row on the way (outlier_removal_iqr on the wide frame) is
+reported as "empty" with the step that emptied it.
+
+Each frame is generated once; every component runs in a child forked from
+that process (so it starts from the same frame and can't affect the next
+one) under an address-space limit, so a component that blows the frame up
+(polynomial_features / encoding on wide data) is reported as "out of
+memory" instead of taking the machine down. Reported per run: wall time,
+throughput (input rows/s and MB/s), peak RSS, how much memory the
+component added on top of its input, and the output shape.
+
+    python benchmarks/preprocessing_benchmark.py
+    python benchmarks/preprocessing_benchmark.py --scale 0.1 --frames tall
+    python benchmarks/preprocessing_benchmark.py --components binning,log_transform --json results.json
+
+POSIX only (fork + resource limits).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import traceback
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES_JSON = os.path.join(BACKEND_DIR, "preprocessing", "Normal_preprocessing", "normal_preprocessing_modules.json")
+COMPONENTS_DIR = os.path.join(BACKEND_DIR, "preprocessing", "Normal_preprocessing", "components")
+
+FRAMES = {
+    "tall": (10_000_000, 10),
+    "wide": (100_000, 2000),
+}
+CHAIN = "chain"
+DEFAULT_TIMEOUT = 900
+DEFAULT_MEMORY_LIMIT_MB = 4096
+
+# Column mix (fractions of the feature columns; the rest are normal floats)
+SKEWED_SHARE = 0.3
+INT_SHARE = 0.2
+CATEGORY_SHARE = 0.1
+MISSING_SHARE = 0.01   # missing values in the float columns
+
+# Components that raise on NaN when run on their own
+NEEDS_COMPLETE = {"polynomial_features", "pca", "binning"}
+
+
+def load_components():
+    """[(module id, component file name)] in registry order."""
+    with open(MODULES_JSON, "r", encoding="utf-8") as f:
+        modules = json.load(f)
+    return [(m["id"], m["name"].lower().replace(" ", "_").replace("-", "_")) for m in modules]
+
+
+def component_files():
+    """Every component module, including ones not in the registry (binning)."""
+    return sorted(f[:-3] for f in os.listdir(COMPONENTS_DIR) if f.endswith(".py") and not f.startswith("_"))
+
+
+def make_frame(n_rows, n_columns, random_state=0):
+    """A mixed-dtype DataFrame with n_columns - 1 features and an int 'target'."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(random_state)
+    n_features = max(1, n_columns - 1)
+    n_skewed = int(n_features * SKEWED_SHARE)
+    n_int = int(n_features * INT_SHARE)
+    n_cat = max(1, int(n_features * CATEGORY_SHARE))
+    n_normal = max(0, n_features - n_skewed - n_int - n_cat)
+
+    columns = {}
+    for i in range(n_normal):
+        values = rng.standard_normal(n_rows)
+        values[rng.random(n_rows) < MISSING_SHARE] = np.nan
+        columns[f"num_{i}"] = values
+    for i in range(n_skewed):
+        values = rng.lognormal(sigma=1.5, size=n_rows)
+        values[rng.random(n_rows) < MISSING_SHARE] = np.nan
+        columns[f"skew_{i}"] = values
+    for i in range(n_int):
+        columns[f"int_{i}"] = rng.integers(0, 3 + i % 50, n_rows)
+    for i in range(n_cat):
+        labels = np.array([f"cat{i}_{j}" for j in range(3 + i % 10)], dtype=object)
+        columns[f"cat_{i}"] = labels[rng.integers(0, len(labels), n_rows)]
+    columns["target"] = rng.integers(0, 5, n_rows)
+    return pd.DataFrame(columns)
+
+
+def _rss_mb():
+    """Current resident memory of this process."""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _limit_memory(extra_mb):
+    """Caps this process's address space at its current size plus extra_mb."""
+    import resource
+    with open("/proc/self/statm") as f:
+        vm_bytes = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    limit = vm_bytes + extra_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _fill_missing(df):
+    """Median / mode filled copy of df (a stand-in for handle_missing_values)."""
+    filled = df.copy()
+    for col in filled.columns[filled.isna().any()]:
+        if filled[col].dtype.kind in "fiu":
+            filled[col] = filled[col].fillna(filled[col].median())
+        else:
+            filled[col] = filled[col].fillna(filled[col].mode().iloc[0])
+    return filled
+
+
+class EmptyFrame(Exception):
+    pass
+
+
+def _apply_steps(df, steps):
+    """Runs the components in order; returns (df, [per-step seconds])."""
+    times = []
+    for module_id, name in steps:
+        if df.shape[0] == 0:
+            raise EmptyFrame(times[-1]["component"])
+        mod = importlib.import_module(f"preprocessing.Normal_preprocessing.components.{name}")
+        start = time.perf_counter()
+        df = mod.apply(df)
+        times.append({"step": module_id, "component": name, "wall_s": round(time.perf_counter() - start, 3)})
+    return df, times
+
+
+def _child(write_fd, df, steps, memory_limit_mb, verbose):
+    from telemetry import peak_rss_mb
+
+    result = {}
+    try:
+        if not verbose:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, 1)
+            os.dup2(devnull, 2)
+        if len(steps) == 1 and steps[0][1] in NEEDS_COMPLETE:
+            df = _fill_missing(df)
+        if memory_limit_mb:
+            _limit_memory(memory_limit_mb)
+        rss_start = _rss_mb()
+        start = time.perf_counter()
+        out, step_times = _apply_steps(df, steps)
+        wall = time.perf_counter() - start
+        result = {
+            "status": "ok",
+            "wall_s": round(wall, 3),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "added_mb": round(peak_rss_mb() - rss_start, 1),
+            "rows_out": int(out.shape[0]),
+            "columns_out": int(out.shape[1]),
+        }
+        if len(steps) > 1:
+            result["steps"] = step_times
+    except MemoryError:
+        result = {"status": "out of memory", "peak_rss_mb": round(peak_rss_mb(), 1)}
+    except EmptyFrame as e:
+        result = {"status": "empty", "error": f"no rows left after {e}"}
+    except BaseException as e:
+        message = str(e).strip().splitlines()[0] if str(e).strip() else ""
+        result = {"status": "error", "error": f"{type(e).__name__}: {message}", "traceback": traceback.format_exc()}
+    finally:
+        os.write(write_fd, json.dumps(result).encode("utf-8"))
+        os._exit(0)
+
+
+def run_forked(df, steps, timeout, memory_limit_mb, verbose=False):
+    """Runs the steps on df in a forked child; returns its measurements."""
+    import signal
+    read_fd, write_fd = os.pipe()
+    sys.stdout.flush()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        _child(write_fd, df, steps, memory_limit_mb, verbose)
+    os.close(write_fd)
+
+    def on_timeout(signum, frame):
+        os.kill(pid, signal.SIGKILL)
+
+    previous = signal.signal(signal.SIGALRM, on_timeout)
+    signal.alarm(int(timeout) if timeout else 0)
+    chunks = []
+    try:
+        while True:
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
+        os.close(read_fd)
+
+    if chunks:
+        return json.loads(b"".join(chunks).decode("utf-8"))
+    if os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGKILL:
+        return {"status": "timeout or killed"}
+    return {"status": f"crashed (exit status {status})"}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--frames", default=",".join(FRAMES), help=f"comma separated ({', '.join(FRAMES)})")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the row count of every frame")
+    parser.add_argument("--components", help=f"comma separated component names and/or '{CHAIN}' (default: all)")
+    parser.add_argument("--chain", help="comma separated module ids for the chain run (default: all, registry order)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per run (0 = none)")
+    parser.add_argument("--memory-limit-mb", type=int, default=DEFAULT_MEMORY_LIMIT_MB,
+                        help="memory a run may add on top of the frame (0 = no limit)")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the components' own output")
+    options = parser.parse_args(argv[1:])
+
+    if not hasattr(os, "fork"):
+        print("[ERROR] This benchmark needs fork (Linux / macOS).")
+        return 2
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    components = load_components()
+    by_name = {name: (module_id, name) for module_id, name in components}
+    for name in component_files():
+        by_name.setdefault(name, ("-", name))
+    wanted = options.components.split(",") if options.components else list(by_name) + [CHAIN]
+    chain_ids = options.chain.split(",") if options.chain else [module_id for module_id, _ in components]
+    chain = [c for c in components if c[0] in chain_ids]
+    unknown = [w for w in wanted if w != CHAIN and w not in by_name] + [f for f in options.frames.split(",") if f not in FRAMES]
+    if unknown:
+        print(f"[ERROR] Unknown components / frames: {unknown}")
+        return 2
+
+    # Import the components up front, so the timings don't include it
+    for name in by_name:
+        importlib.import_module(f"preprocessing.Normal_preprocessing.components.{name}")
+
+    results = []
+    for frame_name in options.frames.split(","):
+        n_rows, n_columns = FRAMES[frame_name]
+        n_rows = max(10, int(n_rows * options.scale))
+        start = time.perf_counter()
+        df = make_frame(n_rows, n_columns)
+        input_mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
+        print(
+            f"\n{frame_name}: {n_rows:,} x {n_columns} ({input_mb:,.0f} MB, "
+            f"generated in {time.perf_counter() - start:.1f}s)"
+        )
+        print(f"{'component':<24} {'status':<14} {'wall':>9} {'rows/s':>12} {'MB/s':>9} {'peak MB':>9} {'added MB':>9} {'output':>15}")
+
+        for name in wanted:
+            steps = chain if name == CHAIN else [by_name[name]]
+            result = run_forked(df, steps, options.timeout, options.memory_limit_mb, options.verbose)
+            result.update({"frame": frame_name, "rows": n_rows, "columns": n_columns, "component": name,
+                           "input_mb": round(input_mb, 1)})
+            results.append(result)
+
+            if result["status"] == "ok":
+                wall = max(result["wall_s"], 1e-9)
+                result["rows_per_s"] = round(n_rows / wall)
+                result["mb_per_s"] = round(input_mb / wall, 1)
+                print(
+                    f"{name:<24} {'ok':<14} {result['wall_s']:>8.2f}s {result['rows_per_s']:>12,} "
+                    f"{result['mb_per_s']:>9,.1f} {result['peak_rss_mb']:>9,.0f} {result['added_mb']:>9,.0f} "
+                    f"{result['rows_out']:>8,}x{result['columns_out']:<6}",
+                    flush=True,
+                )
+                for step in result.get("steps", []):
+                    print(f"   {step['step']:<5} {step['component']:<20} {step['wall_s']:>8.2f}s")
+            else:
+                peak = f"{result['peak_rss_mb']:,.0f}" if "peak_rss_mb" in result else "-"
+                print(f"{name:<24} {result['status'][:14]:<14} {'-':>9} {'-':>12} {'-':>9} {peak:>9}", flush=True)
+                if "error" in result:
+                    print(f"   {result['error']}")
+        del df
+
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump({"created": datetime.now().isoformat(timespec="seconds"), "results": results}, f, indent=1)
+        print(f"\nResults saved to {options.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,98 @@
+"""
+Startup benchmark for the backend entry points.
+
+Every UI action starts one of these scripts (or sends it to the warm
+worker), so their import time is paid on every click. This imports each
+entry point in a fresh interpreter -- without running its main() -- and
+compares the median import time (interpreter startup subtracted) with the
+budget in startup_budget.json. Exits with 1 when an entry point is over
+budget and lists its slowest imports (from `python -X importtime`).
+
+    python benchmarks/startup_benchmark.py [--repeat 5] [--budget-file ...] [--budget SECONDS]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+# Imports a script as a module (so its __main__ block doesn't run)
+PROBE = (
+    "import importlib.util, os, sys\n"
+    "path = sys.argv[1]\n"
+    "sys.path.insert(0, os.path.dirname(path))\n"
+    "spec = importlib.util.spec_from_file_location('startup_probe', path)\n"
+    "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+)
+
+
+def load_budgets(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def time_run(cmd, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def slowest_imports(script, top=8):
+    """(cumulative seconds, module) of the slowest top-level imports."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, script],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time:      self [us] |  cumulative | imported package"
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3:
+            continue
+        name = parts[2]
+        if name.startswith("  ") or not parts[1].strip().isdigit():
+            continue  # only the outermost imports
+        rows.append((int(parts[1]) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per entry point (median is used)")
+    parser.add_argument("--budget-file", default=DEFAULT_BUDGET_FILE)
+    parser.add_argument("--budget", type=float, help="one budget in seconds for every entry point")
+    options = parser.parse_args(argv[1:])
+
+    budgets = load_budgets(options.budget_file)
+    baseline = time_run([sys.executable, "-c", "pass"], options.repeat)
+    print(f"Interpreter startup: {baseline * 1000:.0f} ms (subtracted below)\n")
+    print(f"{'entry point':<70} {'import':>9} {'budget':>9}")
+
+    failed = []
+    for script, budget in budgets.items():
+        if options.budget is not None:
+            budget = options.budget
+        elapsed = max(0.0, time_run([sys.executable, "-c", PROBE, script], options.repeat) - baseline)
+        status = "ok" if elapsed <= budget else "OVER"
+        print(f"{script:<70} {elapsed * 1000:>7.0f}ms {budget * 1000:>7.0f}ms  {status}")
+        if elapsed > budget:
+            failed.append(script)
+
+    for script in failed:
+        print(f"\n[ERROR] {script} is over its startup budget. Slowest imports:")
+        for seconds, name in slowest_imports(script):
+            print(f"   {seconds * 1000:>8.0f} ms  {name}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,264 @@
+# backend/dataset_loader.py
+import os
+import csv
+import json
+import hashlib
+from disk_cache import DiskCache
+from telemetry import span
+
+# Loads CSV datasets through a columnar cache, so a file is parsed once:
+# re-running preprocessing on the same upload, or training and outputs on
+# the same processed CSV, read the cached columns instead.
+#
+#   df = load_dataset(path)                 # uploads: detect encoding / delimiter
+#   df = load_dataset(path, detect=False)   # the pipeline's own UTF-8, comma-separated CSVs
+#
+# Parsing: the encoding is detected (chardet) from the first
+# DETECT_BYTES of the file and the delimiter sniffed from its first lines,
+# then the file is parsed with pandas' C parser. (The pyarrow parser infers
+# timestamps and other types the C parser leaves as text, which would change
+# what the components see.)
+#
+# Cache: entries are keyed by a hash of the file's bytes plus the parse
+# options and pandas version:
+#
+#   dataset_cache/<key>/data.feather (pickle when pyarrow isn't installed), meta.json
+#   dataset_cache/stat/<path, size, mtime hash>    -> <key>
+#
+# The stat files let an unchanged file skip re-hashing. Entries are evicted
+# least-recently-used first once the cache grows past PAPAD_DATASET_CACHE_MB.
+# PAPAD_DATASET_CACHE=0 turns the cache off. (The entry handling itself is
+# disk_cache.DiskCache.)
+#
+# Files too big to load at once are read with read_chunks() (no cache): a
+# first pass finds the columns whose dtype differs between chunks, and the
+# chunks are then parsed with the dtype the whole file would have had.
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset_cache")
+DEFAULT_CACHE_MB = 2048
+DETECT_BYTES = 1024 * 1024
+SNIFF_CHARS = 2048
+HASH_CHUNK_BYTES = 4 * 1024 * 1024
+LOADER_VERSION = "1"
+
+CACHE = DiskCache("DATASET", CACHE_DIR, DEFAULT_CACHE_MB, "meta.json", reserved=("stat",))
+
+
+def detect_encoding(path):
+    """Encoding of the file, guessed from its first DETECT_BYTES."""
+    import chardet
+
+    with open(path, "rb") as f:
+        prefix = f.read(DETECT_BYTES)
+    enc = chardet.detect(prefix)["encoding"] or "utf-8"
+    # An ASCII prefix says nothing about the rest of the file; UTF-8 is a superset
+    return "utf-8" if enc.lower() == "ascii" else enc
+
+
+def sniff_delimiter(path, encoding):
+    with open(path, "r", encoding=encoding, errors="replace") as f:
+        sample = f.read(SNIFF_CHARS)
+    try:
+        return csv.Sniffer().sniff(sample).delimiter
+    except csv.Error:
+        return ","
+
+
+def parse_options(path, detect=True):
+    if not detect:
+        return {"encoding": "utf-8", "sep": ","}
+    encoding = detect_encoding(path)
+    return {
+        "encoding": encoding,
+        "sep": sniff_delimiter(path, encoding),
+        "on_bad_lines": "skip",
+        "encoding_errors": "replace",
+    }
+
+
+def parse_csv(path, options):
+    import pandas as pd
+    return pd.read_csv(path, engine="c", low_memory=False, **options)
+
+
+def _unify_dtypes(dtypes):
+    """The dtype a column gets when parsed at once, from its per-chunk dtypes."""
+    import pandas as pd
+
+    if all(pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in dtypes):
+        return "float64"  # int in some chunks, float (missing values) in others
+    for d in dtypes:
+        if not pd.api.types.is_numeric_dtype(d):
+            return d  # text somewhere: the whole column stays text
+    return object
+
+
+def chunk_schema(path, options, chunk_rows):
+    """(row count, {column: dtype} for the columns whose dtype varies between chunks)."""
+    import pandas as pd
+
+    seen = {}
+    n_rows = 0
+    for chunk in pd.read_csv(path, engine="c", chunksize=chunk_rows, **options):
+        n_rows += len(chunk)
+        for col, dtype in chunk.dtypes.items():
+            kinds = seen.setdefault(col, [])
+            if dtype not in kinds:
+                kinds.append(dtype)
+    return n_rows, {col: _unify_dtypes(kinds) for col, kinds in seen.items() if len(kinds) > 1}
+
+
+def read_chunks(path, chunk_rows, detect=True):
+    """
+    (row count, iterator of DataFrame chunks) for a CSV read chunk_rows rows
+    at a time; every chunk has the dtypes a single load_dataset() would give.
+    """
+    import pandas as pd
+
+    options = parse_options(path, detect)
+    n_rows, dtypes = chunk_schema(path, options, chunk_rows)
+    return n_rows, pd.read_csv(path, engine="c", chunksize=chunk_rows, dtype=dtypes or None, **options)
+
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stat_path(path, detect):
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{os.path.realpath(path)}\0{st.st_size}\0{st.st_mtime_ns}\0{detect}".encode())
+    return os.path.join(CACHE.root(), "stat", h.hexdigest())
+
+
+def cache_key(path, detect):
+    """
+    Key of the cache entry for this file: reused from its stat file when the
+    file hasn't changed since it was last hashed.
+    """
+    import pandas as pd
+
+    stat_path = _stat_path(path, detect)
+    try:
+        with open(stat_path) as f:
+            key = f.read().strip()
+        if os.path.isdir(CACHE.entry(key)):
+            return key, stat_path
+    except OSError:
+        pass
+
+    h = hashlib.blake2b(digest_size=20)
+    for part in (file_hash(path), str(detect), pd.__version__, LOADER_VERSION):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest(), stat_path
+
+
+def _write_stat(stat_path, key):
+    try:
+        os.makedirs(os.path.dirname(stat_path), exist_ok=True)
+        tmp_path = f"{stat_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(key)
+        os.replace(tmp_path, stat_path)
+    except OSError:
+        pass
+
+
+def evict(budget_bytes=None):
+    """Deletes least recently used entries until the cache fits the budget."""
+    CACHE.evict(budget_bytes)
+    root = CACHE.root()
+
+    # Stat files of evicted entries
+    stat_dir = os.path.join(root, "stat")
+    if os.path.isdir(stat_dir):
+        for name in os.listdir(stat_dir):
+            stat_path = os.path.join(stat_dir, name)
+            try:
+                with open(stat_path) as f:
+                    key = f.read().strip()
+                if not os.path.isdir(os.path.join(root, key)):
+                    os.remove(stat_path)
+            except OSError:
+                pass
+
+
+def load(key):
+    """The cached DataFrame, or None on a miss."""
+    import pandas as pd
+
+    try:
+        with open(CACHE.marker_path(key)) as f:
+            meta = json.load(f)
+        data_path = os.path.join(CACHE.entry(key), meta["file"])
+        if meta["format"] == "feather":
+            df = pd.read_feather(data_path)
+        else:
+            df = pd.read_pickle(data_path)
+    except (OSError, ValueError, KeyError, ImportError):
+        return None
+
+    CACHE.touch(key)
+    return df
+
+
+def _write_data(df, tmp_entry):
+    """Writes df as Feather when possible; returns (format, file name)."""
+    try:
+        df.to_feather(os.path.join(tmp_entry, "data.feather"))
+        return "feather", "data.feather"
+    except Exception:
+        # No pyarrow, or columns Arrow can't hold (mixed-type object columns)
+        try:
+            os.remove(os.path.join(tmp_entry, "data.feather"))
+        except OSError:
+            pass
+    df.to_pickle(os.path.join(tmp_entry, "data.pkl"))
+    return "pickle", "data.pkl"
+
+
+def store(key, df, source_path, options):
+    """Adds a parsed dataset to the cache (best effort)."""
+    def write(tmp_entry):
+        fmt, file_name = _write_data(df, tmp_entry)
+        meta = {"format": fmt, "file": file_name, "source": os.path.basename(source_path), "options": options,
+                "rows": int(df.shape[0]), "columns": int(df.shape[1])}
+        with open(os.path.join(tmp_entry, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    if CACHE.store(key, write, "parsed dataset", errors=(OSError, TypeError, ValueError)):
+        evict()
+
+
+def load_dataset(path, detect=True):
+    """
+    Reads the CSV at path as a DataFrame, from the columnar cache when this
+    exact file was parsed before. detect=False skips encoding / delimiter
+    detection (UTF-8, comma-separated).
+    """
+    with span("dataset.load", file=os.path.basename(path), cache="off") as s:
+        if not CACHE.enabled():
+            return s.output(parse_csv(path, parse_options(path, detect)))
+
+        try:
+            key, stat_path = cache_key(path, detect)
+        except OSError as e:
+            print(f"   [WARNING] Dataset cache unavailable: {e}")
+            return s.output(parse_csv(path, parse_options(path, detect)))
+
+        df = load(key)
+        if df is not None:
+            print(f"   [CACHE] {os.path.basename(path)}: reusing the parsed dataset.")
+            s.set(cache="hit")
+        else:
+            s.set(cache="miss")
+            options = parse_options(path, detect)
+            df = parse_csv(path, options)
+            store(key, df, path, options)
+        _write_stat(stat_path, key)
+        return s.output(df)
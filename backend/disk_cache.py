@@ -0,0 +1,123 @@
+# backend/disk_cache.py
+import os
+import time
+import shutil
+
+# Directory-per-entry cache on disk, shared by the dataset cache
+# (dataset_loader.py) and the training cache (models/train_cache.py):
+#
+#   <root>/<key>/<marker file> + whatever else the entry holds
+#
+# An entry is written into <root>/.<key>.<pid>.tmp and renamed into place, so
+# readers never see half an entry; unfinished entries left by a killed writer
+# are removed after STALE_TMP_SECONDS. The marker file's mtime is the entry's
+# last use, and entries are evicted least-recently-used first once the cache
+# grows past PAPAD_<NAME>_CACHE_MB. PAPAD_<NAME>_CACHE=0 turns the cache off
+# and PAPAD_<NAME>_CACHE_DIR moves it.
+
+STALE_TMP_SECONDS = 3600
+
+
+def _entry_size(entry):
+    total = 0
+    for name in os.listdir(entry):
+        try:
+            total += os.path.getsize(os.path.join(entry, name))
+        except OSError:
+            pass
+    return total
+
+
+class DiskCache:
+    def __init__(self, name, default_dir, default_mb, marker, reserved=()):
+        """
+        name: the PAPAD_<name>_CACHE* environment prefix; marker: the file
+        every finished entry has; reserved: names in the root that aren't entries.
+        """
+        self.env = f"PAPAD_{name}_CACHE"
+        self.default_dir = default_dir
+        self.default_mb = default_mb
+        self.marker = marker
+        self.reserved = set(reserved)
+
+    def enabled(self):
+        return os.environ.get(self.env, "1").strip().lower() not in ("0", "false", "no", "off")
+
+    def root(self):
+        return os.environ.get(f"{self.env}_DIR") or self.default_dir
+
+    def budget_bytes(self):
+        try:
+            mb = float(os.environ.get(f"{self.env}_MB", self.default_mb))
+        except ValueError:
+            print(f"   [WARNING] Invalid {self.env}_MB. Using {self.default_mb} MB.")
+            mb = self.default_mb
+        return int(mb * 1024 * 1024)
+
+    def entry(self, key):
+        return os.path.join(self.root(), key)
+
+    def marker_path(self, key):
+        return os.path.join(self.entry(key), self.marker)
+
+    def touch(self, key):
+        """Marks an entry as recently used."""
+        try:
+            os.utime(self.marker_path(key))
+        except OSError:
+            pass
+
+    def evict(self, budget_bytes=None):
+        """Deletes least recently used entries until the cache fits the budget."""
+        root = self.root()
+        if not os.path.isdir(root):
+            return
+        if budget_bytes is None:
+            budget_bytes = self.budget_bytes()
+
+        entries = []
+        for name in os.listdir(root):
+            entry = os.path.join(root, name)
+            if name in self.reserved:
+                continue
+            if name.startswith("."):
+                # Unfinished entry; left behind if its writer was killed
+                try:
+                    if time.time() - os.path.getmtime(entry) > STALE_TMP_SECONDS:
+                        shutil.rmtree(entry, ignore_errors=True)
+                except OSError:
+                    pass
+                continue
+            try:
+                entries.append((os.path.getmtime(os.path.join(entry, self.marker)), _entry_size(entry), entry))
+            except OSError:
+                continue  # Being written or removed by another process
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= budget_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def store(self, key, write, what, errors=(OSError,)):
+        """
+        Adds an entry (best effort): write(tmp_entry) fills a fresh directory
+        that is then renamed into place. Returns True when the entry was
+        added; `what` names it in the warning when it couldn't be.
+        """
+        entry = self.entry(key)
+        if os.path.exists(entry):
+            return False
+
+        tmp_entry = os.path.join(self.root(), f".{key}.{os.getpid()}.tmp")
+        try:
+            os.makedirs(tmp_entry, exist_ok=True)
+            write(tmp_entry)
+            os.rename(tmp_entry, entry)
+        except errors as e:
+            if not os.path.exists(entry):
+                print(f"   [WARNING] Could not cache {what}: {e}")
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return False
+        return True
@@ -1,15 +1,35 @@
 import os
 import pandas as pd
 import importlib
-import traceback
 import json
-import sys
+import shutil
+import time
+import multiprocessing
+import multiprocessing.connection
+import numpy as np
+
+from models.feature_store import resolve_features, sample_indices, stratified_sample_indices
+from models.artifacts import artifact_path
+from models.train_cache import cached_train
+from progress_events import emit, stage
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 model_names_file = os.path.join(current_dir, "model_names.json")
 
 CANDIDATE_MODELS = {}
 
+# Time limits in seconds (None / 0 = none); see resolve_time_limits. No
+# limit unless the caller or the environment sets one.
+DEFAULT_TIME_BUDGET = None
+DEFAULT_CANDIDATE_TIMEOUT = None
+
+# Successive-halving race (see race_candidates). Off unless asked for with
+# run(race=True) or PAPAD_AUTOML_RACE=1: it can pick a different winner than
+# training every candidate on all rows.
+RACE_MIN_SAMPLE = 2000    # smallest subsample a round runs on
+RACE_FINALISTS = 2        # candidates that get trained on the full data
+RACE_MAX_CLASSES = 20     # the target column is used as strata up to this many classes
+
 try:
     if os.path.exists(model_names_file):
         with open(model_names_file, 'r') as f:
@@ -55,18 +75,19 @@ def normalize_metrics(metrics):
             
     return standardized
 
-def train_candidate(name, script_name, X_train, y_train, X_test, y_test, train_path, test_path, target_col, output_dir):
+def train_candidate(name, script_name, X_train, y_train, X_test, y_test, train_path, test_path, target_col, output_dir, features=None):
     try:
         module = importlib.import_module(f"models.{script_name}")
-        model_path = os.path.join(output_dir, f"candidate_{name}.pkl")
+        model_path = artifact_path(os.path.join(output_dir, f"candidate_{name}"))
         
-        metrics = module.train(
+        metrics = cached_train(script_name, model_path, features, lambda: module.train(
             X_train, y_train, 
             X_test, y_test, 
             train_path, test_path, 
             target_col,
-            model_path
-        )
+            model_path,
+            features=features
+        ))
         return {
             "model": name, 
             "label": name.replace("_", " ").title(),
@@ -78,19 +99,192 @@ def train_candidate(name, script_name, X_train, y_train, X_test, y_test, train_p
         print(f"   [ERROR] Training {name} failed: {e}")
         return None
 
-def run(X_train, y_train, X_test, y_test, train_path, test_path, target_col, output_dir):
-    print("\n [AUTO-ML] Starting search for Best Clustering Algorithm...", flush=True)
-    
-    if not CANDIDATE_MODELS:
-        print("   [ERROR] No candidate models found to test. Check model_names.json.")
-        return None
+def resolve_n_jobs(n_jobs=None):
+    """
+    Number of worker processes used to train candidates.
+    Falls back to the PAPAD_AUTOML_WORKERS env variable, then to one worker per core.
+    """
+    if n_jobs is None:
+        n_jobs = os.environ.get("PAPAD_AUTOML_WORKERS")
+    try:
+        n_jobs = int(n_jobs) if n_jobs is not None else (os.cpu_count() or 1)
+    except ValueError:
+        print(f"   [WARNING] Invalid worker count '{n_jobs}'. Training sequentially.")
+        n_jobs = 1
+    if n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    return max(1, min(n_jobs, len(CANDIDATE_MODELS)))
+
+def resolve_time_limits(time_budget=None, candidate_timeout=None):
+    """
+    (time_budget, candidate_timeout) in seconds, None meaning no limit.
+    Fall back to the PAPAD_AUTOML_BUDGET_SECONDS / PAPAD_AUTOML_CANDIDATE_TIMEOUT
+    env variables, then to the defaults. 0 disables a limit.
+    """
+    def resolve(value, env_name, default):
+        if value is None:
+            value = os.environ.get(env_name, default)
+        if value is None:
+            return None
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            print(f"   [WARNING] Invalid {env_name} '{value}'. Using {f'{default}s' if default else 'no limit'}.")
+            value = default or 0
+        return value if value > 0 else None
+
+    return (
+        resolve(time_budget, "PAPAD_AUTOML_BUDGET_SECONDS", DEFAULT_TIME_BUDGET),
+        resolve(candidate_timeout, "PAPAD_AUTOML_CANDIDATE_TIMEOUT", DEFAULT_CANDIDATE_TIMEOUT),
+    )
+
+def _init_worker(n_threads):
+    # Every candidate gets its own process, so cap the BLAS/OpenMP pools
+    # to avoid n_workers * n_cores threads fighting for the same cores.
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(n_threads)
+    except Exception:
+        pass
+
+def _candidate_worker(conn, n_threads, name, script_name, args):
+    # Entry point of a candidate's worker process; sends the result back over the pipe.
+    _init_worker(n_threads)
+    try:
+        result = train_candidate(name, script_name, *args)
+    except BaseException as e:
+        print(f"   [ERROR] Training {name} failed: {e}")
+        result = None
+    conn.send(result)
+    conn.close()
+
+def _stop_worker(proc):
+    proc.terminate()
+    proc.join(2)
+    if proc.is_alive():
+        proc.kill()
+        proc.join()
 
+def train_all_candidates(X_train, y_train, X_test, y_test, train_path, test_path, target_col, output_dir, n_jobs, features=None, names=None, deadline=None, candidate_timeout=None):
+    """
+    Trains every candidate (or only `names`) and returns {name: result}.
+
+    Without time limits and with n_jobs == 1 the candidates run in this
+    process. Otherwise each candidate gets its own worker process (at most
+    n_jobs at a time) so that one running past `candidate_timeout` seconds,
+    or still running at `deadline` (a time.time() value), can be killed.
+    Killed and never-started candidates get a None result.
+    """
+    results = {}
+    names = list(CANDIDATE_MODELS) if names is None else names
+    n_jobs = max(1, min(n_jobs, len(names)))
+    limited = deadline is not None or candidate_timeout is not None
+
+    if features is not None and (n_jobs > 1 or limited):
+        # Workers memory-map the shared feature matrix, so don't pickle the frames into every process
+        X_train = X_test = None
+    args = (X_train, y_train, X_test, y_test, train_path, test_path, target_col, output_dir, features)
+
+    def report(name, status, started):
+        # Streams each result as soon as it is in, with the ranking so far
+        result = results.get(name)
+        metrics = normalize_metrics(result['metrics']) if result else None
+        emit(
+            "candidate_end", candidate=name, status=status,
+            duration=round(time.time() - started, 3), metrics=metrics,
+            ranking=partial_ranking(results, names)
+        )
+
+    if n_jobs == 1 and not limited:
+        for name in names:
+            print(f"   ...Testing {name}", flush=True)
+            emit("candidate_start", candidate=name)
+            started = time.time()
+            results[name] = train_candidate(name, CANDIDATE_MODELS[name], *args)
+            report(name, "done" if results[name] else "failed", started)
+        return results
+
+    if n_jobs > 1:
+        print(f"   Training {len(names)} candidates on {n_jobs} worker processes...", flush=True)
+    n_threads = max(1, (os.cpu_count() or 1) // n_jobs)
+
+    pending = list(names)
+    running = {}  # name -> (process, pipe, started, kill_at)
+
+    def finish(name, result, status):
+        proc, conn, started, _ = running.pop(name)
+        conn.close()
+        if status in ("done", "failed"):
+            proc.join()
+        else:
+            _stop_worker(proc)
+        results[name] = result
+        print(f"   ...Finished {name} ({status})", flush=True)
+        report(name, status, started)
+
+    while pending or running:
+        while pending and len(running) < n_jobs and (deadline is None or time.time() < deadline):
+            name = pending.pop(0)
+            print(f"   ...Testing {name}", flush=True)
+            emit("candidate_start", candidate=name)
+            parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+            proc = multiprocessing.Process(
+                target=_candidate_worker,
+                args=(child_conn, n_threads, name, CANDIDATE_MODELS[name], args),
+                daemon=True
+            )
+            proc.start()
+            child_conn.close()
+
+            started = time.time()
+            limits = [t for t in (deadline, started + candidate_timeout if candidate_timeout else None) if t]
+            running[name] = (proc, parent_conn, started, min(limits) if limits else None)
+
+        if not running:
+            break  # Time budget used up with candidates still waiting
+
+        kill_times = [kill_at for *_, kill_at in running.values() if kill_at is not None]
+        timeout = max(0.0, min(kill_times) - time.time()) if kill_times else None
+        multiprocessing.connection.wait(
+            [conn for _, conn, _, _ in running.values()] + [proc.sentinel for proc, *_ in running.values()],
+            timeout=timeout
+        )
+
+        now = time.time()
+        for name, (proc, conn, started, kill_at) in list(running.items()):
+            if conn.poll():
+                try:
+                    result = conn.recv()
+                    finish(name, result, "done" if result else "failed")
+                except (EOFError, OSError) as e:
+                    # Worker crashed (e.g. killed by the OS) before train_candidate could report.
+                    print(f"   [ERROR] Worker for {name} crashed: {e}")
+                    finish(name, None, "crashed")
+            elif not proc.is_alive():
+                print(f"   [ERROR] Worker for {name} crashed (exit code {proc.exitcode})")
+                finish(name, None, "crashed")
+            elif kill_at is not None and now >= kill_at:
+                reason = "time budget" if deadline is not None and now >= deadline else "timeout"
+                print(f"   [WARNING] {name} stopped after {now - started:.0f}s ({reason}).", flush=True)
+                finish(name, None, "timed out")
+
+    for name in pending:
+        print(f"   [WARNING] Skipping {name}: AutoML time budget used up.", flush=True)
+        results[name] = None
+        emit("candidate_end", candidate=name, status="skipped", duration=0.0, metrics=None)
+
+    return results
+
+def collect_candidates(results, names, quiet=False):
+    """
+    Standardizes the metrics of the successful results, in `names` order
+    (not completion order) so the ranking is identical for sequential and
+    parallel runs.
+    """
     candidates = []
 
-    for name, script_name in CANDIDATE_MODELS.items():
-        print(f"   ...Testing {name}", flush=True)
-        
-        res = train_candidate(name, script_name, X_train, y_train, X_test, y_test, train_path, test_path, target_col, output_dir)
+    for name in names:
+        res = results.get(name)
         
         if res:
             raw_metrics = res['metrics']
@@ -101,12 +295,28 @@ def run(X_train, y_train, X_test, y_test, train_path, test_path, target_col, out
             if all(k in std_metrics for k in ['silhouette', 'calinski', 'davies']):
                 res['metrics'] = std_metrics
                 candidates.append(res)
-            else:
+            elif not quiet:
                 print(f"   [SKIP] {name} missing standard metrics. Received: {list(raw_metrics.keys())}", flush=True)
 
+    return candidates
+
+def partial_ranking(results, names):
+    """[{candidate, final_score}] of the candidates finished so far, best first."""
+    finished = {name: dict(res) for name, res in results.items() if res}
+    candidates = collect_candidates(finished, [name for name in names if name in finished], quiet=True)
     if not candidates:
-        raise Exception("All candidate models failed to train or returned invalid metrics.")
+        return []
+    ranking = rank_candidates(candidates)
+    return [
+        {"candidate": candidates[int(row['index'])]['internal_name'], "final_score": float(row['final_score'])}
+        for _, row in ranking.iterrows()
+    ]
 
+def rank_candidates(candidates):
+    """
+    Rank table of the candidates, best first:
+    0.5 * silhouette rank + 0.25 * calinski rank + 0.25 * davies rank.
+    """
     data = []
     for i, c in enumerate(candidates):
         data.append({
@@ -124,13 +334,155 @@ def run(X_train, y_train, X_test, y_test, train_path, test_path, target_col, out
 
     df_rank['final_score'] = (df_rank['r_sil'] * 0.5) + (df_rank['r_ch'] * 0.25) + (df_rank['r_db'] * 0.25)
 
-    # Sort and pick winner
-    best_row = df_rank.sort_values(by='final_score').iloc[0]
-    winner = candidates[int(best_row['index'])]
-    
-    # Update label to indicate it's the winner
-    winner['model'] = f"Best: {winner['label']}"
-    
-    print(f"\n\033[92m====== BEST MODEL FOUND: {winner['label']} (Score: {best_row['final_score']:.2f}) ======\033[0m\n", flush=True)
+    return df_rank.sort_values(by='final_score', kind='mergesort')
+
+def resolve_race(race=None):
+    """
+    Whether to race the candidates: `race` when given, else the
+    PAPAD_AUTOML_RACE env variable (off unless set to 1).
+    """
+    if race is None:
+        race = os.environ.get("PAPAD_AUTOML_RACE", "0").strip().lower() in ("1", "true", "yes", "on")
+    return bool(race)
+
+def race_schedule(n_rows, n_candidates):
+    """
+    Subsample sizes of the elimination rounds. Each round halves the field
+    until RACE_FINALISTS are left and doubles the rows; the final round
+    (not included here) runs on the full data.
+    """
+    n_rounds = 0
+    remaining = n_candidates
+    while remaining > RACE_FINALISTS:
+        remaining = max(RACE_FINALISTS, (remaining + 1) // 2)
+        n_rounds += 1
+
+    sizes = []
+    for i in range(n_rounds):
+        size = max(RACE_MIN_SAMPLE, n_rows >> (n_rounds - i))
+        if size >= n_rows:
+            break
+        sizes.append(size)
+    return sizes
+
+def race_strata(features, y=None, n_bins=10):
+    """
+    Stratum code per row for the race subsamples: the target column when
+    it looks categorical, otherwise deciles along the first principal
+    direction of the features.
+    """
+    if y is not None:
+        counts = y.value_counts(dropna=False)
+        if 1 < len(counts) <= RACE_MAX_CLASSES and counts.min() >= 2:
+            return pd.factorize(y)[0]
+
+    try:
+        X = features.array
+        fit_rows = X[np.sort(sample_indices(len(X), min(len(X), RACE_MIN_SAMPLE)))]
+        center = fit_rows.mean(axis=0)
+        _, _, vt = np.linalg.svd(fit_rows - center, full_matrices=False)
+        projection = X @ vt[0] - center @ vt[0]
+        edges = np.quantile(projection, np.linspace(0, 1, n_bins + 1)[1:-1])
+        return np.searchsorted(edges, projection)
+    except Exception as e:
+        print(f"   [WARNING] Could not stratify race samples ({e}). Sampling uniformly.")
+        return np.zeros(len(features), dtype=int)
+
+def race_candidates(y_train, y_test, train_path, test_path, target_col, output_dir, n_jobs, features, deadline=None, candidate_timeout=None):
+    """
+    Successive halving: every candidate is tuned and scored on a small
+    stratified subsample, the bottom half by the rank score is dropped and
+    the survivors move on to a sample twice as large. Returns the names of
+    the finalists, which run() then trains on the full data, so expensive
+    losers never touch the full dataset, plus the candidates of the last
+    round (the best results so far if the time budget runs out).
+    """
+    names = list(CANDIDATE_MODELS)
+    y = pd.concat([y_train, y_test]) if y_train is not None and y_test is not None else None
+    if y is not None and len(y) != len(features):
+        y = None
+    strata = race_strata(features, y)
+    candidates = []
+
+    for i, size in enumerate(race_schedule(len(features), len(names))):
+        if deadline is not None and time.time() >= deadline:
+            break
+
+        print(f"   [RACE] Round {i + 1}: {len(names)} candidates on {size} of {len(features)} rows", flush=True)
+        emit("race_round", round=i + 1, size=size, rows=len(features), candidates=names)
+        sample = features.subset(stratified_sample_indices(strata, size), f"race_{i}")
+        try:
+            results = train_all_candidates(
+                None, None, None, None, train_path, test_path, target_col, output_dir, n_jobs, sample, names,
+                deadline=deadline, candidate_timeout=candidate_timeout
+            )
+        finally:
+            if sample.run_dir:
+                shutil.rmtree(sample.run_dir, ignore_errors=True)
+
+        round_candidates = collect_candidates(results, names)
+        if not round_candidates:
+            if candidates:
+                break  # Keep the previous round's results
+            raise Exception(f"All candidate models failed in race round {i + 1}.")
+        candidates = round_candidates
+
+        keep = max(RACE_FINALISTS, (len(names) + 1) // 2)
+        ranking = rank_candidates(candidates)
+        survivors = {candidates[int(idx)]['internal_name'] for idx in ranking['index'].iloc[:keep]}
+        dropped = [name for name in names if name not in survivors]
+        names = [name for name in names if name in survivors]
+        print(f"   [RACE] Dropped: {', '.join(dropped) if dropped else 'none'}", flush=True)
+        emit("race_result", round=i + 1, dropped=dropped, survivors=names)
+
+    print(f"   [RACE] Final round on all rows: {', '.join(names)}", flush=True)
+    return names, candidates
+
+def run(X_train, y_train, X_test, y_test, train_path, test_path, target_col, output_dir, n_jobs=None, features=None, race=None, time_budget=None, candidate_timeout=None):
+    print("\n [AUTO-ML] Starting search for Best Clustering Algorithm...", flush=True)
     
-    return winner
\ No newline at end of file
+    if not CANDIDATE_MODELS:
+        print("   [ERROR] No candidate models found to test. Check model_names.json.")
+        return None
+
+    with stage("automl", candidates=list(CANDIDATE_MODELS)):
+        n_jobs = resolve_n_jobs(n_jobs)
+        time_budget, candidate_timeout = resolve_time_limits(time_budget, candidate_timeout)
+        deadline = time.time() + time_budget if time_budget else None
+        names = list(CANDIDATE_MODELS)
+
+        race_results = []
+        if resolve_race(race):
+            features = resolve_features(X_train, X_test, features)
+            names, race_results = race_candidates(
+                y_train, y_test, train_path, test_path, target_col, output_dir, n_jobs, features,
+                deadline=deadline, candidate_timeout=candidate_timeout
+            )
+
+        results = train_all_candidates(
+            X_train, y_train, X_test, y_test, train_path, test_path, target_col, output_dir, n_jobs, features, names,
+            deadline=deadline, candidate_timeout=candidate_timeout
+        )
+
+        candidates = collect_candidates(results, names)
+
+        if not candidates and race_results:
+            # The budget ran out before the full-data round; fall back to the
+            # models of the last race round (trained on a subsample).
+            print("   [WARNING] Time budget used up before the final round. Using the best race result so far.", flush=True)
+            candidates = race_results
+
+        if not candidates:
+            raise Exception("All candidate models failed to train or returned invalid metrics.")
+
+        # Sort and pick winner
+        best_row = rank_candidates(candidates).iloc[0]
+        winner = candidates[int(best_row['index'])]
+
+        # Update label to indicate it's the winner
+        winner['model'] = f"Best: {winner['label']}"
+
+        emit("winner", candidate=winner['internal_name'], final_score=float(best_row['final_score']), metrics=winner['metrics'])
+        print(f"\n\033[92m====== BEST MODEL FOUND: {winner['label']} (Score: {best_row['final_score']:.2f}) ======\033[0m\n", flush=True)
+
+        return winner
@@ -1,135 +1,216 @@
 import sys
 import os
 import json
-import pandas as pd
+import time
 import importlib
 import traceback
-import shutil
-from sklearn.model_selection import train_test_split
-
-import find_best_model 
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
+# backend/ (shared progress_events / telemetry modules)
+ROOT_DIR = os.path.dirname(current_dir)
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from progress_events import emit, stage, reset_clock
+from telemetry import start_trace, profile_flag
+
 TRAINED_MODELS_DIR = os.path.join(current_dir, "trained_models")
 CANDIDATE_MODELS_DIR = os.path.join(current_dir, "candidate_models")
 
 os.makedirs(TRAINED_MODELS_DIR, exist_ok=True)
 os.makedirs(CANDIDATE_MODELS_DIR, exist_ok=True)
 
-dataset_path = sys.argv[1]
-selected_models_json = sys.argv[2]
-output_dir = current_dir 
-
-try:
-    df = pd.read_csv(dataset_path)
-except Exception as e:
-    print(f"[ERROR] Error loading dataset: {e}")
-    sys.exit(1)
-
-target_col = df.columns[-1]
-feature_cols = df.columns[:-1]
-
-X = df[feature_cols]
-y = df[target_col]
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-train_path = os.path.join(output_dir, "train_dataset.csv")
-test_path = os.path.join(output_dir, "test_dataset.csv")
-
-train_df = pd.concat([X_train, y_train], axis=1)
-test_df = pd.concat([X_test, y_test], axis=1)
-
-train_df.to_csv(train_path, index=False)
-test_df.to_csv(test_path, index=False)
-
-selected_models = json.loads(selected_models_json)
-results = []
-
-model_names_file = os.path.join(current_dir, "model_names.json")
-model_file_map = {}
-
-try:
-    if os.path.exists(model_names_file):
-        with open(model_names_file, 'r') as f:
-            all_models_config = json.load(f)
-            
-        for m in all_models_config:
-            if m.get("type") == "model":
-                model_file_map[m["name"]] = m["name"]
-    else:
-        print(f"[WARNING] {model_names_file} not found. Dynamic mapping failed.")
-except Exception as e:
-    print(f"[ERROR] Failed to read model_names.json: {e}")
-    sys.exit(1)
-
-for model_info in selected_models:
-    model_name = model_info.get("name")
-    model_label = model_info.get("label")
-
-    if model_name == "best_cluster_algo":
-        try:
-            winner_result = find_best_model.run(
-                X_train, y_train, 
-                X_test, y_test, 
-                train_path, test_path, 
-                target_col, 
-                CANDIDATE_MODELS_DIR 
-            )
-            
-            if winner_result:
-                source_path = winner_result['path']
-                final_model_name = f"best_{winner_result['internal_name']}_model.pkl"
-                dest_path = os.path.join(TRAINED_MODELS_DIR, final_model_name)
-                
-                shutil.copy2(source_path, dest_path)
-                
-                winner_result['path'] = dest_path
-                results.append(winner_result)
-                
-        except Exception as e:
-            print(f"[ERROR] Auto-ML Failed: {str(e)}")
-            traceback.print_exc()
-
-    else:
-        if model_name not in model_file_map:
-            print(f"[WARNING] No script mapped for {model_name} in model_names.json")
-            continue
-
-        script_name = model_file_map[model_name]
-        print(f"\n[TRAINING] Training {model_label}...")
-
+def needs_split_files(script_names):
+    """
+    True when one of the model scripts reads train_dataset.csv / test_dataset.csv
+    (declared with a module-level NEEDS_SPLIT_FILES = True). The clustering
+    models only use the shared feature matrix, so by default nothing is written.
+    """
+    for script_name in set(script_names):
         try:
             module = importlib.import_module(f"models.{script_name}")
-            
-            model_path = os.path.join(TRAINED_MODELS_DIR, f"{model_name}_model.pkl")
-            
-            metrics = module.train(
-                X_train, y_train, 
-                X_test, y_test, 
-                train_path, test_path, 
-                target_col,
-                model_path
-            )
-            
-            print(f"[SUCCESS] {model_label} finished.")
-            
-            results.append({
-                "model": model_label,
-                "metrics": metrics,
-                "path": model_path
-            })
-
         except ImportError:
-            print(f"[ERROR] script models/{script_name}.py not found.")
-        except Exception as e:
-            print(f"[ERROR] Failed to train {model_label}: {str(e)}")
-            traceback.print_exc()
-
-
-print("\n__JSON_START__")
-print(json.dumps(results))
-print("__JSON_END__")
\ No newline at end of file
+            continue
+        if getattr(module, "NEEDS_SPLIT_FILES", False):
+            return True
+    return False
+
+def main(argv):
+    argv = profile_flag(argv)  # --profile: cProfile every model train (see telemetry.py)
+    dataset_path = argv[1]
+    selected_models_json = argv[2]
+    # Optional 3rd argument: AutoML time budget in seconds (0 = no limit)
+    time_budget = argv[3] if len(argv) > 3 else None
+    output_dir = current_dir 
+    reset_clock()
+    start_trace("training", argv)
+
+    # Heavy imports only once the arguments are read: importing this module
+    # (warm worker, spawned candidate processes) stays cheap.
+    import numpy as np
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    import find_best_model
+    from models.feature_store import build_feature_matrix
+    from models.artifacts import artifact_path, copy_artifact
+    from models.train_cache import cached_train
+    from dataset_loader import load_dataset
+
+    try:
+        df = load_dataset(dataset_path, detect=False)
+    except Exception as e:
+        print(f"[ERROR] Error loading dataset: {e}")
+        sys.exit(1)
+
+    target_col = df.columns[-1]
+    feature_cols = df.columns[:-1]
+
+    X = df[feature_cols]
+    y = df[target_col]
+
+    selected_models = json.loads(selected_models_json)
+    results = []
+
+    model_names_file = os.path.join(current_dir, "model_names.json")
+    model_file_map = {}
+
+    try:
+        if os.path.exists(model_names_file):
+            with open(model_names_file, 'r') as f:
+                all_models_config = json.load(f)
+            
+            for m in all_models_config:
+                if m.get("type") == "model":
+                    model_file_map[m["name"]] = m["name"]
+        else:
+            print(f"[WARNING] {model_names_file} not found. Dynamic mapping failed.")
+    except Exception as e:
+        print(f"[ERROR] Failed to read model_names.json: {e}")
+        sys.exit(1)
+
+    script_names = []
+    for model_info in selected_models:
+        if model_info.get("name") == "best_cluster_algo":
+            script_names.extend(find_best_model.CANDIDATE_MODELS.values())
+        elif model_info.get("name") in model_file_map:
+            script_names.append(model_file_map[model_info["name"]])
+
+    if needs_split_files(script_names):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+        train_path = os.path.join(output_dir, "train_dataset.csv")
+        test_path = os.path.join(output_dir, "test_dataset.csv")
+
+        train_df = pd.concat([X_train, y_train], axis=1)
+        test_df = pd.concat([X_test, y_test], axis=1)
+
+        train_df.to_csv(train_path, index=False)
+        test_df.to_csv(test_path, index=False)
+
+        # Build the feature matrix once per run; every model (and every AutoML
+        # worker process) memory-maps this single copy instead of re-concatenating X.
+        features = build_feature_matrix(pd.concat([X_train, X_test]))
+    else:
+        # In-memory handoff: the models only use the shared feature matrix,
+        # so skip the split frames and the CSV files. Rows keep the order the
+        # split would give them (train rows, then test rows) so results match.
+        train_rows, test_rows = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+        y_train, y_test = y.iloc[train_rows], y.iloc[test_rows]
+        X_train = X_test = None
+        train_path = test_path = None
+
+        features = build_feature_matrix(X.iloc[np.concatenate([train_rows, test_rows])])
+
+    # The run directory holds a copy of the feature matrix and the shared
+    # distance blocks: remove it however training ends
+    try:
+        emit("features_ready", rows=features.shape[0], columns=features.shape[1])
+
+        with stage("training", models=[m.get("name") for m in selected_models]):
+            for model_info in selected_models:
+                model_name = model_info.get("name")
+                model_label = model_info.get("label")
+
+                if model_name == "best_cluster_algo":
+                    try:
+                        winner_result = find_best_model.run(
+                            X_train, y_train, 
+                            X_test, y_test, 
+                            train_path, test_path, 
+                            target_col, 
+                            CANDIDATE_MODELS_DIR,
+                            features=features,
+                            time_budget=time_budget
+                        )
+
+                        if winner_result:
+                            source_path = winner_result['path']
+                            final_model_name = f"best_{winner_result['internal_name']}_model"
+                            dest_path = os.path.join(TRAINED_MODELS_DIR, final_model_name)
+
+                            # Copies the artifact header and its array blob
+                            dest_path = copy_artifact(source_path, dest_path)
+
+                            winner_result['path'] = dest_path
+                            results.append(winner_result)
+
+                    except Exception as e:
+                        print(f"[ERROR] Auto-ML Failed: {str(e)}")
+                        traceback.print_exc()
+
+                else:
+                    if model_name not in model_file_map:
+                        print(f"[WARNING] No script mapped for {model_name} in model_names.json")
+                        continue
+
+                    script_name = model_file_map[model_name]
+                    print(f"\n[TRAINING] Training {model_label}...")
+                    emit("model_start", model=model_name, label=model_label)
+                    started = time.time()
+
+                    try:
+                        module = importlib.import_module(f"models.{script_name}")
+
+                        model_path = artifact_path(os.path.join(TRAINED_MODELS_DIR, f"{model_name}_model"))
+
+                        # Reuses the model when this algorithm already ran on the same features
+                        metrics = cached_train(script_name, model_path, features, lambda: module.train(
+                            X_train, y_train, 
+                            X_test, y_test, 
+                            train_path, test_path, 
+                            target_col,
+                            model_path,
+                            features=features
+                        ))
+
+                        print(f"[SUCCESS] {model_label} finished.")
+                        emit("model_end", model=model_name, status="done", duration=round(time.time() - started, 3), metrics=metrics)
+
+                        results.append({
+                            "model": model_label,
+                            "metrics": metrics,
+                            "path": model_path
+                        })
+
+                    except ImportError:
+                        print(f"[ERROR] script models/{script_name}.py not found.")
+                        emit("model_end", model=model_name, status="failed", duration=round(time.time() - started, 3))
+                    except Exception as e:
+                        print(f"[ERROR] Failed to train {model_label}: {str(e)}")
+                        traceback.print_exc()
+                        emit("model_end", model=model_name, status="failed", duration=round(time.time() - started, 3))
+    finally:
+        features.close()
+
+    print("\n__JSON_START__")
+    print(json.dumps(results))
+    print("__JSON_END__")
+
+
+# Guarded so candidate worker processes (spawned on Windows) can re-import this file safely.
+if __name__ == "__main__":
+    main(sys.argv)
\ No newline at end of file
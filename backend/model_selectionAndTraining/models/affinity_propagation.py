@@ -1,23 +1,40 @@
-import joblib
-import pandas as pd
 from sklearn.cluster import AffinityPropagation
-from .metrics_utils import calculate_metrics
+from .metrics_utils import calculate_metrics, report_scores
+from .artifacts import save_model
+from .feature_store import resolve_features, sample_indices
 
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print("Training Affinity Propagation...")
-    X_combined = pd.concat([X_train, X_test])
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
     
     # Sampling if data is huge because Affinity Prop crashes on >10k rows usually
+    rows = None
     if len(X_combined) > 3000:
         print("   (Sampling data to 3000 rows for Affinity Propagation performance)")
-        X_train_fit = X_combined.sample(3000, random_state=42)
+        rows = sample_indices(len(X_combined), 3000)
+        X_train_fit = X_combined[rows]
     else:
         X_train_fit = X_combined
 
-    model = AffinityPropagation(random_state=42, damping=0.9)
-    labels = model.fit_predict(X_train_fit)
+    # The 'euclidean' affinity is -||x - y||^2; reuse the cached squared distances
+    sq_dists = features.distances.pairwise("sqeuclidean", rows)
+
+    if sq_dists is not None:
+        model = AffinityPropagation(random_state=42, damping=0.9, affinity='precomputed')
+        labels = model.fit_predict(-sq_dists)
+
+        # Back to a regular euclidean model so predict() works on new data
+        model.affinity = 'euclidean'
+        model.cluster_centers_ = X_train_fit[model.cluster_centers_indices_].copy()
+        model.n_features_in_ = X_train_fit.shape[1]
+        del model.affinity_matrix_
+    else:
+        model = AffinityPropagation(random_state=42, damping=0.9)
+        labels = model.fit_predict(X_train_fit)
     
-    metrics = calculate_metrics(X_train_fit, labels)
+    metrics = calculate_metrics(X_train_fit, labels, distances=features.distances, rows=rows)
+    report_scores("AffinityPropagation", [{"damping": model.damping}], [metrics])
     
-    joblib.dump(model, save_path)
+    save_model(model, save_path, feature_names=features.columns, metrics=metrics)
     return {"algo": "AffinityPropagation", **metrics}
\ No newline at end of file
@@ -0,0 +1,272 @@
+# backend/model_selectionAndTraining/models/artifacts.py
+import os
+import json
+import shutil
+import importlib
+import numpy as np
+
+# Versioned model artifact, written by every model's train() and read by
+# output_section/scripts/model_utils.py:
+#
+#   <name>.model.json  small header: algorithm, estimator class + params,
+#                      feature names, metrics, fitted scalars and the
+#                      offset / dtype / shape of every array in the blob
+#   <name>.model.bin   raw arrays, each 64-byte aligned, memory-mapped on load
+#
+# Only what prediction needs goes in: the fitted arrays listed in
+# PREDICT_ARRAYS (cluster centers, mixture parameters, ...), never per-row
+# training state like labels_, components_, reachability_ or the affinity
+# matrix. Models without predict() store a nearest-neighbor predictor
+# instead: reference rows + their labels (+ a noise radius for DBSCAN).
+
+ARTIFACT_FORMAT = "papad-model"
+ARTIFACT_VERSION = 1
+ARTIFACT_SUFFIX = ".model.json"
+BLOB_SUFFIX = ".model.bin"
+ALIGNMENT = 64
+
+# Fitted arrays each estimator's predict() needs
+PREDICT_ARRAYS = {
+    "KMeans": ["cluster_centers_"],
+    "MiniBatchKMeans": ["cluster_centers_"],
+    "KMedoids": ["cluster_centers_"],
+    "MeanShift": ["cluster_centers_"],
+    "AffinityPropagation": ["cluster_centers_", "cluster_centers_indices_"],
+    "GaussianMixture": ["weights_", "means_", "covariances_", "precisions_cholesky_"],
+    "Birch": ["subcluster_centers_", "subcluster_labels_", "_subcluster_norms"],
+}
+
+# Only estimators from these packages are re-created on load
+ALLOWED_MODULES = ("sklearn.", "sklearn_extra.")
+
+
+def artifact_path(path):
+    """`path` as an artifact header path (x.pkl / x -> x.model.json)."""
+    if path.endswith(ARTIFACT_SUFFIX):
+        return path
+    return os.path.splitext(path)[0] + ARTIFACT_SUFFIX
+
+
+def blob_path(path):
+    return artifact_path(path)[:-len(ARTIFACT_SUFFIX)] + BLOB_SUFFIX
+
+
+def _jsonable(value):
+    """Plain JSON value for numpy scalars, or raises TypeError."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class _BlobWriter:
+    def __init__(self):
+        self.arrays = []
+        self.index = {}
+        self.size = 0
+
+    def add(self, name, array):
+        array = np.ascontiguousarray(array)
+        offset = -(-self.size // ALIGNMENT) * ALIGNMENT
+        self.index[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        self.arrays.append((offset, array))
+        self.size = offset + array.nbytes
+        return {"__array__": name}
+
+    def write(self, path):
+        with open(path, "wb") as f:
+            for offset, array in self.arrays:
+                f.seek(offset)
+                f.write(array.tobytes())
+
+
+def save_model(model, path, feature_names=None, metrics=None, algorithm=None,
+               predictor_rows=None, predictor_labels=None, max_distance=None):
+    """
+    Writes `model` as an artifact at artifact_path(path) and returns that path.
+    predictor_rows / predictor_labels (for models without predict()) make
+    new rows take the label of their nearest reference row, or -1 when it
+    is farther than max_distance.
+    """
+    if model is None:
+        raise Exception("No fitted model to save.")
+
+    header_path = artifact_path(path)
+    blob = _BlobWriter()
+
+    params = {}
+    for name, value in model.get_params(deep=False).items():
+        if isinstance(value, np.ndarray):
+            params[name] = blob.add(f"params.{name}", value)
+            continue
+        try:
+            params[name] = _jsonable(value)
+        except TypeError:
+            print(f"   [WARNING] Param '{name}' of {type(model).__name__} not saved in the artifact.")
+
+    # Fitted state: small scalars always, arrays only when predict() needs them
+    fitted = {}
+    for name in PREDICT_ARRAYS.get(type(model).__name__, []):
+        if hasattr(model, name):
+            fitted[name] = blob.add(f"fitted.{name}", getattr(model, name))
+    for name, value in vars(model).items():
+        if name in fitted or not (name.endswith("_") or name.startswith("_")):
+            continue
+        if isinstance(value, (np.ndarray, list, tuple, dict)):
+            continue
+        try:
+            fitted[name] = _jsonable(value)
+        except TypeError:
+            continue
+
+    predictor = None
+    if predictor_rows is not None:
+        predictor = {
+            "kind": "nearest",
+            "rows": blob.add("predictor.rows", np.asarray(predictor_rows, dtype=np.float64)),
+            "labels": blob.add("predictor.labels", np.asarray(predictor_labels)),
+            "max_distance": _jsonable(max_distance),
+        }
+
+    cls = type(model)
+    header = {
+        "format": ARTIFACT_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "algorithm": algorithm or cls.__name__,
+        "estimator": {"class": f"{cls.__module__}.{cls.__qualname__}", "params": params},
+        "fitted": fitted,
+        "predictor": predictor,
+        "feature_names": [str(c) for c in feature_names] if feature_names is not None else None,
+        "metrics": _jsonable({k: v for k, v in (metrics or {}).items()}),
+        "arrays": blob.index,
+    }
+
+    blob.write(blob_path(header_path))
+    tmp_path = header_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(header, f, indent=1)
+    # Header last (atomically), so a readable header always has its blob
+    os.replace(tmp_path, header_path)
+    return header_path
+
+
+def copy_artifact(source, dest):
+    """Copies an artifact (header + blob) and returns the new header path."""
+    dest = artifact_path(dest)
+    shutil.copy2(blob_path(source), blob_path(dest))
+    shutil.copy2(artifact_path(source), dest)
+    return dest
+
+
+class NearestLabelPredictor:
+    """
+    Labels rows with the label of their nearest reference row; every row is
+    noise (-1) when there are no reference rows (a DBSCAN without core samples).
+    """
+
+    def __init__(self, rows, labels, max_distance=None):
+        from sklearn.neighbors import NearestNeighbors
+
+        self.labels = labels
+        self.max_distance = max_distance
+        self.index = NearestNeighbors(n_neighbors=1).fit(rows) if len(rows) else None
+
+    def predict(self, X):
+        if self.index is None:
+            return np.full(len(X), -1, dtype=np.intp)
+        dist, ind = self.index.kneighbors(np.asarray(X, dtype=np.float64), n_neighbors=1)
+        labels = np.asarray(self.labels)[ind[:, 0]]
+        if self.max_distance is not None:
+            labels = np.where(dist[:, 0] <= self.max_distance, labels, -1)
+        return labels
+
+
+class Artifact:
+    """A loaded artifact: header, re-created estimator and optional predictor."""
+
+    def __init__(self, header, estimator, predictor=None):
+        self.header = header
+        self.estimator = estimator
+        self.predictor = predictor
+
+    @property
+    def algorithm(self):
+        return self.header.get("algorithm")
+
+    @property
+    def feature_names(self):
+        return self.header.get("feature_names")
+
+    def select_features(self, df):
+        """The model's feature columns of a DataFrame, in training order."""
+        names = self.feature_names
+        if not names:
+            # Artifacts saved without names: the columns FeatureMatrix trains on
+            return df.select_dtypes(include=["number", "bool"])
+        columns = {str(c): c for c in df.columns}
+        missing = [name for name in names if name not in columns]
+        if missing:
+            raise Exception(
+                f"{self.algorithm} artifact was trained on columns the dataset doesn't have: {missing}"
+            )
+        return df[[columns[name] for name in names]]
+
+    def predict(self, X):
+        if hasattr(X, "columns"):
+            # Same casting as FeatureMatrix.from_frame (bool -> 0/1, NaN -> 0)
+            X = self.select_features(X).to_numpy(dtype=np.float64, na_value=0.0)
+        if self.predictor is not None:
+            return self.predictor.predict(X)
+        if hasattr(self.estimator, "predict"):
+            return self.estimator.predict(X)
+        raise Exception(f"{self.algorithm} artifact has no predictor.")
+
+
+def load_artifact(path):
+    """Reads an artifact; arrays are memory-mapped from the blob, not copied."""
+    header_path = artifact_path(path)
+    with open(header_path) as f:
+        header = json.load(f)
+
+    if header.get("format") != ARTIFACT_FORMAT:
+        raise Exception(f"{header_path} is not a model artifact.")
+    if header.get("version", 0) > ARTIFACT_VERSION:
+        raise Exception(
+            f"{header_path} uses artifact version {header['version']}; "
+            f"this code reads up to version {ARTIFACT_VERSION}."
+        )
+
+    blob = blob_path(header_path)
+
+    def resolve(value):
+        if isinstance(value, dict) and "__array__" in value:
+            spec = header["arrays"][value["__array__"]]
+            shape = tuple(spec["shape"])
+            if 0 in shape:
+                return np.empty(shape, dtype=spec["dtype"])
+            return np.memmap(blob, dtype=spec["dtype"], mode="r", offset=spec["offset"], shape=shape)
+        return value
+
+    module_name, _, class_name = header["estimator"]["class"].rpartition(".")
+    if not module_name.startswith(ALLOWED_MODULES):
+        raise Exception(f"Refusing to load estimator class {header['estimator']['class']}.")
+    cls = getattr(importlib.import_module(module_name), class_name)
+
+    params = {k: resolve(v) for k, v in header["estimator"]["params"].items()}
+    estimator = cls(**params)
+    for name, value in header["fitted"].items():
+        setattr(estimator, name, resolve(value))
+
+    predictor = None
+    if header.get("predictor"):
+        spec = header["predictor"]
+        predictor = NearestLabelPredictor(
+            resolve(spec["rows"]), resolve(spec["labels"]), spec.get("max_distance")
+        )
+
+    return Artifact(header, estimator, predictor)
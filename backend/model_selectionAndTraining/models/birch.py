@@ -1,27 +1,54 @@
-import joblib
-import pandas as pd
 from sklearn.cluster import Birch
-from .metrics_utils import calculate_metrics
+from .metrics_utils import calculate_metrics_batch, report_scores
+from .artifacts import save_model
+from .feature_store import resolve_features
+from telemetry import span
 
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print(" Training Birch...")
-    X_combined = pd.concat([X_train, X_test])
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
     
     # Birch needs a number of clusters (like KMeans) or None (subclusters)
     # We'll tune it similarly to KMeans
     best_score = -1
     best_model = None
+    best_k = None
+    best_labels = None
     best_metrics = {}
 
+    # The CF-tree does not depend on k: build it once, then only redo the
+    # global clustering step (agglomerative over the subclusters) per k.
+    model = Birch(n_clusters=None).fit(X_combined)
+    # With n_clusters=None every subcluster is its own label, so this is
+    # the nearest subcluster of every row (the same for all k)
+    nearest = model.predict(X_combined)
+
+    fitted = []
     for k in range(2, 11):
-        model = Birch(n_clusters=k)
-        labels = model.fit_predict(X_combined)
-        
-        metrics = calculate_metrics(X_combined, labels)
+        with span("model.sweep", data=X_combined, k=k) as s:
+            model.set_params(n_clusters=k)
+            model.partial_fit()
+            fitted.append((k, s.output(model.subcluster_labels_[nearest])))
+
+    # Score every k in one pass
+    all_metrics = calculate_metrics_batch(
+        X_combined, [labels for _, labels in fitted], distances=features.distances
+    )
+    report_scores("Birch", [{"k": k} for k, _ in fitted], all_metrics)
+    for (k, labels), metrics in zip(fitted, all_metrics):
         if metrics["silhouette_score"] > best_score:
             best_score = metrics["silhouette_score"]
-            best_model = model
+            best_k = k
+            best_labels = labels
             best_metrics = metrics
 
-    joblib.dump(best_model, save_path)
+    if best_k is not None:
+        # Re-run the global step for the winning k so the saved model predicts with it
+        model.set_params(n_clusters=best_k)
+        model.partial_fit()
+        model.labels_ = best_labels
+        best_model = model
+
+    save_model(best_model, save_path, feature_names=features.columns, metrics=best_metrics)
     return {"algo": "Birch", **best_metrics}
\ No newline at end of file
@@ -1,13 +1,27 @@
-import joblib
-import pandas as pd
 import numpy as np
 from sklearn.cluster import DBSCAN
-from .metrics_utils import calculate_metrics # Import the helper!
+from .metrics_utils import calculate_metrics, calculate_metrics_batch, report_scores # Import the helpers!
+from .artifacts import save_model
+from .feature_store import resolve_features
+from telemetry import span
 
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+def fit_dbscan(features, eps, min_samples=5, graph=None):
+    """
+    DBSCAN over the cached radius-neighbors graph (no new neighbor search),
+    or over `graph` when given, returned as the equivalent euclidean estimator.
+    """
+    if graph is None:
+        graph = features.distances.radius_graph(eps)
+    db = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit(graph)
+    db.metric = 'euclidean'
+    db.components_ = features.array[db.core_sample_indices_].copy()
+    return db
+
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print(" Training DBSCAN...")
     
-    X_combined = pd.concat([X_train, X_test])
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
     
     # DBSCAN is sensitive to 'eps'. We try a few values.
     eps_values = [0.3, 0.5, 0.7, 1.0, 1.5, 2.0]
@@ -22,38 +36,52 @@ def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, s
         "n_clusters": 0
     }
     
-    for eps in eps_values:
+    # One radius search at the largest eps; the smaller ones are filtered
+    # out of that graph instead of searching again
+    fitted = []
+    for eps, graph in features.distances.radius_graphs(eps_values):
         try:
-            db = DBSCAN(eps=eps, min_samples=5)
-            labels = db.fit_predict(X_combined)
+            with span("model.sweep", data=X_combined, eps=eps) as s:
+                db = fit_dbscan(features, eps, min_samples=5, graph=graph)
+                labels = s.output(db.labels_)
             
             # Check if we found valid clusters (>1 cluster, excluding noise)
             unique_labels = set(labels)
             if len(unique_labels) > 1:
-                
-                # Use the shared metrics calculator
-                metrics = calculate_metrics(X_combined, labels)
-                score = metrics["silhouette_score"]
-                
-                print(f"   Eps={eps}, Clusters={metrics['n_clusters']}, Score={score:.4f}")
-                
-                if isinstance(score, float) and score > best_score:
-                    best_score = score
-                    best_eps = eps
-                    best_model = db
-                    best_metrics = metrics
+                fitted.append((eps, db, labels))
                     
         except Exception as e:
             # print(f"   Error for eps={eps}: {e}")
             continue
+
+    # Use the shared metrics calculator (every eps in one pass)
+    all_metrics = calculate_metrics_batch(
+        X_combined, [labels for _, _, labels in fitted], distances=features.distances
+    )
+    report_scores("DBSCAN", [{"eps": eps} for eps, _, _ in fitted], all_metrics)
+
+    for (eps, db, _), metrics in zip(fitted, all_metrics):
+        score = metrics["silhouette_score"]
+        
+        print(f"   Eps={eps}, Clusters={metrics['n_clusters']}, Score={score:.4f}")
+        
+        if isinstance(score, float) and score > best_score:
+            best_score = score
+            best_eps = eps
+            best_model = db
+            best_metrics = metrics
     
     if best_model is None:
         print("   [WARNING] DBSCAN could not find valid clusters. Using default.")
-        best_model = DBSCAN(eps=0.5, min_samples=5).fit(X_combined)
+        best_model = fit_dbscan(features, 0.5, min_samples=5)
         # Try to calculate metrics one last time on default
-        best_metrics = calculate_metrics(X_combined, best_model.labels_)
+        best_metrics = calculate_metrics(X_combined, best_model.labels_, distances=features.distances)
 
-    joblib.dump(best_model, save_path)
+    # DBSCAN can't predict: new rows take the label of the nearest core sample within eps (else noise)
+    core = best_model.core_sample_indices_
+    save_model(best_model, save_path, feature_names=features.columns, metrics=best_metrics,
+               predictor_rows=X_combined[core], predictor_labels=best_model.labels_[core],
+               max_distance=best_model.eps)
     
     return {
         "algo": "DBSCAN", 
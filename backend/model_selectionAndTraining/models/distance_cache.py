@@ -0,0 +1,234 @@
+# backend/model_selectionAndTraining/models/distance_cache.py
+import os
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from sklearn.metrics import pairwise_distances
+from sklearn.metrics.pairwise import euclidean_distances
+from sklearn.neighbors import NearestNeighbors
+
+DEFAULT_BUDGET_MB = 1024
+
+
+def default_budget_bytes():
+    """Cache budget from PAPAD_DISTANCE_CACHE_MB (default 1 GB)."""
+    try:
+        mb = float(os.environ.get("PAPAD_DISTANCE_CACHE_MB", DEFAULT_BUDGET_MB))
+    except ValueError:
+        mb = DEFAULT_BUDGET_MB
+    return int(mb * 1024 * 1024)
+
+
+def _nbytes(value):
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    if hasattr(value, "data") and hasattr(value, "indices"):  # scipy sparse
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    return value.nbytes
+
+
+class DistanceCache:
+    """
+    Run-scoped cache of pairwise distances and neighbor graphs over the rows
+    of one FeatureMatrix, shared by the models and by calculate_metrics.
+
+    Blocks are addressed by metric and by `rows` (indices into the feature
+    matrix, None = every row), so a model fitted on a sample and the metrics
+    computed on that same sample hit the same entry. Entries are evicted in
+    LRU order to stay under the memory budget, and requests that could never
+    fit return None so the caller falls back to its own computation.
+
+    When the feature matrix lives in a run directory, computed entries are
+    published there too, so candidates in other worker processes memory-map
+    them instead of recomputing.
+    """
+
+    # Metrics derived from another metric's block when that one is already
+    # cached (instead of recomputing); otherwise computed directly. Either
+    # way the block is cached, budgeted and published like any other.
+    DERIVED = {"euclidean": ("sqeuclidean", np.sqrt)}
+
+    def __init__(self, features, budget_bytes=None):
+        self.features = features
+        self.budget = default_budget_bytes() if budget_bytes is None else budget_bytes
+        self.used = 0
+        self._entries = OrderedDict()  # key -> (rows, value)
+        self._memo = {}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def pairwise(self, metric="euclidean", rows=None):
+        """
+        Dense distance block between `rows` (None = all rows).
+        'sqeuclidean' and 'euclidean' match sklearn's euclidean_distances
+        (squared=True / False); any other name goes to pairwise_distances.
+        Returns None when the block does not fit in the budget.
+        """
+        n = self._n_rows(rows)
+        if n * n * 8 > self.budget:
+            return None
+
+        key = ("pairwise", metric, self.rows_key(rows))
+        hit = self._lookup(key)
+        if hit is not None:
+            return hit
+
+        # A cached block over a superset of these rows (e.g. the 5000-row
+        # sample when asking for the 2000-row one) only needs slicing.
+        block = self._slice_cached(metric, rows)
+        if block is not None:
+            return block
+
+        if metric in self.DERIVED:
+            base_metric, transform = self.DERIVED[metric]
+            base = self._lookup(("pairwise", base_metric, self.rows_key(rows)))
+            if base is not None:
+                return self._store(key, rows, lambda: transform(base))
+
+        return self._store(key, rows, lambda: self._compute_pairwise(metric, rows))
+
+    def radius_graph(self, radius, rows=None):
+        """
+        Sparse CSR graph of euclidean distances <= radius (self loops kept
+        as explicit zeros), as accepted by DBSCAN(metric='precomputed').
+        Served by filtering a cached graph of a larger radius when possible.
+        """
+        rows_key = self.rows_key(rows)
+        for key, (_, graph) in self._entries.items():
+            if key[0] == "radius" and key[2] == rows_key and key[1] >= radius:
+                self._entries.move_to_end(key)
+                return graph if key[1] == radius else _filter_graph(graph, radius)
+
+        key = ("radius", float(radius), rows_key)
+        return self._store(key, rows, lambda: self._compute_radius_graph(radius, rows))
+
+    def radius_graphs(self, radii, rows=None):
+        """
+        Yields (radius, graph) for every radius, all filtered from one graph
+        at the largest radius. That graph is held for the whole sweep, even
+        when it is too big to stay in the cache.
+        """
+        largest = max(radii)
+        graph = self.radius_graph(largest, rows)
+        for radius in radii:
+            yield radius, graph if radius == largest else _filter_graph(graph, radius)
+
+    def knn_graph(self, n_neighbors, rows=None):
+        """
+        (distances, indices) of the n_neighbors nearest rows of every row,
+        sorted by distance and including the row itself.
+        Served by slicing a cached graph with more neighbors when possible.
+        """
+        rows_key = self.rows_key(rows)
+        for key, (_, value) in self._entries.items():
+            if key[0] == "knn" and key[2] == rows_key and key[1] >= n_neighbors:
+                self._entries.move_to_end(key)
+                dist, ind = value
+                return dist[:, :n_neighbors], ind[:, :n_neighbors]
+
+        key = ("knn", int(n_neighbors), rows_key)
+        return self._store(key, rows, lambda: self._compute_knn_graph(n_neighbors, rows))
+
+    def memo(self, name, compute):
+        """
+        Small run-scoped results (e.g. the metrics of one labeling) keyed by
+        name. Kept for the whole run and shared between processes like the
+        distance blocks, but not counted against the budget.
+        """
+        if name not in self._memo:
+            self._memo[name] = self.features.load_or_compute(name, compute)
+        return self._memo[name]
+
+    def clear(self):
+        self._entries.clear()
+        self._memo.clear()
+        self.used = 0
+
+    # ------------------------------------------------------------------
+    # Computation
+    # ------------------------------------------------------------------
+    def _X(self, rows):
+        X = self.features.array
+        return X if rows is None else X[rows]
+
+    def _compute_pairwise(self, metric, rows):
+        X = self._X(rows)
+        if metric in ("sqeuclidean", "euclidean"):
+            return euclidean_distances(X, squared=metric == "sqeuclidean")
+        return pairwise_distances(X, metric=metric)
+
+    def _compute_radius_graph(self, radius, rows):
+        X = self._X(rows)
+        return NearestNeighbors(radius=radius).fit(X).radius_neighbors_graph(X, mode="distance")
+
+    def _compute_knn_graph(self, n_neighbors, rows):
+        X = self._X(rows)
+        n_neighbors = min(n_neighbors, len(X))
+        return NearestNeighbors(n_neighbors=n_neighbors).fit(X).kneighbors(X)
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+    def _n_rows(self, rows):
+        return len(self.features) if rows is None else len(rows)
+
+    @staticmethod
+    def rows_key(rows):
+        if rows is None:
+            return "all"
+        rows = np.ascontiguousarray(rows, dtype=np.int64)
+        return f"{len(rows)}-{hashlib.blake2b(rows.tobytes(), digest_size=8).hexdigest()}"
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _slice_cached(self, metric, rows):
+        if rows is None:
+            return None
+        rows = np.asarray(rows)
+        m = len(rows)
+        for key, (cached_rows, block) in self._entries.items():
+            if key[0] != "pairwise" or key[1] != metric:
+                continue
+            if cached_rows is None:
+                if m * m * 8 > self.budget - self.used:
+                    continue
+                self._entries.move_to_end(key)
+                return block[np.ix_(rows, rows)]
+            if len(cached_rows) >= m and np.array_equal(cached_rows[:m], rows):
+                self._entries.move_to_end(key)
+                return block[:m, :m]
+        return None
+
+    def _store(self, key, rows, compute):
+        name = "_".join(str(part) for part in key)
+        value = self.features.load_or_compute(name, compute)
+
+        size = _nbytes(value)
+        if size > self.budget:
+            # Too big to keep around; hand it out once
+            return value
+
+        while self._entries and self.used + size > self.budget:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.used -= _nbytes(evicted)
+
+        self._entries[key] = (None if rows is None else np.asarray(rows), value)
+        self.used += size
+        return value
+
+
+def _filter_graph(graph, radius):
+    """Keeps the entries of a radius graph that are <= radius (explicit zeros included)."""
+    graph = graph.tocsr()
+    keep = graph.data <= radius
+    kept_before = np.concatenate(([0], np.cumsum(keep, dtype=np.int64)))
+    new_indptr = kept_before[graph.indptr].astype(graph.indptr.dtype)
+    return type(graph)(
+        (graph.data[keep], graph.indices[keep], new_indptr), shape=graph.shape
+    )
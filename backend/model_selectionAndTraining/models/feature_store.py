@@ -0,0 +1,214 @@
+# backend/model_selectionAndTraining/models/feature_store.py
+import os
+import time
+import shutil
+import tempfile
+import joblib
+import numpy as np
+import pandas as pd
+from .distance_cache import DistanceCache
+
+
+class FeatureMatrix:
+    """
+    Read-only handle to the feature matrix of one training run.
+
+    The matrix is built once, stored as a contiguous float64 .npy file and
+    memory-mapped by every reader, so all candidates (including the ones
+    running in worker processes) share the same pages instead of each
+    rebuilding and copying X. Pickling the handle only sends the file path.
+    """
+
+    # How long a process waits for another one that is already computing
+    # a shared artifact before computing it itself
+    SHARED_WAIT_SECONDS = 120
+
+    def __init__(self, path=None, columns=None, array=None):
+        self.path = path
+        self.columns = list(columns) if columns is not None else []
+        self._array = array
+        self._distances = None
+
+    @classmethod
+    def from_frame(cls, X, run_dir=None):
+        """
+        Builds the matrix from a DataFrame (numeric + bool columns, NaN -> 0).
+        With run_dir=None the matrix stays in memory (used when a model is
+        trained directly, outside of model_handler.py).
+        """
+        numeric = X.select_dtypes(include=["number", "bool"])
+        dropped = [c for c in X.columns if c not in numeric.columns]
+        if dropped:
+            print(f"   [Features] Ignoring non-numeric columns: {dropped}")
+
+        values = np.ascontiguousarray(numeric.to_numpy(dtype=np.float64, na_value=0.0))
+
+        if run_dir is None:
+            return cls(columns=numeric.columns, array=values)
+
+        os.makedirs(run_dir, exist_ok=True)
+        path = os.path.join(run_dir, "features.npy")
+        np.save(path, values)
+        return cls(path=path, columns=numeric.columns)
+
+    @property
+    def array(self):
+        if self._array is None:
+            self._array = np.load(self.path, mmap_mode="r")
+        return self._array
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    @property
+    def run_dir(self):
+        return os.path.dirname(self.path) if self.path else None
+
+    @property
+    def distances(self):
+        """Run-scoped DistanceCache over the rows of this matrix."""
+        if self._distances is None:
+            self._distances = DistanceCache(self)
+        return self._distances
+
+    def __len__(self):
+        return self.array.shape[0]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_distances"] = None
+        if self.path is not None:
+            # Workers re-open the memmap instead of receiving a pickled copy
+            state["_array"] = None
+        return state
+
+    def subset(self, rows, name):
+        """
+        FeatureMatrix over some of the rows, stored in its own sub-directory
+        of the run (so it gets its own distance cache and shared artifacts).
+        """
+        values = np.ascontiguousarray(self.array[np.asarray(rows)])
+        if self.path is None:
+            return FeatureMatrix(columns=self.columns, array=values)
+
+        run_dir = os.path.join(self.run_dir, name)
+        os.makedirs(run_dir, exist_ok=True)
+        path = os.path.join(run_dir, "features.npy")
+        np.save(path, values)
+        return FeatureMatrix(path=path, columns=self.columns)
+
+    def load_or_compute(self, name, compute):
+        """
+        Returns a run-scoped artifact shared by every process of the run.
+        The first process to ask computes it and publishes it in the run
+        directory; the others memory-map the published file (waiting while
+        it is being written). In-memory matrices just compute it.
+        """
+        if self.path is None:
+            return compute()
+
+        shared_dir = os.path.join(self.run_dir, "shared")
+        os.makedirs(shared_dir, exist_ok=True)
+        path = os.path.join(shared_dir, f"{name}.joblib")
+        lock_path = path + ".lock"
+
+        if os.path.exists(path):
+            return joblib.load(path, mmap_mode="r")
+
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            deadline = time.time() + self.SHARED_WAIT_SECONDS
+            while time.time() < deadline:
+                if os.path.exists(path):
+                    return joblib.load(path, mmap_mode="r")
+                time.sleep(0.05)
+            # The owner is stuck or was killed; don't wait forever
+            return compute()
+        os.close(fd)
+
+        try:
+            value = compute()
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            joblib.dump(value, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+
+        # Hand out the memory-mapped copy so this process shares the pages too
+        del value
+        return joblib.load(path, mmap_mode="r")
+
+    def close(self):
+        """Releases the memmap and deletes the run directory."""
+        self._array = None
+        self._distances = None
+        if self.path is not None:
+            shutil.rmtree(self.run_dir, ignore_errors=True)
+
+
+def build_feature_matrix(X, run_dir=None):
+    """
+    Builds the shared feature matrix for a run in a fresh temp directory
+    (or in run_dir when given).
+    """
+    if run_dir is None:
+        run_dir = tempfile.mkdtemp(prefix="papad_run_")
+    return FeatureMatrix.from_frame(X, run_dir=run_dir)
+
+
+def resolve_features(X_train, X_test, features=None):
+    """
+    Returns the shared FeatureMatrix for a model's train() call.
+    Falls back to concatenating the train/test split when the caller did
+    not provide one.
+    """
+    if features is None:
+        features = FeatureMatrix.from_frame(pd.concat([X_train, X_test]))
+    return features
+
+
+def sample_indices(n_rows, size, random_state=42):
+    """
+    Row indices for a random sample without replacement.
+    Same rows as DataFrame.sample(size, random_state=random_state).
+    """
+    return np.random.RandomState(random_state).choice(n_rows, size, replace=False)
+
+
+def stratified_sample_indices(strata, size, random_state=42):
+    """
+    Sorted row indices of a sample without replacement that keeps the
+    proportions of `strata` (one stratum code per row). Every stratum keeps
+    at least one row.
+    """
+    strata = np.asarray(strata)
+    n_rows = len(strata)
+    if size >= n_rows:
+        return np.arange(n_rows)
+
+    rng = np.random.RandomState(random_state)
+    codes, inverse, counts = np.unique(strata, return_inverse=True, return_counts=True)
+
+    # Largest remainder allocation of `size` rows over the strata
+    quotas = counts * size / n_rows
+    alloc = np.maximum(np.floor(quotas).astype(int), 1)
+    alloc = np.minimum(alloc, counts)
+    remaining = size - alloc.sum()
+    if remaining > 0:
+        for i in np.argsort(-(quotas - np.floor(quotas)), kind="stable"):
+            if remaining == 0:
+                break
+            if alloc[i] < counts[i]:
+                alloc[i] += 1
+                remaining -= 1
+
+    picked = []
+    for i in range(len(codes)):
+        members = np.flatnonzero(inverse == i)
+        picked.append(rng.choice(members, alloc[i], replace=False))
+    return np.sort(np.concatenate(picked))
@@ -1,25 +1,36 @@
-import joblib
-import pandas as pd
 from sklearn.mixture import GaussianMixture
-from .metrics_utils import calculate_metrics
+from .metrics_utils import calculate_metrics_batch, report_scores
+from .artifacts import save_model
+from .feature_store import resolve_features
+from .k_sweep import warm_start_sweep
 
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print("Training Gaussian Mixture...")
-    X_combined = pd.concat([X_train, X_test])
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
     
     best_score = -1
     best_model = None
     best_metrics = {}
 
-    for k in range(2, 11):
-        model = GaussianMixture(n_components=k, random_state=42)
+    # Every k after the first starts EM from the previous means plus one new seed
+    def fit(k, init):
+        model = GaussianMixture(n_components=k, means_init=init, random_state=42)
         labels = model.fit_predict(X_combined)
-        
-        metrics = calculate_metrics(X_combined, labels)
+        return model, labels, model.means_
+
+    fitted = [(model, labels) for _, model, labels in warm_start_sweep(X_combined, range(2, 11), fit)]
+
+    # Score every k in one pass
+    all_metrics = calculate_metrics_batch(
+        X_combined, [labels for _, labels in fitted], distances=features.distances
+    )
+    report_scores("GaussianMixture", [{"k": model.n_components} for model, _ in fitted], all_metrics)
+    for (model, _), metrics in zip(fitted, all_metrics):
         if metrics["silhouette_score"] > best_score:
             best_score = metrics["silhouette_score"]
             best_model = model
             best_metrics = metrics
 
-    joblib.dump(best_model, save_path)
+    save_model(best_model, save_path, feature_names=features.columns, metrics=best_metrics)
     return {"algo": "GMM", **best_metrics}
\ No newline at end of file
@@ -1,20 +1,62 @@
-import joblib
-import pandas as pd
+import numpy as np
 from sklearn.cluster import AgglomerativeClustering
 # 1. Import the shared metrics utility
-from .metrics_utils import calculate_metrics 
+from .metrics_utils import calculate_metrics, calculate_metrics_batch, report_scores
+from .artifacts import save_model
+from .feature_store import resolve_features, sample_indices
+from .distance_cache import default_budget_bytes
+from telemetry import span
 
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+def max_rows_for_budget(budget_bytes=None):
+    """
+    Largest sample whose ward linkage fits in the memory budget: the linkage
+    keeps a condensed distance matrix of n * (n - 1) / 2 float64 values.
+    """
+    if budget_bytes is None:
+        budget_bytes = default_budget_bytes()
+    n_pairs = budget_bytes // 8
+    return max(2, int((1 + np.sqrt(1 + 8 * n_pairs)) // 2))
+
+def cut_tree(children, n_leaves, n_clusters):
+    """
+    Leaf labels of the full merge tree cut into n_clusters, i.e. the
+    partition AgglomerativeClustering(n_clusters=n_clusters) would return
+    (clusters may be numbered differently).
+    """
+    n_merges = len(children)
+    first_undone = n_merges - (n_clusters - 1)  # merges from here on are above the cut
+    labels = np.full(n_leaves + n_merges, -1, dtype=np.intp)
+    next_label = 0
+
+    # Walk the merges from the root down, handing each node its parent's label;
+    # the children of undone merges that are below the cut start new clusters.
+    for i in range(n_merges - 1, -1, -1):
+        node_label = labels[n_leaves + i]
+        for child in children[i]:
+            if i >= first_undone:
+                if child < n_leaves + first_undone:
+                    labels[child] = next_label
+                    next_label += 1
+            else:
+                labels[child] = node_label
+    return labels[:n_leaves]
+
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print("Training Hierarchical Clustering...")
     
     # Combine data to get a better global picture
-    X_combined = pd.concat([X_train, X_test])
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
 
-    # AgglomerativeClustering is computationally expensive (O(N^2) or O(N^3)).
-    # We MUST sample if the dataset is large, otherwise the UI will freeze for minutes.
-    if len(X_combined) > 5000:
-        print("   (Sampling data to 5000 rows for Hierarchical performance)")
-        X_sample = X_combined.sample(5000, random_state=42)
+    # AgglomerativeClustering is computationally expensive (O(N^2) time and memory).
+    # We MUST sample if the dataset is larger than the linkage memory budget,
+    # otherwise the UI will freeze for minutes (or run out of memory).
+    max_rows = max_rows_for_budget()
+    rows = None
+    if len(X_combined) > max_rows:
+        print(f"   (Sampling data to {max_rows} rows for Hierarchical performance)")
+        rows = sample_indices(len(X_combined), max_rows)
+        X_sample = X_combined[rows]
     else:
         X_sample = X_combined
     
@@ -27,32 +69,47 @@ def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, s
         "calinski_harabasz_score": "N/A"
     }
     
-    for k in range(2, 10):
-        try:
-            hc = AgglomerativeClustering(n_clusters=k)
-            labels = hc.fit_predict(X_sample)
-            
-            # 2. Use shared metrics calculator
-            metrics = calculate_metrics(X_sample, labels)
-            score = metrics["silhouette_score"]
-            
-            print(f"   K={k}, Silhouette={score:.4f}")
-            
-            if score > best_score:
-                best_score = score
-                best_k = k
-                best_model = hc
-                best_metrics = metrics
-        except Exception as e:
-            print(f"   Error for k={k}: {e}")
-            continue
+    # Build the full merge tree once; every k is just a different cut of it
+    fitted = []
+    try:
+        tree = AgglomerativeClustering(n_clusters=2, compute_full_tree=True).fit(X_sample)
+        for k in range(2, 10):
+            if k > len(X_sample):
+                break
+            with span("model.sweep", data=X_sample, k=k) as s:
+                fitted.append((k, s.output(cut_tree(tree.children_, tree.n_leaves_, k))))
+    except Exception as e:
+        print(f"   Error building the merge tree: {e}")
+
+    # 2. Use shared metrics calculator (one pass over every k)
+    all_metrics = calculate_metrics_batch(
+        X_sample, [labels for _, labels in fitted], distances=features.distances, rows=rows
+    )
+    report_scores("Hierarchical", [{"k": k} for k, _ in fitted], all_metrics)
+
+    for (k, labels), metrics in zip(fitted, all_metrics):
+        score = metrics["silhouette_score"]
+        
+        print(f"   K={k}, Silhouette={score:.4f}")
+        
+        if score > best_score:
+            best_score = score
+            best_k = k
+            best_metrics = metrics
+            # Save it as the model for the winning cut
+            tree.set_params(n_clusters=k)
+            tree.n_clusters_ = k
+            tree.labels_ = labels
+            best_model = tree
 
     # Fallback if loop failed completely
     if best_model is None:
         best_model = AgglomerativeClustering(n_clusters=2).fit(X_sample)
-        best_metrics = calculate_metrics(X_sample, best_model.labels_)
+        best_metrics = calculate_metrics(X_sample, best_model.labels_, distances=features.distances, rows=rows)
 
-    joblib.dump(best_model, save_path)
+    # AgglomerativeClustering can't predict: new rows take the label of the nearest sampled row
+    save_model(best_model, save_path, feature_names=features.columns, metrics=best_metrics,
+               predictor_rows=X_sample, predictor_labels=best_model.labels_)
     
     # 3. Return all metrics
     return {
@@ -1,45 +1,77 @@
-import joblib
-import pandas as pd
+import numpy as np
 from sklearn_extra.cluster import KMedoids
-from .metrics_utils import calculate_metrics
+from .metrics_utils import calculate_metrics_batch, report_scores
+from .artifacts import save_model
+from .feature_store import resolve_features, sample_indices
+from telemetry import span
 
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+def as_feature_model(model, X_fit):
+    """
+    A KMedoids fitted on precomputed distances can't predict on new rows.
+    Turn it back into the equivalent metric='manhattan' estimator.
+    """
+    model.metric = 'manhattan'
+    model.cluster_centers_ = X_fit[model.medoid_indices_].copy()
+    model.n_features_in_ = X_fit.shape[1]
+    return model
+
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print("Training K-Medoids...")
-    X_combined = pd.concat([X_train, X_test])
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
     
     # K-Medoids is computationally expensive (O(N^2)). 
     # If dataset is huge (>10k rows), we sample it for the training phase
     # to keep the UI responsive.
+    rows = None
     if len(X_combined) > 5000:
         print(f"   (Sampling data to 5000 rows for K-Medoids performance)")
-        X_train_fit = X_combined.sample(5000, random_state=42)
+        rows = sample_indices(len(X_combined), 5000)
+        X_train_fit = X_combined[rows]
     else:
         X_train_fit = X_combined
 
+    # PAM needs the full manhattan distance matrix; take it from the run's
+    # distance cache once instead of recomputing it for every k.
+    # (PAM's Cython kernel needs a writable buffer, the cached block is read-only)
+    D = features.distances.pairwise("manhattan", rows)
+    if D is not None:
+        D = np.array(D)
+
     best_score = -1
     best_model = None
     best_metrics = {}
 
     # Tuning K (2 to 10)
+    fitted = []
     for k in range(2, 11):
         try:
-            # metric='manhattan' is standard for K-Medoids (less sensitive to outliers)
-            # method='pam' is the classic accurate algorithm
-            model = KMedoids(n_clusters=k, metric='manhattan', method='pam', random_state=42)
-            
-            labels = model.fit_predict(X_train_fit)
-            
-            metrics = calculate_metrics(X_train_fit, labels)
-            
-            if metrics["silhouette_score"] > best_score:
-                best_score = metrics["silhouette_score"]
-                best_model = model
-                best_metrics = metrics
+            with span("model.sweep", data=X_train_fit, k=k) as s:
+                # metric='manhattan' is standard for K-Medoids (less sensitive to outliers)
+                # method='pam' is the classic accurate algorithm
+                if D is not None:
+                    model = KMedoids(n_clusters=k, metric='precomputed', method='pam', random_state=42)
+                    labels = model.fit_predict(D)
+                    model = as_feature_model(model, X_train_fit)
+                else:
+                    model = KMedoids(n_clusters=k, metric='manhattan', method='pam', random_state=42)
+                    labels = model.fit_predict(X_train_fit)
+                fitted.append((model, s.output(labels)))
         except Exception as e:
             print(f"   K-Medoids failed for k={k}: {e}")
             continue
 
+    all_metrics = calculate_metrics_batch(
+        X_train_fit, [labels for _, labels in fitted], distances=features.distances, rows=rows
+    )
+    report_scores("KMedoids", [{"k": model.n_clusters} for model, _ in fitted], all_metrics)
+    for (model, _), metrics in zip(fitted, all_metrics):
+        if metrics["silhouette_score"] > best_score:
+            best_score = metrics["silhouette_score"]
+            best_model = model
+            best_metrics = metrics
+
     # Save the best model
-    joblib.dump(best_model, save_path)
+    save_model(best_model, save_path, feature_names=features.columns, metrics=best_metrics)
     
     return {"algo": "KMedoids", **best_metrics}
\ No newline at end of file
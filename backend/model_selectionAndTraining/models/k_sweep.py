@@ -0,0 +1,60 @@
+# backend/model_selectionAndTraining/models/k_sweep.py
+import numpy as np
+from sklearn.metrics.pairwise import euclidean_distances
+from telemetry import span
+
+
+def add_center(X, centers, random_state=42, n_trials=None):
+    """
+    Returns `centers` plus one new seed picked like a k-means++ step:
+    a few candidate rows are drawn with probability proportional to their
+    squared distance to the closest center, and the one that lowers the
+    total squared distance the most is kept.
+    """
+    rng = np.random.RandomState(random_state)
+    k = len(centers) + 1
+    if n_trials is None:
+        n_trials = 2 + int(np.log(k))
+
+    closest = euclidean_distances(X, centers, squared=True).min(axis=1)
+    total = closest.sum()
+    if total <= 0:
+        # Every row already sits on a center; any row will do
+        candidates = rng.choice(len(X), n_trials)
+    else:
+        candidates = rng.choice(len(X), n_trials, p=closest / total)
+
+    cand_dists = euclidean_distances(X[candidates], X, squared=True)
+    potentials = np.minimum(cand_dists, closest).sum(axis=1)
+    best = candidates[np.argmin(potentials)]
+    return np.vstack([centers, X[best]])
+
+
+def warm_start_sweep(X, k_values, fit, random_state=42):
+    """
+    Runs `fit` for increasing k, warm-starting every k from the fitted
+    centers of the previous one plus one new seed (see add_center), so each
+    step only has to settle one extra cluster instead of starting over.
+
+    `fit(k, init)` gets init=None for the first k (cold start) and returns
+    (model, labels, centers). Yields (k, model, labels).
+    A failed k is reported and the next one starts cold again.
+    """
+    centers = None
+    prev_k = None
+    for k in k_values:
+        init = None
+        if centers is not None and prev_k == k - 1:
+            init = add_center(X, centers, random_state=random_state + k)
+
+        try:
+            with span("model.sweep", data=X, k=k, warm_start=init is not None) as s:
+                model, labels, centers = fit(k, init)
+                s.output(labels)
+        except Exception as e:
+            print(f"   [WARNING] K={k} failed: {e}")
+            centers = None
+            continue
+
+        prev_k = k
+        yield k, model, labels
@@ -1,29 +1,43 @@
-import joblib
-import pandas as pd
 from sklearn.cluster import KMeans
 # 1. Import the shared metrics utility instead of just silhouette_score
-from .metrics_utils import calculate_metrics 
+from .metrics_utils import calculate_metrics_batch, report_scores
+from .artifacts import save_model
+from .feature_store import resolve_features
+from .k_sweep import warm_start_sweep
 import os
 
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print(" Training K-Means (finding optimal K)...")
     
     # Combine train/test for better clustering (Unsupervised doesn't strictly need split)
-    X_combined = pd.concat([X_train, X_test])
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
     
     best_score = -1
     best_k = 2
     best_model = None
     best_metrics = {} # 2. Initialize dictionary to store the full metrics of the best run
     
-    # Try K from 2 to 10
-    for k in range(2, 11):
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+    # Try K from 2 to 10. Only K=2 gets the full n_init=10 restarts; every
+    # next K starts from the previous centroids plus one new seed.
+    def fit(k, init):
+        if init is None:
+            kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+        else:
+            kmeans = KMeans(n_clusters=k, init=init, n_init=1, random_state=42)
         labels = kmeans.fit_predict(X_combined)
-        
+        return kmeans, labels, kmeans.cluster_centers_
+
+    fitted = list(warm_start_sweep(X_combined, range(2, 11), fit))
+
+    # 3. Score every K in one batch to get SIL, DBI, and CHI
+    all_metrics = calculate_metrics_batch(
+        X_combined, [labels for _, _, labels in fitted], distances=features.distances
+    )
+    report_scores("KMeans", [{"k": k} for k, _, _ in fitted], all_metrics)
+
+    for (k, kmeans, _), metrics in zip(fitted, all_metrics):
         try:
-            # 3. Use the shared function to get SIL, DBI, and CHI
-            metrics = calculate_metrics(X_combined, labels)
             score = metrics["silhouette_score"]
             
             print(f"   K={k}, Silhouette={score:.4f}")
@@ -39,7 +53,7 @@ def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, s
 
     print(f"Best K-Means: K={best_k} (Score: {best_score:.4f})")
 
-    joblib.dump(best_model, save_path)
+    save_model(best_model, save_path, feature_names=features.columns, metrics=best_metrics)
     
     # 5. Return the full metrics using spread syntax
     return {
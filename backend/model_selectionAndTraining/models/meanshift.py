@@ -1,11 +1,32 @@
-import joblib
-import pandas as pd
-from sklearn.cluster import MeanShift, estimate_bandwidth
-from .metrics_utils import calculate_metrics
+import numpy as np
+from sklearn.cluster import MeanShift
+from .metrics_utils import calculate_metrics, calculate_metrics_batch, report_scores
+from .artifacts import save_model
+from .feature_store import resolve_features
+from telemetry import span
 
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+def estimate_bandwidths(features, quantiles, n_samples=500):
+    """
+    Same values as sklearn's estimate_bandwidth(X, quantile=q, n_samples=500)
+    for every q, but read off one cached kNN graph of the sampled rows
+    instead of refitting a neighbors model per quantile.
+    """
+    rows = np.random.RandomState(0).permutation(len(features))[:n_samples]
+    counts = {q: max(1, int(len(rows) * q)) for q in quantiles}
+
+    # Ask for the largest neighborhood first so the smaller ones are slices of it
+    features.distances.knn_graph(max(counts.values()), rows=rows)
+
+    bandwidths = {}
+    for q, n_neighbors in counts.items():
+        dist, _ = features.distances.knn_graph(n_neighbors, rows=rows)
+        bandwidths[q] = np.max(dist, axis=1).sum() / len(rows)
+    return bandwidths
+
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print("Training MeanShift (Auto-Tuning)...")
-    X_combined = pd.concat([X_train, X_test])
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
     
     # Try different quantiles to find a bandwidth that creates > 1 cluster
     quantiles_to_try = [0.1, 0.15, 0.2, 0.25, 0.3]
@@ -20,46 +41,56 @@ def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, s
     }
     
     found_valid_model = False
+    bandwidths = estimate_bandwidths(features, quantiles_to_try)
 
+    fitted = []
     for q in quantiles_to_try:
         try:
-            # 1. Estimate bandwidth
-            bandwidth = estimate_bandwidth(X_combined, quantile=q, n_samples=500)
+            with span("model.sweep", data=X_combined, quantile=q) as s:
+                # 1. Estimate bandwidth
+                bandwidth = bandwidths[q]
             
-            if bandwidth is None or bandwidth <= 0:
-                continue
+                if bandwidth is None or bandwidth <= 0:
+                    continue
                 
-            # 2. Train Model
-            model = MeanShift(bandwidth=bandwidth, bin_seeding=True)
-            labels = model.fit_predict(X_combined)
+                # 2. Train Model
+                model = MeanShift(bandwidth=bandwidth, bin_seeding=True)
+                labels = s.output(model.fit_predict(X_combined))
             
-            # 3. Check Cluster Count
-            n_clusters = len(set(labels))
-            if n_clusters < 2 or n_clusters > len(X_combined) - 1:
-                continue # Skip valid but useless results (1 cluster or N clusters)
+                # 3. Check Cluster Count
+                n_clusters = len(set(labels))
+                if n_clusters < 2 or n_clusters > len(X_combined) - 1:
+                    continue # Skip valid but useless results (1 cluster or N clusters)
 
-            # 4. Calculate Score
-            metrics = calculate_metrics(X_combined, labels)
-            score = metrics["silhouette_score"]
-            
-            print(f"   > Quantile={q}, Bandwidth={bandwidth:.4f}, Clusters={n_clusters}, Score={score:.4f}")
-            
-            if isinstance(score, float) and score > best_score:
-                best_score = score
-                best_model = model
-                best_metrics = metrics
-                found_valid_model = True
+                fitted.append((q, bandwidth, n_clusters, model, labels))
 
         except Exception as e:
             # print(f"   Error for q={q}: {e}")
             continue
 
+    # 4. Calculate Scores (all quantiles in one pass)
+    all_metrics = calculate_metrics_batch(
+        X_combined, [labels for *_, labels in fitted], distances=features.distances
+    )
+    report_scores("MeanShift", [{"quantile": q, "bandwidth": bandwidth} for q, bandwidth, *_ in fitted], all_metrics)
+
+    for (q, bandwidth, n_clusters, model, _), metrics in zip(fitted, all_metrics):
+        score = metrics["silhouette_score"]
+        
+        print(f"   > Quantile={q}, Bandwidth={bandwidth:.4f}, Clusters={n_clusters}, Score={score:.4f}")
+        
+        if isinstance(score, float) and score > best_score:
+            best_score = score
+            best_model = model
+            best_metrics = metrics
+            found_valid_model = True
+
     # Fallback if loop failed to find a good split
     if not found_valid_model or best_model is None:
         print("   [WARNING] MeanShift could not find valid clusters. Using default.")
         best_model = MeanShift().fit(X_combined)
-        best_metrics = calculate_metrics(X_combined, best_model.labels_)
+        best_metrics = calculate_metrics(X_combined, best_model.labels_, distances=features.distances)
 
-    joblib.dump(best_model, save_path)
+    save_model(best_model, save_path, feature_names=features.columns, metrics=best_metrics)
     
     return {"algo": "MeanShift", **best_metrics}
\ No newline at end of file
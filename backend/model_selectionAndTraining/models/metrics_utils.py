@@ -1,21 +1,112 @@
 # backend/model_selectionAndTraining/models/metrics_utils.py
+import hashlib
 from sklearn.metrics import silhouette_score, davies_bouldin_score, calinski_harabasz_score
+from sklearn.metrics.pairwise import euclidean_distances
 import numpy as np
+from .feature_store import sample_indices
+from .distance_cache import default_budget_bytes
+from progress_events import emit
+from telemetry import traced
 
-def calculate_metrics(X, labels):
+SILHOUETTE_MAX_ROWS = 10000
+
+def calculate_metrics(X, labels, distances=None, rows=None):
     """
     Calculates Clustering Metrics:
     1. Silhouette Coefficient (SIL) [-1 to 1, higher is better]
     2. Davies-Bouldin Index (DBI) [0 to infinity, lower is better]
     3. Calinski-Harabasz Index (CHI) [higher is better]
+
+    `distances` is the run's DistanceCache and `rows` the indices of X in the
+    feature matrix (None = all rows). When given, the silhouette reuses the
+    cached distance block instead of recomputing every pairwise distance.
+    """
+    return calculate_metrics_batch(X, [labels], distances=distances, rows=rows)[0]
+
+@traced("metrics.calculate")
+def calculate_metrics_batch(X, labelings, distances=None, rows=None):
+    """
+    Same metrics as calculate_metrics for several labelings of the same X
+    (e.g. one per k), returned in the same order.
+
+    Everything that only depends on X is prepared once for the whole batch:
+    the silhouette sample and its distance block. Labelings describing the
+    same partition (only the cluster numbers differ) are scored once; with a
+    DistanceCache the scores are also remembered for the rest of the run, so
+    a partition already scored by another candidate is not scored again.
+    """
+    X = np.asarray(X)
+    labelings = [canonical_labels(labels) for labels in labelings]
+
+    # 1. Silhouette sample (seeded, so every batch samples the same rows and
+    #    hits the same cached distance block)
+    if len(X) > SILHOUETTE_MAX_ROWS:
+        sil_indices = sample_indices(len(X), SILHOUETTE_MAX_ROWS)
+        rows_sil = sil_indices if rows is None else np.asarray(rows)[sil_indices]
+    else:
+        sil_indices, rows_sil = None, rows
+
+    block = None
+    prepared = False
+
+    def silhouette_block():
+        # Fetched lazily: a batch of degenerate labelings needs no distances
+        nonlocal block, prepared
+        if not prepared:
+            prepared = True
+            if distances is not None:
+                block = distances.pairwise("euclidean", rows_sil)
+            elif len(labelings) > 1:
+                n_sil = len(X) if sil_indices is None else len(sil_indices)
+                if n_sil * n_sil * 8 <= default_budget_bytes():
+                    X_sil = X if sil_indices is None else X[sil_indices]
+                    block = euclidean_distances(X_sil)
+        return block
+
+    def score(labels):
+        return _score_labeling(X, labels, sil_indices, silhouette_block)
+
+    results = {}
+    out = []
+    for labels in labelings:
+        key = labeling_key(labels)
+        if key not in results:
+            if distances is not None:
+                name = f"metrics_{distances.rows_key(rows)}_{key}"
+                results[key] = distances.memo(name, lambda: score(labels))
+            else:
+                results[key] = score(labels)
+        out.append(dict(results[key]))
+    return out
+
+def report_scores(algorithm, params, all_metrics):
+    """Streams one "score" event per hyperparameter setting a model tried."""
+    for setting, metrics in zip(params, all_metrics):
+        emit("score", algorithm=algorithm, params=setting, metrics=metrics)
+
+def canonical_labels(labels):
+    """
+    Renumbers the clusters in order of first appearance. Every metric here
+    only depends on the partition, so equal partitions get equal vectors.
     """
+    labels = np.asarray(labels)
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    order = np.empty(len(first), dtype=np.int64)
+    order[np.argsort(first, kind="stable")] = np.arange(len(first))
+    return order[inverse.ravel()]
+
+def labeling_key(labels):
+    """Short hash of a canonical label vector."""
+    labels = np.ascontiguousarray(labels, dtype=np.int64)
+    return hashlib.blake2b(labels.tobytes(), digest_size=16).hexdigest()
+
+def _score_labeling(X, labels, sil_indices, silhouette_block):
     # Filter out noise (-1) for density models like DBSCAN/OPTICS if needed,
     # but standard practice often includes them to penalize noise.
     # However, sklearn metrics require at least 2 clusters and size > n_clusters.
-    
-    unique_labels = set(labels)
-    n_clusters = len(unique_labels) - (1 if -1 in unique_labels else 0)
-    
+
+    unique_labels = set(labels.tolist())
+
     metrics = {
         "silhouette_score": 0,
         "davies_bouldin_score": 0,
@@ -28,21 +119,22 @@ def calculate_metrics(X, labels):
         return metrics
 
     try:
-        # 1. Silhouette (Computationally expensive on large data, sample if needed)
-        if len(X) > 10000:
-            # Sampling for speed
-            indices = np.random.choice(len(X), 10000, replace=False)
-            metrics["silhouette_score"] = silhouette_score(X.iloc[indices], labels[indices])
+        # 1. Silhouette (Computationally expensive on large data, sampled if needed)
+        labels_sil = labels if sil_indices is None else labels[sil_indices]
+        block = silhouette_block()
+        if block is not None:
+            metrics["silhouette_score"] = silhouette_score(block, labels_sil, metric="precomputed")
         else:
-            metrics["silhouette_score"] = silhouette_score(X, labels)
+            X_sil = X if sil_indices is None else X[sil_indices]
+            metrics["silhouette_score"] = silhouette_score(X_sil, labels_sil)
 
         # 2. Davies-Bouldin
         metrics["davies_bouldin_score"] = davies_bouldin_score(X, labels)
 
         # 3. Calinski-Harabasz
         metrics["calinski_harabasz_score"] = calinski_harabasz_score(X, labels)
-        
+
     except Exception as e:
         print(f"[Metrics Error] {e}")
 
-    return metrics
\ No newline at end of file
+    return metrics
@@ -1,58 +1,62 @@
-import pickle
-import pandas as pd
 from sklearn.cluster import MiniBatchKMeans
-from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
+from .metrics_utils import calculate_metrics_batch, report_scores
+from .artifacts import save_model
+from .feature_store import resolve_features
+from .k_sweep import warm_start_sweep
 
-# Helper to calculate metrics inline (safest approach)
-def calculate_metrics(X, labels):
-    try:
+# Helper mapping the shared metrics to this model's keys (safest approach)
+def calculate_metrics(X, labelings, distances=None):
+    results = []
+    for labels, metrics in zip(labelings, calculate_metrics_batch(X, labelings, distances=distances)):
         # Silhouette requires at least 2 clusters and < N samples
         if len(set(labels)) < 2 or len(set(labels)) >= len(X):
-            return {"silhouette": -1, "calinski": 0, "davies": 10}
-            
-        sil = silhouette_score(X, labels)
-        ch = calinski_harabasz_score(X, labels)
-        db = davies_bouldin_score(X, labels)
-        return {"silhouette": sil, "calinski": ch, "davies": db}
-    except:
-        return {"silhouette": -1, "calinski": 0, "davies": 10}
-
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+            results.append({"silhouette": -1, "calinski": 0, "davies": 10})
+            continue
+        results.append({
+            "silhouette": metrics["silhouette_score"],
+            "calinski": metrics["calinski_harabasz_score"],
+            "davies": metrics["davies_bouldin_score"],
+        })
+    return results
+
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print("Training MiniBatch KMeans...")
     
-    # Combine for clustering (Unsupervised uses all data usually)
-    X_combined = pd.concat([X_train, X_test])
-    
-    # Ensure numeric
-    X_combined = X_combined.select_dtypes(include=['number']).fillna(0)
+    # Shared feature matrix of the whole dataset (already numeric, NaN filled)
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
 
     best_score = -1
     best_model = None
     best_metrics = {}
     
     # Auto-tune K (2 to 10)
-    for k in range(2, 11):
-        try:
+    # Every K after the first starts from the previous centroids plus one new seed
+    def fit(k, init):
+        if init is None:
             model = MiniBatchKMeans(n_clusters=k, random_state=42, batch_size=256, n_init='auto')
-            labels = model.fit_predict(X_combined)
-            
-            metrics = calculate_metrics(X_combined, labels)
-            
-            # Maximize Silhouette Score
-            if metrics["silhouette"] > best_score:
-                best_score = metrics["silhouette"]
-                best_model = model  # <--- SAVE THE OBJECT, NOT THE LABELS
-                best_metrics = metrics
-        except Exception as e:
-            print(f"   [WARNING] K={k} failed: {e}")
-            continue
+        else:
+            model = MiniBatchKMeans(n_clusters=k, init=init, random_state=42, batch_size=256, n_init=1)
+        labels = model.fit_predict(X_combined)
+        return model, labels, model.cluster_centers_
+
+    fitted = [(model, labels) for _, model, labels in warm_start_sweep(X_combined, range(2, 11), fit)]
+
+    all_metrics = calculate_metrics(X_combined, [labels for _, labels in fitted], distances=features.distances)
+    report_scores("MiniBatchKMeans", [{"k": model.n_clusters} for model, _ in fitted], all_metrics)
+
+    for (model, _), metrics in zip(fitted, all_metrics):
+        # Maximize Silhouette Score
+        if metrics["silhouette"] > best_score:
+            best_score = metrics["silhouette"]
+            best_model = model  # <--- SAVE THE OBJECT, NOT THE LABELS
+            best_metrics = metrics
 
     if best_model is None:
         raise Exception("MiniBatch KMeans failed to converge for any K.")
 
-    # --- USE PICKLE TO SAVE (Matches Output Handler) ---
-    with open(save_path, 'wb') as f:
-        pickle.dump(best_model, f)
+    # --- Same artifact format as every other model (read by the Output Handler) ---
+    save_model(best_model, save_path, feature_names=features.columns, metrics=best_metrics)
         
     print(f"   -> Best K={best_model.n_clusters} (Silhouette={best_score:.4f})")
 
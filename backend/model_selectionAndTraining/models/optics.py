@@ -1,12 +1,68 @@
-import joblib
-import pandas as pd
+import copy
 import numpy as np
-from sklearn.cluster import OPTICS
-from .metrics_utils import calculate_metrics
+from sklearn.cluster import OPTICS, cluster_optics_xi
+from .metrics_utils import calculate_metrics, calculate_metrics_batch, report_scores
+from .artifacts import save_model
+from .feature_store import resolve_features, stratified_sample_indices
+from telemetry import span
 
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+# Reference rows kept for the nearest-neighbor predictor (a sample that keeps
+# every cluster's share, noise included)
+PREDICTOR_ROWS = 2000
+
+def fit_optics(features, **params):
+    """
+    OPTICS over the cached euclidean distance matrix when it fits in the
+    cache budget (no per-point neighbor queries), saved as the equivalent
+    minkowski (p=2) estimator.
+    """
+    D = features.distances.pairwise("euclidean")
+    if D is None:
+        return OPTICS(**params).fit(features.array)
+
+    model = OPTICS(metric='precomputed', **params).fit(D)
+    model.metric = 'minkowski'
+    return model
+
+def fit_optics_grid(features, param_grid, **params):
+    """
+    Fits every (min_samples, xi) of the grid, returned as (params, model)
+    pairs in grid order (failed combinations are skipped). The reachability
+    graph only depends on min_samples, so it is computed once per
+    min_samples and the clusters for the other xi values are extracted from
+    that same ordering.
+    """
+    fitted = []
+    graphs = {}
+    for grid_params in param_grid:
+        try:
+            with span("model.sweep", data=features.array, **grid_params) as s:
+                base = graphs.get(grid_params['min_samples'])
+                if base is None:
+                    model = fit_optics(features, **grid_params, **params)
+                    graphs[grid_params['min_samples']] = model
+                else:
+                    model = copy.copy(base)
+                    model.set_params(xi=grid_params['xi'])
+                    model.labels_, model.cluster_hierarchy_ = cluster_optics_xi(
+                        reachability=model.reachability_,
+                        predecessor=model.predecessor_,
+                        ordering=model.ordering_,
+                        min_samples=model.min_samples,
+                        min_cluster_size=model.min_cluster_size,
+                        xi=model.xi,
+                        predecessor_correction=model.predecessor_correction,
+                    )
+                s.output(model.labels_)
+                fitted.append((grid_params, model))
+        except Exception as e:
+            continue
+    return fitted
+
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print("Training OPTICS (Auto-Tuning)...")
-    X_combined = pd.concat([X_train, X_test])
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
     
     # OPTICS is sensitive. We need to try different 'min_samples' and 'xi'.
     # min_samples: How many points make a cluster?
@@ -30,36 +86,38 @@ def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, s
     
     found_valid_model = False
 
-    for params in param_grid:
-        try:
-            model = OPTICS(
-                min_samples=params['min_samples'], 
-                xi=params['xi'], 
-                n_jobs=-1 # Use all CPU cores
-            )
-            labels = model.fit_predict(X_combined)
-            
-            # Calculate metrics
-            metrics = calculate_metrics(X_combined, labels)
-            score = metrics["silhouette_score"]
-            
-            # We only care if we found valid clusters (> 1 cluster, and not just errors)
-            if isinstance(score, float) and score > best_score:
-                print(f"   > Found better config: {params} -> Score: {score:.4f}")
-                best_score = score
-                best_model = model
-                best_metrics = metrics
-                found_valid_model = True
-        except Exception as e:
-            continue
+    fitted = [
+        (params, model, model.labels_)
+        for params, model in fit_optics_grid(features, param_grid, n_jobs=-1) # Use all CPU cores
+    ]
+
+    # Calculate metrics (whole grid in one pass)
+    all_metrics = calculate_metrics_batch(
+        X_combined, [labels for _, _, labels in fitted], distances=features.distances
+    )
+    report_scores("OPTICS", [params for params, _, _ in fitted], all_metrics)
+
+    for (params, model, _), metrics in zip(fitted, all_metrics):
+        score = metrics["silhouette_score"]
+        
+        # We only care if we found valid clusters (> 1 cluster, and not just errors)
+        if isinstance(score, float) and score > best_score:
+            print(f"   > Found better config: {params} -> Score: {score:.4f}")
+            best_score = score
+            best_model = model
+            best_metrics = metrics
+            found_valid_model = True
 
     # Fallback: If grid search failed to find ANY valid cluster split, 
     # train a default one just so the pipeline doesn't crash.
     if not found_valid_model or best_model is None:
         print("   [WARNING] OPTICS could not find valid clusters with grid search. Using default.")
-        best_model = OPTICS(min_samples=5).fit(X_combined)
-        best_metrics = calculate_metrics(X_combined, best_model.labels_)
+        best_model = fit_optics(features, min_samples=5)
+        best_metrics = calculate_metrics(X_combined, best_model.labels_, distances=features.distances)
 
-    joblib.dump(best_model, save_path)
+    # OPTICS can't predict: new rows take the label of the nearest reference row
+    reference = stratified_sample_indices(best_model.labels_, PREDICTOR_ROWS)
+    save_model(best_model, save_path, feature_names=features.columns, metrics=best_metrics,
+               predictor_rows=X_combined[reference], predictor_labels=best_model.labels_[reference])
     
     return {"algo": "OPTICS", **best_metrics}
\ No newline at end of file
@@ -1,37 +1,62 @@
-import joblib
-import pandas as pd
+import numpy as np
 from sklearn.cluster import SpectralClustering
-from .metrics_utils import calculate_metrics
+from .metrics_utils import calculate_metrics_batch, report_scores
+from .artifacts import save_model
+from .feature_store import resolve_features, sample_indices
+from telemetry import span
 
-def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path):
+def train(X_train, y_train, X_test, y_test, train_path, test_path, target_col, save_path, features=None):
     print(" Training Spectral Clustering...")
-    X_combined = pd.concat([X_train, X_test])
+    features = resolve_features(X_train, X_test, features)
+    X_combined = features.array
     
     # Sampling if data is huge (Spectral is heavy on memory)
+    rows = None
     if len(X_combined) > 2000:
         print("   (Sampling data to 2000 rows for Spectral Clustering performance)")
-        X_train_fit = X_combined.sample(2000, random_state=42)
+        rows = sample_indices(len(X_combined), 2000)
+        X_train_fit = X_combined[rows]
     else:
         X_train_fit = X_combined
 
+    # Default 'rbf' affinity (gamma=1): exp(-||x - y||^2). Build it once from
+    # the cached squared distances instead of once per k.
+    sq_dists = features.distances.pairwise("sqeuclidean", rows)
+    affinity = np.exp(-sq_dists) if sq_dists is not None else None
+
     best_score = -1
     best_model = None
     best_metrics = {}
     
     # Tuning K
+    fitted = []
     for k in range(2, 8):
-        # assign_labels='discretize' is often more stable
-        model = SpectralClustering(n_clusters=k, assign_labels='discretize', random_state=42)
-        labels = model.fit_predict(X_train_fit)
-        
-        metrics = calculate_metrics(X_train_fit, labels)
+        with span("model.sweep", data=X_train_fit, k=k) as s:
+            # assign_labels='discretize' is often more stable
+            model = SpectralClustering(n_clusters=k, assign_labels='discretize', random_state=42)
+            if affinity is not None:
+                model.set_params(affinity='precomputed')
+                labels = model.fit_predict(affinity)
+                # Save it as the plain rbf model (and without the n x n affinity matrix)
+                model.set_params(affinity='rbf')
+                del model.affinity_matrix_
+            else:
+                labels = model.fit_predict(X_train_fit)
+            fitted.append((model, s.output(labels)))
+
+    all_metrics = calculate_metrics_batch(
+        X_train_fit, [labels for _, labels in fitted], distances=features.distances, rows=rows
+    )
+    report_scores("SpectralClustering", [{"k": model.n_clusters} for model, _ in fitted], all_metrics)
+    for (model, _), metrics in zip(fitted, all_metrics):
         if metrics["silhouette_score"] > best_score:
             best_score = metrics["silhouette_score"]
             best_model = model
             best_metrics = metrics
 
     # NOTE: Spectral models cannot simple 'predict' on new data later. 
-    # But we save it anyway for consistency.
-    joblib.dump(best_model, save_path)
+    # The artifact carries a nearest-training-row predictor the output scripts use instead.
+    save_model(best_model, save_path, feature_names=features.columns, metrics=best_metrics,
+               predictor_rows=X_train_fit, predictor_labels=best_model.labels_)
     
     return {"algo": "SpectralClustering", **best_metrics}
\ No newline at end of file
@@ -0,0 +1,148 @@
+# backend/model_selectionAndTraining/models/train_cache.py
+import os
+import glob
+import json
+import hashlib
+import numpy as np
+from .artifacts import artifact_path, copy_artifact, _jsonable
+from .distance_cache import default_budget_bytes
+from disk_cache import DiskCache
+from telemetry import span
+
+# Persistent cache of trained models, so re-running the same processed
+# dataset skips training. An entry is keyed by:
+#
+#   - a hash of the feature matrix (values + column names)
+#   - the algorithm (script name)
+#   - a hash of the training code in models/ (the hyperparameter grids live
+#     there, so changing a grid or a shared helper invalidates old entries)
+#   - the distance cache budget (PAPAD_DISTANCE_CACHE_MB): it sets the
+#     hierarchical sample size and whether optics, spectral, k_medoids and
+#     affinity_propagation fit on precomputed distances or their fallback
+#   - the numpy, scikit-learn and scikit-learn-extra versions
+#
+# and holds the model artifact plus the metrics train() returned:
+#
+#   training_cache/<key>/model.model.json, model.model.bin, metrics.json
+#
+# Entries are evicted least-recently-used first once the cache grows past
+# PAPAD_TRAIN_CACHE_MB. PAPAD_TRAIN_CACHE=0 turns the cache off. (The entry
+# handling itself is disk_cache.DiskCache.)
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "training_cache")
+DEFAULT_CACHE_MB = 1024
+HASH_CHUNK_ROWS = 65536
+
+# Libraries the models are fitted with (part of the key)
+FITTING_PACKAGES = ("numpy", "scikit-learn", "scikit-learn-extra")
+
+CACHE = DiskCache("TRAIN", CACHE_DIR, DEFAULT_CACHE_MB, "metrics.json")
+
+_code_hash = None
+
+
+def feature_hash(features):
+    """Hash of the feature matrix values and column names (computed once per run)."""
+    def compute():
+        X = features.array
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps([str(c) for c in features.columns]).encode())
+        h.update(str(X.shape).encode())
+        for start in range(0, len(X), HASH_CHUNK_ROWS):
+            h.update(np.ascontiguousarray(X[start:start + HASH_CHUNK_ROWS]).tobytes())
+        return h.hexdigest()
+
+    return str(features.load_or_compute("feature_hash", compute))
+
+
+def code_hash():
+    """Hash of the training code in models/ (every module, in name order)."""
+    global _code_hash
+    if _code_hash is None:
+        h = hashlib.blake2b(digest_size=16)
+        models_dir = os.path.dirname(os.path.abspath(__file__))
+        for path in sorted(glob.glob(os.path.join(models_dir, "*.py"))):
+            h.update(os.path.basename(path).encode())
+            with open(path, "rb") as f:
+                h.update(f.read())
+        _code_hash = h.hexdigest()
+    return _code_hash
+
+
+def library_versions():
+    """"name=version" of every FITTING_PACKAGES entry ("name=-" when not installed)."""
+    from importlib import metadata
+
+    versions = []
+    for package in FITTING_PACKAGES:
+        try:
+            versions.append(f"{package}={metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{package}=-")
+    return ",".join(versions)
+
+
+def cache_key(features, script_name):
+    budgets = f"{default_budget_bytes()},{features.distances.budget}"
+    h = hashlib.blake2b(digest_size=20)
+    for part in (feature_hash(features), script_name, code_hash(), budgets, library_versions()):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def load(key, save_path):
+    """
+    On a hit copies the cached artifact to save_path and returns the cached
+    metrics; returns None on a miss.
+    """
+    try:
+        with open(CACHE.marker_path(key)) as f:
+            metrics = json.load(f)
+        copy_artifact(os.path.join(CACHE.entry(key), "model"), save_path)
+    except (OSError, ValueError):
+        return None
+
+    CACHE.touch(key)
+    return metrics
+
+
+def store(key, save_path, metrics):
+    """Adds a trained model to the cache (best effort)."""
+    def write(tmp_entry):
+        copy_artifact(save_path, os.path.join(tmp_entry, "model"))
+        with open(os.path.join(tmp_entry, "metrics.json"), "w") as f:
+            json.dump(_jsonable(metrics), f)
+
+    if CACHE.store(key, write, "trained model", errors=(OSError, TypeError)):
+        CACHE.evict()
+
+
+def cached_train(script_name, save_path, features, train):
+    """
+    Returns train()'s metrics, or the cached ones (with the cached model
+    copied to save_path) when this algorithm already ran on the same features.
+    """
+    data = features.array if features is not None else None
+    label = "train_" + os.path.basename(save_path).split(".")[0]
+    with span("model.train", data=data, profile=label, model=script_name, cache="off") as s:
+        if features is None or not CACHE.enabled():
+            return train()
+
+        save_path = artifact_path(save_path)
+        try:
+            key = cache_key(features, script_name)
+        except Exception as e:
+            print(f"   [WARNING] Training cache unavailable: {e}")
+            return train()
+
+        metrics = load(key, save_path)
+        if metrics is not None:
+            print(f"   [CACHE] {script_name}: reusing the model trained on the same data.")
+            s.set(cache="hit")
+            return metrics
+
+        s.set(cache="miss")
+        metrics = train()
+        store(key, save_path, metrics)
+        return metrics
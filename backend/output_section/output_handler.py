@@ -1,6 +1,7 @@
 import sys
 import os
 import json
+import time
 import importlib
 
 # Setup Paths to include the 'scripts' folder
@@ -8,46 +9,70 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
-# Arguments from Node.js
-dataset_path = sys.argv[1]
-model_path = sys.argv[2]
-requested_outputs_json = sys.argv[3]
-
-requested_outputs = json.loads(requested_outputs_json)
-output_map_path = os.path.join(current_dir, "output_options.json")
-
-# Load mapping
-with open(output_map_path, 'r') as f:
-    options = json.load(f)
-
-final_results = {}
-print(f"[Output Handler] Processing {len(requested_outputs)} requests...")
-
-for out_id in requested_outputs:
-    # Find script name for this ID (e.g., "o1" -> "scatter_plot")
-    option = next((o for o in options if o["id"] == out_id), None)
-    
-    if not option:
-        continue
-        
-    script_name = option["name"]
-    print(f"   -> Running {script_name}...")
-
-    try:
-        # Dynamic Import: scripts.scatter_plot
-        module = importlib.import_module(f"scripts.{script_name}")
-        
-        # Run the script
-        result = module.run(dataset_path, model_path)
-        final_results[out_id] = result
-        
-    except Exception as e:
-        print(f"[ERROR] {script_name} failed: {e}")
-        import traceback
-        traceback.print_exc()
-        final_results[out_id] = {"error": str(e)}
-
-# Return JSON to Node.js
-print("\n__JSON_START__")
-print(json.dumps(final_results))
-print("__JSON_END__")
\ No newline at end of file
+# backend/ (shared progress_events / telemetry modules)
+ROOT_DIR = os.path.dirname(current_dir)
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from progress_events import emit, stage, reset_clock
+from telemetry import span, start_trace
+
+def main(argv):
+    # Arguments from Node.js
+    dataset_path = argv[1]
+    model_path = argv[2]
+    requested_outputs_json = argv[3]
+
+    requested_outputs = json.loads(requested_outputs_json)
+    reset_clock()
+    start_trace("output", argv)
+    output_map_path = os.path.join(current_dir, "output_options.json")
+
+    # Load mapping
+    with open(output_map_path, 'r') as f:
+        options = json.load(f)
+
+    final_results = {}
+    print(f"[Output Handler] Processing {len(requested_outputs)} requests...")
+
+    with stage("output", outputs=requested_outputs):
+        for out_id in requested_outputs:
+            # Find script name for this ID (e.g., "o1" -> "scatter_plot")
+            option = next((o for o in options if o["id"] == out_id), None)
+
+            if not option:
+                continue
+
+            script_name = option["name"]
+            print(f"   -> Running {script_name}...")
+            emit("output_start", output=out_id, script=script_name)
+            started = time.time()
+
+            try:
+                # Dynamic Import: scripts.scatter_plot
+                module = importlib.import_module(f"scripts.{script_name}")
+
+                # Run the script
+                with span("output.run", output=out_id, script=script_name):
+                    result = module.run(dataset_path, model_path)
+                final_results[out_id] = result
+                status = "failed" if isinstance(result, dict) and "error" in result else "done"
+
+            except Exception as e:
+                print(f"[ERROR] {script_name} failed: {e}")
+                import traceback
+                traceback.print_exc()
+                final_results[out_id] = {"error": str(e)}
+                status = "failed"
+
+            emit("output_end", output=out_id, status=status, duration=round(time.time() - started, 3))
+
+    # Return JSON to Node.js
+    print("\n__JSON_START__")
+    print(json.dumps(final_results))
+    print("__JSON_END__")
+
+
+# Guarded so the warm worker (worker_service.py) can import this file and call main()
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,29 +1,59 @@
 import os
-import joblib
 import pandas as pd
 import numpy as np
-import h2o
+import sys
+
+# Model artifacts are read with the same module that writes them
+TRAINING_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "model_selectionAndTraining")
+if TRAINING_DIR not in sys.path:
+    sys.path.append(TRAINING_DIR)
+
+# backend/ (shared dataset loader)
+ROOT_DIR = os.path.dirname(TRAINING_DIR)
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from models.artifacts import ARTIFACT_SUFFIX, load_artifact
+from dataset_loader import load_dataset
 
 def load_model_and_predict(model_path, dataset_path):
     """
-    Universal loader for both Scikit-Learn (.pkl) and H2O models.
+    Universal loader for model artifacts (.model.json), legacy Scikit-Learn (.pkl) and H2O models.
     Returns:
         df (pd.DataFrame): The dataset
         labels (np.array): The cluster labels for every row
     """
     
     # 1. Load Data (Pandas is used for both for consistency in output generation)
-    df = pd.read_csv(dataset_path)
+    df = load_dataset(dataset_path, detect=False)
     # Select numeric columns only for prediction (avoids string errors)
     df_numeric = df.select_dtypes(include=[np.number]).fillna(0)
 
     print(f"   [Loader] Loading model from: {model_path}")
 
     # ==========================================
-    # CASE A: Scikit-Learn Model (.pkl)
+    # CASE A: Model artifact (.model.json + .model.bin)
     # ==========================================
-    if model_path.endswith(".pkl"):
+    if model_path.endswith(ARTIFACT_SUFFIX):
+        print("   [Loader] Detected model artifact format.")
+        try:
+            artifact = load_artifact(model_path)
+        except FileNotFoundError:
+            raise Exception(f"Model file not found at: {model_path}. Did the training save correctly?")
+
+        # Centers / mixture parameters are memory-mapped; models without
+        # .predict() use the saved nearest-neighbor predictor (no refitting).
+        # The artifact picks and casts its own feature columns (bool included)
+        labels = artifact.predict(df)
+        return df, labels
+
+    # ==========================================
+    # CASE B: Scikit-Learn Model (.pkl)
+    # ==========================================
+    elif model_path.endswith(".pkl"):
         print("   [Loader] Detected Scikit-Learn format.")
+        import joblib
+
         try:
             model = joblib.load(model_path)
         except FileNotFoundError:
@@ -53,10 +83,13 @@ def load_model_and_predict(model_path, dataset_path):
         return df, labels
 
     # ==========================================
-    # CASE B: H2O Model (No extension or Directory)
+    # CASE C: H2O Model (No extension or Directory)
     # ==========================================
     else:
         print("   [Loader] Detected H2O format.")
+        # h2o takes seconds to import; only this branch needs it
+        import h2o
+
         try:
             h2o.init(check_version=False)
         except:
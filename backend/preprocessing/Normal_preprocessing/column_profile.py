@@ -0,0 +1,101 @@
+# backend/preprocessing/Normal_preprocessing/column_profile.py
+from preprocessing.Normal_preprocessing.sketches import ColumnSketch
+
+# Column facts the components need, computed lazily and memoized per column,
+# and carried from one step to the next for the columns the step left alone:
+#
+#   def apply(df, profile=None):
+#       profile = profile or ColumnProfile(df)
+#       numeric = profile.select(include=['number'])
+#       sketch = profile.sketch(numeric, distinct_limit=5)   # ColumnSketch (sketches.py)
+#       ...
+#       profile.mark_changed(cols)      # or profile.mark_rows_changed()
+#       return out
+#
+#   profile = profile.follow(out)       # the handler, after each step
+#
+# follow() keeps the cached facts of the columns that are in both frames,
+# weren't marked as changed and have the same rows. A step that returns
+# its input frame untouched without marking anything (an early return) hands
+# the next step the same profile; one that returns a new frame without
+# marking, or fails, hands it an empty one. dtype selections are never
+# carried over to a new frame (they're cheap and steps change dtypes).
+
+
+class ColumnProfile:
+    def __init__(self, df):
+        self.df = df
+        self._facts = {}        # column -> {fact name: value}
+        self._selections = {}
+        self._changed = None
+        self._rows_changed = False
+
+    def _column_facts(self, col):
+        return self._facts.setdefault(col, {})
+
+    def select(self, include=None, exclude=None, features_only=False):
+        """Column labels of df.select_dtypes(include, exclude); features_only leaves out the last (target) column."""
+        key = (repr(include), repr(exclude), features_only)
+        if key not in self._selections:
+            frame = self.df.iloc[:, :-1] if features_only else self.df
+            self._selections[key] = frame.select_dtypes(include=include, exclude=exclude).columns
+        return self._selections[key]
+
+    def missing_columns(self):
+        """Columns with at least one missing value."""
+        unknown = [col for col in self.df.columns if "has_missing" not in self._facts.get(col, {})]
+        if unknown:
+            flags = self.df[unknown].isna().any()
+            for col in unknown:
+                self._column_facts(col)["has_missing"] = bool(flags[col])
+        return [col for col in self.df.columns if self._facts[col]["has_missing"]]
+
+    def mean(self, columns):
+        """df[columns].mean(), as a Series."""
+        import pandas as pd
+
+        unknown = [col for col in columns if "mean" not in self._facts.get(col, {})]
+        if unknown:
+            means = self.df[unknown].mean()
+            for col in unknown:
+                self._column_facts(col)["mean"] = means[col]
+        return pd.Series({col: self._facts[col]["mean"] for col in columns}, dtype=float)
+
+    def sketch(self, columns, quantiles=True, distinct_limit=0):
+        """
+        An exact ColumnSketch of the columns (see sketches.py), built only for
+        those without a suitable cached one.
+        """
+        def usable(facts):
+            cached = facts.get("sketch")
+            return cached is not None and (cached.track_quantiles or not quantiles) and cached.distinct_limit >= distinct_limit
+
+        unknown = [col for col in columns if not usable(self._facts.get(col, {}))]
+        if unknown:
+            fresh = ColumnSketch(quantiles=quantiles, distinct_limit=distinct_limit, exact=True).update(self.df[unknown])
+            for col, part in zip(unknown, fresh.split()):
+                self._column_facts(col)["sketch"] = part
+        return ColumnSketch.stack([self._facts[col]["sketch"] for col in columns], columns)
+
+    def mark_changed(self, columns):
+        """Called by a step: these columns (may be none) have new values; the rows are the same."""
+        self._changed = (self._changed or set()) | set(columns)
+
+    def mark_rows_changed(self):
+        """Called by a step that dropped, added or reordered rows."""
+        self._rows_changed = True
+        self._changed = self._changed or set()
+
+    def follow(self, df):
+        """The profile of the frame a step returned (see the module comment)."""
+        if df is self.df and self._changed is None and not self._rows_changed:
+            return self
+        following = ColumnProfile(df)
+        if self._changed is None or self._rows_changed or not df.columns.is_unique or not self.df.columns.is_unique:
+            return following
+        if len(df) != len(self.df) or not df.index.equals(self.df.index):
+            return following
+        for col in set(df.columns) & set(self.df.columns) - self._changed:
+            if col in self._facts:
+                following._facts[col] = self._facts[col]
+        return following
@@ -1,66 +1,97 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import KBinsDiscretizer
-import warnings
+from preprocessing.Normal_preprocessing.sketches import ColumnSketch
+from preprocessing.Normal_preprocessing.column_profile import ColumnProfile
 
-def apply(df: pd.DataFrame):
-    if df.shape[1] < 2:
-        return df
+# Streaming (see streaming.py): the fit pass builds the sketch chunk by chunk
+STREAMING = True
 
-    # 1. Separate Features and Target
-    X = df.iloc[:, :-1]
-    y = df.iloc[:, -1]
-    
-    # 2. Select Numeric Columns
-    X_numeric_cols = X.select_dtypes(include=['number']).columns
-    
-    if len(X_numeric_cols) == 0:
-        return df 
-
-    # 3. Drop Constant Columns (Zero Variance)
+N_BINS = 5
+
+def _plan(sketch):
+    """(constant columns to drop, {column: inner bin edges}) from the column sketch."""
+    columns = list(sketch.columns)
+    nunique = dict(zip(columns, sketch.nunique()))
+
+    # 1. Drop Constant Columns (Zero Variance)
     # These cause "Feature is constant" warnings and break some models
-    constant_cols = [col for col in X_numeric_cols if X[col].nunique() <= 1]
+    constant_cols = [col for col in columns if nunique[col] <= 1]
     if constant_cols:
         print(f"Binning: Dropping constant columns: {constant_cols}")
-        X = X.drop(columns=constant_cols)
-        # Update numeric columns list
-        X_numeric_cols = X.select_dtypes(include=['number']).columns
 
-    # 4. Smart Selection: Only bin columns with sufficient unique values
+    # 2. Smart Selection: Only bin columns with sufficient unique values
     # If a column has fewer unique values than n_bins, binning is redundant/impossible
-    n_bins = 5
-    cols_to_bin = [col for col in X_numeric_cols if X[col].nunique() > n_bins]
-    cols_skipped = [col for col in X_numeric_cols if col not in cols_to_bin]
+    cols_to_bin = [col for col in columns if nunique[col] > N_BINS]
+    cols_skipped = [col for col in columns if col not in cols_to_bin and col not in constant_cols]
 
     if cols_skipped:
         print(f"Binning: Skipping {len(cols_skipped)} columns (low cardinality, already discrete)")
 
     if not cols_to_bin:
         print("Binning: No columns suitable for binning after filtering.")
-        # Re-attach target and return
-        X[y.name] = y
-        return X
+        return constant_cols, {}
 
     print(f"Binning: Applying quantile binning to {len(cols_to_bin)} columns...")
 
-    # 5. Apply Discretizer
-    # subsample=200000 improves speed on large datasets while maintaining accuracy
-    discretizer = KBinsDiscretizer(n_bins=n_bins, encode='ordinal', strategy='quantile', subsample=200000)
-    
-    X_binned = X.copy()
-    
-    # Suppress the specific "Bins whose width are too small" warning that clutters logs
-    with warnings.catch_warnings():
-        warnings.filterwarnings("ignore", message="Bins whose width are too small")
-        try:
-            X_binned[cols_to_bin] = discretizer.fit_transform(X[cols_to_bin])
-        except ValueError:
-            # Fallback for extremely skewed distributions where quantile fails
-            print("Binning: Quantile strategy failed. Switching to 'uniform' strategy.")
-            discretizer = KBinsDiscretizer(n_bins=n_bins, encode='ordinal', strategy='uniform')
-            X_binned[cols_to_bin] = discretizer.fit_transform(X[cols_to_bin])
-    
-    # 6. Re-attach target column
+    # 3. Quantile bin edges (as KBinsDiscretizer(strategy='quantile') computes
+    # them), minus bins whose width is too small (<= 1e-8)
+    missing = [col for col in cols_to_bin if sketch.nan_count[columns.index(col)]]
+    if missing:
+        raise ValueError(f"Input X contains NaN (columns {missing}).")
+    levels = np.linspace(0, 100, N_BINS + 1)
+    all_edges = sketch.percentiles(levels, method="averaged_inverted_cdf")
+    edges = {}
+    for col in cols_to_bin:
+        col_edges = all_edges[:, columns.index(col)]
+        col_edges = col_edges[np.ediff1d(col_edges, to_begin=np.inf) > 1e-8]
+        edges[col] = col_edges[1:-1]
+    return constant_cols, edges
+
+def _transform(X, y, constant_cols, edges):
+    X_binned = X.drop(columns=constant_cols) if constant_cols else X.copy()
+
+    # 4. Ordinal bin index of every value: a vectorized search over the edges
+    for col, col_edges in edges.items():
+        X_binned[col] = np.searchsorted(col_edges, X_binned[col].to_numpy(dtype=float), side="right").astype(float)
+
+    # 5. Re-attach target column
     X_binned[y.name] = y
-    
-    return X_binned
\ No newline at end of file
+    return X_binned
+
+def apply(df: pd.DataFrame, profile: ColumnProfile = None):
+    if df.shape[1] < 2:
+        return df
+
+    profile = profile or ColumnProfile(df)
+
+    # Separate Features and Target
+    X = df.iloc[:, :-1]
+    y = df.iloc[:, -1]
+
+    # Select Numeric Columns
+    numeric = profile.select(include=['number'], features_only=True)
+
+    if len(numeric) == 0:
+        return df
+
+    # Distinct counts and quantiles of every numeric column from one pass
+    sketch = profile.sketch(numeric, distinct_limit=N_BINS)
+    constant_cols, edges = _plan(sketch)
+    profile.mark_changed(list(edges))
+    return _transform(X, y, constant_cols, edges)
+
+def partial_fit(state, chunk: pd.DataFrame):
+    if chunk.shape[1] < 2:
+        return
+    X_numeric = chunk.iloc[:, :-1].select_dtypes(include=['number'])
+    if len(X_numeric.columns):
+        state.setdefault("sketch", ColumnSketch(distinct_limit=N_BINS)).update(X_numeric)
+
+def finish_fit(state):
+    if "sketch" in state:
+        state["plan"] = _plan(state["sketch"])
+
+def transform(state, chunk: pd.DataFrame):
+    if "plan" not in state:
+        return chunk
+    return _transform(chunk.iloc[:, :-1], chunk.iloc[:, -1], *state["plan"])
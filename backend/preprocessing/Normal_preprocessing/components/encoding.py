@@ -1,5 +1,25 @@
 import pandas as pd
+from preprocessing.Normal_preprocessing.column_profile import ColumnProfile
 
-def apply(df: pd.DataFrame):
-    cat_cols = df.select_dtypes(include=['object']).columns
+STREAMING = True
+
+def apply(df: pd.DataFrame, profile: ColumnProfile = None):
+    profile = profile or ColumnProfile(df)
+    cat_cols = profile.select(include=['object'])
+    # The encoded columns are replaced by new dummy columns; the rest keep their values
+    profile.mark_changed([])
     return pd.get_dummies(df, columns=cat_cols, drop_first=True)
+
+# Streaming: the fit pass collects every category, so each chunk gets the
+# same dummy columns (in the same sorted order) as encoding the whole frame
+def partial_fit(state, chunk: pd.DataFrame):
+    categories = state.setdefault("categories", {})
+    for col in chunk.select_dtypes(include=['object']).columns:
+        categories.setdefault(col, set()).update(chunk[col].dropna().unique())
+
+def transform(state, chunk: pd.DataFrame):
+    chunk = chunk.copy()
+    categories = state.get("categories", {})
+    for col in categories:
+        chunk[col] = pd.Categorical(chunk[col], categories=sorted(categories[col]))
+    return pd.get_dummies(chunk, columns=list(categories), drop_first=True)
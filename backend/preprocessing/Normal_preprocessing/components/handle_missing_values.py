@@ -1,6 +1,27 @@
 import pandas as pd
+from preprocessing.Normal_preprocessing.column_profile import ColumnProfile
 
-def apply(df: pd.DataFrame):
-    df = df.fillna(df.mean(numeric_only=True))
+STREAMING = True
+
+def apply(df: pd.DataFrame, profile: ColumnProfile = None):
+    profile = profile or ColumnProfile(df)
+    # Only columns with gaps get filled, so only their means are needed
+    missing = profile.missing_columns()
+    numeric_missing = [col for col in profile.select(include=['number', 'bool']) if col in missing]
+    df = df.fillna(profile.mean(numeric_missing))
     df = df.fillna("Unknown")
+    profile.mark_changed(missing)
     return df
+
+# Streaming: the column means are running sums / counts over the fit pass
+def partial_fit(state, chunk: pd.DataFrame):
+    numeric = chunk.select_dtypes(include=['number', 'bool'])
+    sums, counts = numeric.sum(), numeric.count()
+    state["sums"] = state["sums"].add(sums, fill_value=0) if "sums" in state else sums
+    state["counts"] = state["counts"].add(counts, fill_value=0) if "counts" in state else counts
+
+def transform(state, chunk: pd.DataFrame):
+    if "sums" in state:
+        means = state["sums"] / state["counts"].where(state["counts"] > 0)
+        chunk = chunk.fillna(means)
+    return chunk.fillna("Unknown")
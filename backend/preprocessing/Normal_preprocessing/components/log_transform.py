@@ -1,35 +1,71 @@
 import pandas as pd
 import numpy as np
+from preprocessing.Normal_preprocessing.sketches import ColumnSketch
+from preprocessing.Normal_preprocessing.column_profile import ColumnProfile
 
-def apply(df: pd.DataFrame):
-    if df.shape[1] < 2:
-        return df
-        
-    X = df.iloc[:, :-1]
-    y = df.iloc[:, -1]
-    
-    X_numeric = X.select_dtypes(include=['number'])
-    
-    # 1. Find skewed columns (skewness > 1 or < -1)
-    skewness = X_numeric.skew()
+# Streaming (see streaming.py): the fit pass builds the same sketch chunk by chunk
+STREAMING = True
+
+def _log_columns(sketch):
+    """Columns to log-transform: skewed (skewness > 1 or < -1) and all non-negative."""
+    skewness = pd.Series(sketch.skew(), index=sketch.columns)
     skewed_cols = skewness[skewness.abs() > 1].index
-    
+
     if len(skewed_cols) == 0:
-        return df # No skewed columns found
+        return None # No skewed columns found
 
     print(f"Log Transform: Applying to {list(skewed_cols)}")
-    
-    # Make a copy to modify
-    X_transformed = X.copy()
-    
+
+    # Only apply if all values are non-negative (a missing value counts as not)
+    non_negative = pd.Series((sketch.nan_count == 0) & ~(sketch.min < 0), index=sketch.columns)
+    log_cols = []
     for col in skewed_cols:
-        # 2. Only apply if all values are non-negative
-        if (X_transformed[col] >= 0).all():
-            # 3. Use log1p (log(1+x)) to handle zero values
-            X_transformed[col] = np.log1p(X_transformed[col])
+        if non_negative[col]:
+            log_cols.append(col)
         else:
             print(f"Log Transform: Skipping '{col}', contains negative values.")
-            
+    return log_cols
+
+def _transform(X, y, log_cols):
+    # Make a copy to modify
+    X_transformed = X.copy()
+
+    for col in log_cols:
+        # Use log1p (log(1+x)) to handle zero values
+        X_transformed[col] = np.log1p(X_transformed[col])
+
     # Re-attach target
     X_transformed[y.name] = y
-    return X_transformed
\ No newline at end of file
+    return X_transformed
+
+def apply(df: pd.DataFrame, profile: ColumnProfile = None):
+    if df.shape[1] < 2:
+        return df
+
+    profile = profile or ColumnProfile(df)
+    X = df.iloc[:, :-1]
+    y = df.iloc[:, -1]
+
+    numeric = profile.select(include=['number'], features_only=True)
+
+    # Skewness and the sign check come from one pass over the numeric columns
+    log_cols = _log_columns(profile.sketch(numeric, quantiles=False))
+    profile.mark_changed(log_cols or [])
+    if log_cols is None:
+        return df
+
+    return _transform(X, y, log_cols)
+
+def partial_fit(state, chunk: pd.DataFrame):
+    if chunk.shape[1] < 2:
+        return
+    X_numeric = chunk.iloc[:, :-1].select_dtypes(include=['number'])
+    state.setdefault("sketch", ColumnSketch(quantiles=False)).update(X_numeric)
+
+def finish_fit(state):
+    state["log_cols"] = _log_columns(state["sketch"]) if "sketch" in state else None
+
+def transform(state, chunk: pd.DataFrame):
+    if state["log_cols"] is None:
+        return chunk
+    return _transform(chunk.iloc[:, :-1], chunk.iloc[:, -1], state["log_cols"])
@@ -1,35 +1,78 @@
 import pandas as pd
 import numpy as np
+from preprocessing.Normal_preprocessing.sketches import ColumnSketch
+from preprocessing.Normal_preprocessing.column_profile import ColumnProfile
 
-def apply(df: pd.DataFrame):
+# Streaming (see streaming.py): the quartiles come from a sketch built over
+# the fit pass, then each chunk is filtered on its own
+STREAMING = True
+
+def _bounds(sketch):
+    Q1, Q3 = sketch.quantiles([0.25, 0.75])
+    IQR = Q3 - Q1
+
+    lower_bound = pd.Series(Q1 - 1.5 * IQR, index=sketch.columns)
+    upper_bound = pd.Series(Q3 + 1.5 * IQR, index=sketch.columns)
+    return lower_bound, upper_bound
+
+def _keep_mask(X_numeric, lower_bound, upper_bound):
+    # Create a boolean mask for all rows that are NOT outliers in ANY column
+    # (X_numeric >= lower_bound) gives True/False for each cell
+    # .all(axis=1) checks that all values in a row are True (i.e., within bounds)
+    return ((X_numeric >= lower_bound) & (X_numeric <= upper_bound)).all(axis=1)
+
+def apply(df: pd.DataFrame, profile: ColumnProfile = None):
     if df.shape[1] < 2:
         return df # Not enough columns
 
+    profile = profile or ColumnProfile(df)
+
     # Separate features (X) and target (y)
     X = df.iloc[:, :-1]
     y = df.iloc[:, -1]
-    
+
     # Select only numeric feature columns
-    X_numeric = X.select_dtypes(include=[np.number])
-    
+    numeric = profile.select(include=[np.number], features_only=True)
+    X_numeric = X[numeric]
+
     if X_numeric.empty:
         return df # No numeric features to check
-    
-    Q1 = X_numeric.quantile(0.25)
-    Q3 = X_numeric.quantile(0.75)
-    IQR = Q3 - Q1
-    
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-    
-    # Create a boolean mask for all rows that are NOT outliers in ANY column
-    # (X_numeric >= lower_bound) gives True/False for each cell
-    # .all(axis=1) checks that all values in a row are True (i.e., within bounds)
-    mask = ((X_numeric >= lower_bound) & (X_numeric <= upper_bound)).all(axis=1)
-    
+
+    # Quartiles of every column from one pass (exact up to the sketch size)
+    lower_bound, upper_bound = _bounds(profile.sketch(numeric))
+    mask = _keep_mask(X_numeric, lower_bound, upper_bound)
+
     # Apply the mask to the original dataframe
     df_cleaned = df[mask]
-    
+    if len(df_cleaned) == len(df):
+        profile.mark_changed([])
+    else:
+        profile.mark_rows_changed()
+
     print(f"Outlier Removal (IQR): Removed {len(df) - len(df_cleaned)} rows.")
-    
-    return df_cleaned
\ No newline at end of file
+
+    return df_cleaned
+
+def partial_fit(state, chunk: pd.DataFrame):
+    if chunk.shape[1] < 2:
+        return
+    X_numeric = chunk.iloc[:, :-1].select_dtypes(include=[np.number])
+    if not X_numeric.columns.empty:
+        state.setdefault("sketch", ColumnSketch()).update(X_numeric)
+
+def finish_fit(state):
+    if "sketch" in state:
+        state["bounds"] = _bounds(state["sketch"])
+    state["removed"] = 0
+
+def transform(state, chunk: pd.DataFrame):
+    if "bounds" not in state:
+        return chunk
+    X_numeric = chunk.iloc[:, :-1].select_dtypes(include=[np.number])
+    mask = _keep_mask(X_numeric, *state["bounds"])
+    state["removed"] += int(len(chunk) - mask.sum())
+    return chunk[mask]
+
+def finish_transform(state):
+    if "bounds" in state:
+        print(f"Outlier Removal (IQR): Removed {state['removed']} rows.")
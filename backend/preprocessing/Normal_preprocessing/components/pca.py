@@ -1,10 +1,45 @@
+import numpy as np
 import pandas as pd
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, IncrementalPCA
+from preprocessing.Normal_preprocessing.column_profile import ColumnProfile
 
-def apply(df: pd.DataFrame):
-    numeric = df.select_dtypes(include=['number']).columns
+STREAMING = True
+
+def apply(df: pd.DataFrame, profile: ColumnProfile = None):
+    profile = profile or ColumnProfile(df)
+    numeric = profile.select(include=['number'])
     pca = PCA(n_components=min(5, len(numeric)))
     pca_result = pca.fit_transform(df[numeric])
     for i in range(pca_result.shape[1]):
         df[f"PCA_{i+1}"] = pca_result[:, i]
+    profile.mark_changed([f"PCA_{i+1}" for i in range(pca_result.shape[1])])
     return df
+
+# Streaming: IncrementalPCA over the chunks. Each partial_fit batch needs at
+# least n_components rows, so the latest chunk is held back and small chunks
+# are merged into it.
+def partial_fit(state, chunk: pd.DataFrame):
+    numeric = chunk.select_dtypes(include=['number']).columns
+    values = chunk[numeric].to_numpy(dtype=float)
+    if "pca" not in state:
+        state["pca"] = IncrementalPCA(n_components=min(5, len(numeric)))
+    held = state.get("held")
+    n_components = state["pca"].n_components
+    if held is None:
+        state["held"] = values
+    elif len(held) >= n_components and len(values) >= n_components:
+        state["pca"].partial_fit(held)
+        state["held"] = values
+    else:
+        state["held"] = np.vstack([held, values])
+
+def finish_fit(state):
+    if state.get("held") is not None:
+        state["pca"].partial_fit(state.pop("held"))
+
+def transform(state, chunk: pd.DataFrame):
+    numeric = chunk.select_dtypes(include=['number']).columns
+    pca_result = state["pca"].transform(chunk[numeric].to_numpy(dtype=float))
+    for i in range(pca_result.shape[1]):
+        chunk[f"PCA_{i+1}"] = pca_result[:, i]
+    return chunk
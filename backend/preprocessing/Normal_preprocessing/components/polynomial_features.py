@@ -1,15 +1,17 @@
 import pandas as pd
 from sklearn.preprocessing import PolynomialFeatures
+from preprocessing.Normal_preprocessing.column_profile import ColumnProfile
 
-def apply(df: pd.DataFrame):
+def apply(df: pd.DataFrame, profile: ColumnProfile = None):
     if df.shape[1] < 2:
         return df
 
+    profile = profile or ColumnProfile(df)
     X = df.iloc[:, :-1]
     y = df.iloc[:, -1]
     
-    X_numeric = X.select_dtypes(include=['number'])
-    X_categorical = X.select_dtypes(exclude=['number'])
+    X_numeric = X[profile.select(include=['number'], features_only=True)]
+    X_categorical = X[profile.select(exclude=['number'], features_only=True)]
     
     if X_numeric.empty:
         return df # No numeric features to combine
@@ -25,5 +27,14 @@ def apply(df: pd.DataFrame):
     # Create new dataframe with new features, preserving index
     X_poly_df = pd.DataFrame(X_poly_values, columns=poly_names, index=X.index)
     
+    # The degree-1 terms keep their column names and values; the rest are new columns
+    profile.mark_changed([])
+
     # Combine back: Non-numeric + New Poly Features + Target
-    return pd.concat([X_categorical, X_poly_df, y], axis=1)
\ No newline at end of file
+    return pd.concat([X_categorical, X_poly_df, y], axis=1)
+
+# Streaming (see streaming.py): every row is expanded on its own, so each chunk goes through apply()
+STREAMING = True
+
+def transform(state, chunk: pd.DataFrame):
+    return apply(chunk)
@@ -1,4 +1,68 @@
+import os
 import pandas as pd
+import numpy as np
+from preprocessing.Normal_preprocessing.column_profile import ColumnProfile
 
-def apply(df: pd.DataFrame):
-    return df.drop_duplicates()
+# Streaming (see streaming.py): rows are looked up by a 64-bit hash in a
+# dict (hash -> where the kept row is) carried from chunk to chunk. A row
+# whose hash was seen before is only dropped once it compares equal to the
+# kept row, read back from this step's spill of kept rows in the work dir.
+STREAMING = True
+
+def apply(df: pd.DataFrame, profile: ColumnProfile = None):
+    out = df.drop_duplicates()
+    if profile is not None:
+        if len(out) == len(df):
+            profile.mark_changed([])
+        else:
+            profile.mark_rows_changed()
+    return out
+
+def _spill_path(state, number):
+    return os.path.join(state["work_dir"], f"remove_duplicates_{number}.pkl")
+
+def _stored_rows(state, locations):
+    """The kept rows at (chunk number, position) locations, in that order."""
+    by_chunk = {}
+    for k, (number, pos) in enumerate(locations):
+        by_chunk.setdefault(number, []).append((k, pos))
+    parts = []
+    for number, items in by_chunk.items():
+        stored = pd.read_pickle(_spill_path(state, number))
+        parts.append(stored.iloc[[pos for _, pos in items]].set_axis([k for k, _ in items]))
+    return pd.concat(parts).sort_index()
+
+def _rows_equal(a, b):
+    """Row by row equality of two frames, NaN equal to NaN (as drop_duplicates compares)."""
+    a = a.reset_index(drop=True)
+    b = b.reset_index(drop=True)
+    return ((a == b) | (a.isna() & b.isna())).all(axis=1).to_numpy()
+
+def transform(state, chunk: pd.DataFrame):
+    seen = state.setdefault("seen", {})
+    hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+    keep = ~chunk.duplicated().to_numpy()
+
+    # Rows whose hash was kept in an earlier chunk (a duplicate or a collision)
+    pairs = []
+    for i in np.flatnonzero(keep):
+        found = seen.get(hashes[i])
+        if found is not None:
+            pairs.extend((i, loc) for loc in (found if isinstance(found, list) else [found]))
+    if pairs:
+        stored = _stored_rows(state, [loc for _, loc in pairs])
+        equal = _rows_equal(chunk.iloc[[i for i, _ in pairs]], stored)
+        keep[[i for (i, _), same in zip(pairs, equal) if same]] = False
+
+    out = chunk[keep]
+    if len(out):
+        number = state.get("chunks", 0)
+        out.to_pickle(_spill_path(state, number))
+        state["chunks"] = number + 1
+        for pos, h in enumerate(hashes[keep].tolist()):
+            found = seen.get(h)
+            if found is None:
+                seen[h] = (number, pos)
+            else:
+                seen[h] = (found if isinstance(found, list) else [found]) + [(number, pos)]
+    return out
@@ -1,8 +1,29 @@
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
+from preprocessing.Normal_preprocessing.column_profile import ColumnProfile
 
-def apply(df: pd.DataFrame):
-    numeric = df.select_dtypes(include=['number']).columns
-    scaler = StandardScaler()
-    df[numeric] = scaler.fit_transform(df[numeric])
+STREAMING = True
+
+# The transform of the numeric block (plan.py fuses it with the next steps')
+def fit_transform(values):
+    return StandardScaler().fit_transform(values)
+
+def apply(df: pd.DataFrame, profile: ColumnProfile = None):
+    profile = profile or ColumnProfile(df)
+    numeric = profile.select(include=['number'])
+    df[numeric] = fit_transform(df[numeric])
+    profile.mark_changed(numeric)
     return df
+
+# Streaming: the scaler is fitted with partial_fit over the chunks
+def partial_fit(state, chunk: pd.DataFrame):
+    numeric = chunk.select_dtypes(include=['number']).columns
+    if len(numeric):
+        state.setdefault("scaler", StandardScaler()).partial_fit(chunk[numeric])
+
+def transform(state, chunk: pd.DataFrame):
+    if "scaler" not in state:
+        return chunk
+    numeric = chunk.select_dtypes(include=['number']).columns
+    chunk[numeric] = state["scaler"].transform(chunk[numeric])
+    return chunk
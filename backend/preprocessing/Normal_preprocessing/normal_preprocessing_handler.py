@@ -2,9 +2,6 @@ import sys
 import os
 import json
 import importlib
-import pandas as pd
-import chardet
-import csv
 import shutil
 import time
 import stat
@@ -15,7 +12,11 @@ ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
-sys.stdout.reconfigure(encoding='utf-8')
+from progress_events import emit, stage, reset_clock
+from telemetry import span, start_trace, profile_flag
+from preprocessing.Normal_preprocessing.streaming import stream_flag, should_stream, run_streaming, under_threshold
+from preprocessing.Normal_preprocessing.column_profile import ColumnProfile
+from preprocessing.Normal_preprocessing.plan import optimize, run_fused
 
 # ---------------------------------------------------------
 # HELPER: Robust Deletion (Handles OneDrive/Windows Locks)
@@ -56,135 +57,202 @@ def force_delete_path(path, retries=5, delay=1.0):
             else:
                 time.sleep(delay)
 
-# ---------------------------------------------------------
-# 1. CLEANUP ROUTINE
-# ---------------------------------------------------------
 current_script_dir = os.path.dirname(os.path.abspath(__file__))
 
-# --- A. Delete 'branch_*' FOLDERS in 'Normal_preprocessing' (Current Dir) ---
-for item in os.listdir(current_script_dir):
-    item_path = os.path.join(current_script_dir, item)
-    
-    if os.path.isdir(item_path) and item.startswith("branch"):
-        force_delete_path(item_path)
-        if not os.path.exists(item_path):
-             print(f" [CLEANUP] Deleted old folder: {item}")
-
-# --- B. Delete 'branch_*.csv' FILES in 'backend' (Root Dir) ---
-# We scan ROOT_DIR because your screenshots show the CSVs are there.
-for item in os.listdir(ROOT_DIR):
-    item_path = os.path.join(ROOT_DIR, item)
-    
-    # Check for CSV files starting with "branch_" or "main_branch_"
-    if os.path.isfile(item_path) and item.endswith(".csv"):
-        if item.startswith("branch") or item.startswith("main_branch"):
+# Load dataset safely
+def load_dataset(path):
+    # Imported here so the cleanup and argument checks don't wait for pandas
+    from dataset_loader import load_dataset as load_cached
+
+    if not os.path.exists(path):
+        print(f"[ERROR] Dataset not found at: {path}")
+        sys.exit(1)
+
+    # Encoding / delimiter detection, C parser and the columnar cache: see dataset_loader.py
+    return load_cached(path)
+
+def label_to_python_filename(label):
+    return label.lower().replace(" ", "_").replace("-", "_")
+
+def main(argv):
+    argv = profile_flag(argv)  # --profile: cProfile every component (see telemetry.py)
+    argv, stream_forced = stream_flag(argv)  # --stream: chunked execution (see streaming.py)
+
+    # ---------------------------------------------------------
+    # 1. CLEANUP ROUTINE
+    # ---------------------------------------------------------
+
+    # --- A. Delete 'branch_*' FOLDERS in 'Normal_preprocessing' (Current Dir) ---
+    for item in os.listdir(current_script_dir):
+        item_path = os.path.join(current_script_dir, item)
+
+        if os.path.isdir(item_path) and item.startswith("branch"):
             force_delete_path(item_path)
             if not os.path.exists(item_path):
-                print(f" [CLEANUP] Deleted old file from Root: {item}")
-
-# ---------------------------------------------------------
+                 print(f" [CLEANUP] Deleted old folder: {item}")
 
-dataset_path = sys.argv[1]
-modules_json = sys.argv[2]
-output_path = sys.argv[3]
-log_dir = sys.argv[4] if len(sys.argv) > 4 else None
+    # --- B. Delete 'branch_*.csv' FILES in 'backend' (Root Dir) ---
+    # We scan ROOT_DIR because your screenshots show the CSVs are there.
+    for item in os.listdir(ROOT_DIR):
+        item_path = os.path.join(ROOT_DIR, item)
 
-# Load mapping file
-json_path = os.path.join(os.path.dirname(__file__), "normal_preprocessing_modules.json")
+        # Check for CSV files starting with "branch_" or "main_branch_"
+        if os.path.isfile(item_path) and item.endswith(".csv"):
+            if item.startswith("branch") or item.startswith("main_branch"):
+                force_delete_path(item_path)
+                if not os.path.exists(item_path):
+                    print(f" [CLEANUP] Deleted old file from Root: {item}")
 
-try:
-    with open(json_path, "r", encoding="utf-8") as f:
-        module_map = json.load(f)
-except FileNotFoundError:
-    print(f"[ERROR] Mapping file not found: {json_path}")
-    sys.exit(1)
+    # ---------------------------------------------------------
 
-id_to_label = {m["id"]: m["name"] for m in module_map}
+    dataset_path = argv[1]
+    modules_json = argv[2]
+    output_path = argv[3]
+    log_dir = argv[4] if len(argv) > 4 else None
+    reset_clock()
+    start_trace("preprocessing", argv, log_dir=log_dir)
 
-modules = json.loads(modules_json)
+    # Load mapping file
+    json_path = os.path.join(os.path.dirname(__file__), "normal_preprocessing_modules.json")
 
-# --- CLEAN AND CREATE LOG DIRECTORY ---
-if log_dir:
-    if os.path.exists(log_dir):
-        print(f"Cleaning existing log directory: {log_dir}")
-        force_delete_path(log_dir)
-    
     try:
-        os.makedirs(log_dir, exist_ok=True)
-        print(f"Logging intermediate steps to: {log_dir}")
-    except OSError as e:
-        print(f"[ERROR] Could not create log dir: {e}")
-# --------------------------------------
-
-# Load dataset safely
-def load_dataset(path):
-    if not os.path.exists(path):
-        print(f"[ERROR] Dataset not found at: {path}")
+        with open(json_path, "r", encoding="utf-8") as f:
+            module_map = json.load(f)
+    except FileNotFoundError:
+        print(f"[ERROR] Mapping file not found: {json_path}")
         sys.exit(1)
-        
-    with open(path, "rb") as f:
-        raw_data = f.read()
-        result = chardet.detect(raw_data)
-        enc = result["encoding"] or "utf-8"
-    
-    with open(path, "r", encoding=enc, errors="replace") as f:
-        sample = f.read(2048)
-        try:
-            delim = csv.Sniffer().sniff(sample).delimiter
-        except:
-            delim = ","
-
-    return pd.read_csv(
-        path,
-        encoding=enc,
-        delimiter=delim,
-        on_bad_lines="skip",
-        engine="python"
-    )
-
-try:
-    df = load_dataset(dataset_path)
-except Exception as e:
-    print(f"[ERROR] Failed to load dataset: {e}")
-    sys.exit(1)
 
-def label_to_python_filename(label):
-    return label.lower().replace(" ", "_").replace("-", "_")
+    id_to_label = {m["id"]: m["name"] for m in module_map}
+
+    modules = json.loads(modules_json)
+
+    # --- CLEAN AND CREATE LOG DIRECTORY ---
+    if log_dir:
+        if os.path.exists(log_dir):
+            print(f"Cleaning existing log directory: {log_dir}")
+            force_delete_path(log_dir)
+
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            print(f"Logging intermediate steps to: {log_dir}")
+        except OSError as e:
+            print(f"[ERROR] Could not create log dir: {e}")
+    # --------------------------------------
 
-# Process modules
-for i, module in enumerate(modules, 1):
-    module_id = module["id"]
-    module_label = id_to_label.get(module_id)
+    # Resolve the module list: (index, id, label, component file)
+    steps = []
+    for i, module in enumerate(modules, 1):
+        module_id = module["id"]
+        module_label = id_to_label.get(module_id)
 
-    if not module_label:
-        print(f"Warning: Module ID {module_id} not found in map.")
-        continue
+        if not module_label:
+            print(f"Warning: Module ID {module_id} not found in map.")
+            continue
+        steps.append((i, module_id, module_label, label_to_python_filename(module_label)))
 
-    python_file = label_to_python_filename(module_label)
-    print(f"Running {module_label} (id={module_id})...")
+    if should_stream(dataset_path, [python_file for _, _, _, python_file in steps], stream_forced):
+        try:
+            with stage("preprocessing", steps=[m["id"] for m in modules], mode="stream"):
+                run_streaming(dataset_path, steps, output_path, log_dir)
+            return
+        except Exception as e:
+            # Files past PAPAD_STREAM_MIN_MB stream because they may not fit in
+            # memory; loading them whole would trade the error for an OOM kill
+            if not under_threshold(dataset_path):
+                print(f"[ERROR] Streaming failed: {e}")
+                sys.exit(1)
+            print(f"[WARNING] Streaming failed ({e}). Running the steps in memory instead.")
+            if log_dir:
+                force_delete_path(log_dir)
+                os.makedirs(log_dir, exist_ok=True)
 
     try:
-        # Import and Run Module
-        mod = importlib.import_module(
-            f"preprocessing.Normal_preprocessing.components.{python_file}"
-        )
-        df = mod.apply(df)
+        df = load_dataset(dataset_path)
     except Exception as e:
-        print(f"[ERROR] Failed running {module_label}: {e}")
-        continue 
+        print(f"[ERROR] Failed to load dataset: {e}")
+        sys.exit(1)
+    emit("dataset_loaded", rows=len(df), columns=len(df.columns))
 
-    if log_dir:
+    # Column facts shared by the steps (see column_profile.py)
+    profile = ColumnProfile(df)
+
+    # Rewrites of the step list that keep the output the same (see plan.py)
+    plan, changes = optimize(steps, profile)
+    for change in changes:
+        print(f"Plan: {change}")
+    if changes:
+        emit("plan", changes=changes)
+
+    def save_log(step, frame):
+        if not log_dir:
+            return
+        safe_name = f"{step[0]}_{step[2].replace(' ', '_').lower()}.csv"
         try:
-            clean_name = module_label.replace(" ", "_").lower()
-            safe_name = f"{i}_{clean_name}.csv"
-            log_path = os.path.join(log_dir, safe_name)
-            df.to_csv(log_path, index=False)
+            frame.to_csv(os.path.join(log_dir, safe_name), index=False)
             print(f"   --> Saved log: {safe_name}")
         except Exception as e:
             print(f"[WARNING] Failed to save log {safe_name}: {e}")
 
-try:
-    df.to_csv(output_path, index=False)
-    print("Preprocessing done. Saved:", output_path)
-except Exception as e:
-    print(f"[ERROR] Failed to save final output: {e}")
\ No newline at end of file
+    with stage("preprocessing", steps=[m["id"] for m in modules]):
+        # Process modules
+        pending = list(plan)
+        while pending:
+            action, group = pending.pop(0)
+            i, module_id, module_label, python_file = group[-1]
+
+            if action == "skip":
+                print(f"Skipping {module_label} (id={module_id}): same as the step before.")
+                emit("step_end", step=module_id, index=i, status="skipped")
+                save_log(group[-1], df)
+                continue
+
+            for j, member_id, member_label, _ in group:
+                print(f"Running {member_label} (id={member_id})...")
+                emit("step_start", step=member_id, label=member_label, index=j)
+            started = time.time()
+
+            try:
+                # Import and Run Module
+                mod = importlib.import_module(
+                    f"preprocessing.Normal_preprocessing.components.{python_file}"
+                )
+                with span(
+                    "preprocessing.apply", data=df, profile=f"apply_{i}_{python_file}",
+                    step=module_id, component="+".join(member[3] for member in group),
+                ) as s:
+                    if action == "fuse":
+                        out = s.output(run_fused(group, df, profile, on_step=save_log if log_dir else None))
+                    else:
+                        out = s.output(mod.apply(df, profile=profile))
+                profile = profile.follow(out)
+                df = out
+            except Exception as e:
+                profile = ColumnProfile(df)
+                if action == "fuse":
+                    # Nothing was written to df; run the steps one at a time instead
+                    print(f"[WARNING] Fused run failed ({e}); running the steps one at a time.")
+                    pending[:0] = [("run", [member]) for member in group]
+                    continue
+                print(f"[ERROR] Failed running {module_label}: {e}")
+                emit("step_end", step=module_id, index=i, status="failed", duration=round(time.time() - started, 3))
+                continue 
+
+            for j, member_id, _, _ in group:
+                emit(
+                    "step_end", step=member_id, index=j, status="done", duration=round(time.time() - started, 3),
+                    rows=len(df), columns=len(df.columns)
+                )
+
+            save_log(group[-1], df)
+
+        try:
+            df.to_csv(output_path, index=False)
+            print("Preprocessing done. Saved:", output_path)
+        except Exception as e:
+            print(f"[ERROR] Failed to save final output: {e}")
+
+
+# Guarded so the warm worker (worker_service.py) can import this file and call main()
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main(sys.argv)
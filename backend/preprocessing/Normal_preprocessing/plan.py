@@ -0,0 +1,158 @@
+# backend/preprocessing/Normal_preprocessing/plan.py
+import os
+import importlib
+
+# Rewrites the user's step list -- (index, module id, label, component file),
+# in the order given -- into a plan that does less work and gives exactly
+# (bit for bit) the output of running the steps as given:
+#
+#   1. remove_duplicates is moved ahead of encoding and polynomial_features
+#      (row filters before column expansions). Both map rows one to one
+#      and keep every distinct value, so the same rows survive. Guarded on
+#      the loaded data: encoding maps a missing category to the same dummies
+#      as its dropped first one, so the text columns must have no missing
+#      values; polynomial_features turns ints into floats, so no integer
+#      column may reach 2**53.
+#   2. A step that repeats the one before it is skipped when running it
+#      twice is the same as running it once (remove_duplicates,
+#      handle_missing_values, encoding).
+#   3. scaling or normalization followed by normalization runs as one pass
+#      over the numeric block: the components' fit_transform() hooks are
+#      chained on the array instead of writing it back to the frame and
+#      selecting it again in between. Only normalization may follow, since
+#      its fit (min / max) doesn't depend on the array's memory layout;
+#      StandardScaler's and PCA's sums do, so they aren't fused.
+#
+# Dropping a step a later one makes irrelevant (scaling before normalization)
+# is not done: the results agree only up to rounding.
+#
+# plan entries are ("run", [step]), ("fuse", [steps]) or ("skip", [step]).
+# A fused run that fails is run again one step at a time. Every step still
+# writes its step log: a skipped step logs the frame it was given, and the
+# steps of a fused run log the frame as it is after each of them. A moved
+# remove_duplicates logs the frame of the order the steps ran in. The plan is
+# only used by the in-memory chain; PAPAD_PLAN=0 runs the steps as given.
+
+IDEMPOTENT = {"remove_duplicates", "handle_missing_values", "encoding"}
+ROW_FILTERS = {"remove_duplicates"}
+COLUMN_EXPANSIONS = {"encoding", "polynomial_features"}
+AFFINE = {"scaling", "normalization"}
+FUSES_AFTER_AFFINE = {"normalization"}
+
+EXACT_INT_LIMIT = 2 ** 53
+
+
+def enabled():
+    return os.environ.get("PAPAD_PLAN", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _label(step):
+    return f"{step[2]} (id={step[1]})"
+
+
+class _Guards:
+    """Facts about the loaded data the reordering depends on, looked up on first use."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self._results = {}
+
+    def _check(self, name, compute):
+        if name not in self._results:
+            self._results[name] = compute()
+        return self._results[name]
+
+    def text_complete(self):
+        def compute():
+            missing = set(self.profile.missing_columns())
+            return not any(col in missing for col in self.profile.select(include=['object']))
+        return self._check("text_complete", compute)
+
+    def ints_exact(self):
+        def compute():
+            ints = self.profile.select(include=['integer'])
+            if len(ints) == 0:
+                return True
+            sketch = self.profile.sketch(ints, quantiles=False)
+            return bool((sketch.max < EXACT_INT_LIMIT).all() and (sketch.min > -EXACT_INT_LIMIT).all())
+        return self._check("ints_exact", compute)
+
+    def commutes(self, row_filter, expansion):
+        if expansion == "encoding":
+            return self.text_complete()
+        if expansion == "polynomial_features":
+            return self.ints_exact()
+        return False
+
+
+def optimize(steps, profile):
+    """(plan, changes): the plan for steps (see the module comment) and a line per rewrite."""
+    if not enabled():
+        return [("run", [step]) for step in steps], []
+
+    changes = []
+    guards = _Guards(profile)
+
+    # 1. Row filters ahead of column expansions
+    order = list(steps)
+    for k in range(len(order)):
+        if order[k][3] not in ROW_FILTERS:
+            continue
+        j = k
+        while j > 0 and order[j - 1][3] in COLUMN_EXPANSIONS and guards.commutes(order[j][3], order[j - 1][3]):
+            order[j - 1], order[j] = order[j], order[j - 1]
+            j -= 1
+        if j < k:
+            passed = ", ".join(_label(step) for step in order[j + 1:k + 1])
+            changes.append(f"Moved {_label(order[j])} ahead of {passed}.")
+
+    # 2. Repeats of idempotent steps
+    plan = []
+    previous = None
+    for step in order:
+        if previous is not None and step[3] == previous[3] and step[3] in IDEMPOTENT:
+            plan.append(("skip", [step]))
+            changes.append(f"Skipped {_label(step)}: repeats {_label(previous)}.")
+            continue
+        plan.append(("run", [step]))
+        previous = step
+
+    # 3. Affine runs in one pass
+    fused = []
+    for action, group in plan:
+        last = fused[-1] if fused else None
+        if (
+            action == "run" and group[0][3] in FUSES_AFTER_AFFINE
+            and last is not None and last[0] in ("run", "fuse") and last[1][0][3] in AFFINE
+        ):
+            fused[-1] = ("fuse", last[1] + group)
+            continue
+        fused.append((action, group))
+    for action, group in fused:
+        if action == "fuse":
+            changes.append(f"Fused {' + '.join(_label(step) for step in group)} into one pass.")
+
+    return fused, changes
+
+
+def run_fused(group, df, profile, on_step=None):
+    """
+    One pass of the fused steps over the numeric columns (the frame is only
+    written at the end). on_step(step, frame), if given, gets a copy of the
+    frame as it is after each step but the last (for the step logs).
+    """
+    mods = [
+        importlib.import_module(f"preprocessing.Normal_preprocessing.components.{python_file}")
+        for _, _, _, python_file in group
+    ]
+    numeric = profile.select(include=['number'])
+    values = df[numeric]
+    for step, mod in zip(group, mods):
+        values = mod.fit_transform(values)
+        if on_step is not None and step is not group[-1]:
+            frame = df.copy()
+            frame[numeric] = values
+            on_step(step, frame)
+    df[numeric] = values
+    profile.mark_changed(numeric)
+    return df
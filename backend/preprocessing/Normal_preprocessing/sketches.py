@@ -0,0 +1,252 @@
+# backend/preprocessing/Normal_preprocessing/sketches.py
+import os
+import numpy as np
+
+# One-pass, mergeable summaries of numeric columns, shared by binning,
+# outlier_removal_iqr and log_transform, so each of them reads its columns
+# once -- the whole frame in blocks of BLOCK_ROWS rows, or chunk by chunk in
+# streaming mode -- and keeps memory that doesn't grow with the row count:
+#
+#   sketch = ColumnSketch().update(X_numeric)       # or .update(chunk) per chunk
+#   sketch.quantiles([0.25, 0.75])                  # pandas .quantile() (linear)
+#   sketch.percentiles(np.linspace(0, 100, 6), method="averaged_inverted_cdf")   # KBinsDiscretizer's edges
+#   sketch.skew(), sketch.nunique(), sketch.min, sketch.nan_count
+#
+# Per column it keeps the count, NaN count, min / max, the mean with the 2nd
+# and 3rd central moment sums (merged exactly; the same skewness as
+# .skew()), up to distinct_limit + 1 distinct values, and a quantile
+# summary: sorted values with weights, holding at most PAPAD_SKETCH_SIZE
+# points (default 4096). Until a column has more values than that the
+# summary holds all of them and quantiles are exact; after that it is
+# compressed to evenly spaced ranks (rank error of roughly 1 / size per
+# compression).
+#
+# ColumnSketch(exact=True) is the in-memory variant (ColumnProfile builds
+# these): its summary is never compressed, quantiles come from np.percentile
+# over the kept values and the skewness of a sketch built with one update()
+# from DataFrame.skew(), so binning, outlier_removal_iqr and log_transform
+# give exactly the results of the pandas / scikit-learn calls they replace.
+# Only streaming mode uses the bounded summary.
+
+DEFAULT_SIZE = 4096
+BLOCK_ROWS = 65536
+
+
+def sketch_size():
+    try:
+        return max(16, int(os.environ.get("PAPAD_SKETCH_SIZE", DEFAULT_SIZE)))
+    except ValueError:
+        print(f"   [WARNING] Invalid PAPAD_SKETCH_SIZE. Using {DEFAULT_SIZE}.")
+        return DEFAULT_SIZE
+
+
+def _merge_moments(a, b):
+    """Combines (n, mean, M2, M3) of two parts of the same columns."""
+    na, mean_a, m2a, m3a = a
+    nb, mean_b, m2b, m3b = b
+    n = na + nb
+    safe_n = np.where(n > 0, n, 1)
+    delta = np.where(n > 0, mean_b - mean_a, 0.0)
+    share = nb / safe_n
+    mean = mean_a + delta * share
+    m2 = m2a + m2b + delta ** 2 * na * share
+    m3 = m3a + m3b + delta ** 3 * na * share * (na - nb) / safe_n + 3 * delta * (na * m2b - nb * m2a) / safe_n
+    return n, mean, m2, m3
+
+
+def _merge_summary(a, b, size):
+    """Merges two sorted (values, weights) summaries, compressing past size points."""
+    if a is None or len(a[0]) == 0:
+        values, weights = b
+    elif len(b[0]) == 0:
+        values, weights = a
+    else:
+        values = np.concatenate([a[0], b[0]])
+        weights = np.concatenate([a[1], b[1]])
+        order = np.argsort(values, kind="mergesort")
+        values, weights = values[order], weights[order]
+    if len(values) <= size:
+        return values, weights
+
+    cum = np.cumsum(weights)
+    total = cum[-1]
+    targets = (np.arange(size) + 0.5) * (total / size)
+    picked = np.minimum(np.searchsorted(cum, targets), len(values) - 1)
+    return values[picked], np.full(size, total / size)
+
+
+class ColumnSketch:
+    def __init__(self, quantiles=True, distinct_limit=0, size=None, exact=False):
+        self.track_quantiles = quantiles
+        self.distinct_limit = distinct_limit
+        self.exact = exact
+        self.size = np.inf if exact else (size or sketch_size())
+        self.columns = None
+        self.exact_skew = None
+
+    def _start(self, columns):
+        k = len(columns)
+        self.columns = columns
+        self.count = np.zeros(k)
+        self.nan_count = np.zeros(k, dtype=np.int64)
+        self.min = np.full(k, np.nan)
+        self.max = np.full(k, np.nan)
+        self.moments = (np.zeros(k), np.zeros(k), np.zeros(k), np.zeros(k))
+        self.summaries = [None] * k
+        self.distinct = [np.empty(0)] * k
+
+    def update(self, frame):
+        """Adds the rows of a numeric DataFrame (same columns every time); returns self."""
+        if self.columns is None:
+            self._start(frame.columns)
+            if self.exact:
+                self.exact_skew = frame.skew().to_numpy(dtype=float)
+        elif list(frame.columns) != list(self.columns):
+            raise ValueError("ColumnSketch.update() got different columns")
+        else:
+            self.exact_skew = None
+        values = frame.to_numpy(dtype=float)
+        # Exact sketches sort every column once instead of merging sorted blocks
+        block_rows = max(len(values), 1) if self.exact else BLOCK_ROWS
+        for start in range(0, len(values), block_rows):
+            self._update_block(values[start:start + block_rows])
+        return self
+
+    def _update_block(self, block):
+        missing = np.isnan(block)
+        n = (~missing).sum(axis=0).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, np.nansum(block, axis=0) / np.where(n > 0, n, 1), 0.0)
+            d = block - mean
+        self.moments = _merge_moments(self.moments, (n, mean, np.nansum(d ** 2, axis=0), np.nansum(d ** 3, axis=0)))
+        self.count += n
+        self.nan_count += missing.sum(axis=0)
+
+        if not (self.track_quantiles or self.distinct_limit):
+            has_values = n > 0
+            if has_values.any():
+                self.min = np.fmin(self.min, np.where(has_values, np.where(missing, np.inf, block).min(axis=0), np.nan))
+                self.max = np.fmax(self.max, np.where(has_values, np.where(missing, -np.inf, block).max(axis=0), np.nan))
+            return
+
+        ordered = np.sort(block, axis=0)  # NaN sorts last
+        for j in range(block.shape[1]):
+            col = ordered[:int(n[j]), j]
+            if len(col) == 0:
+                continue
+            self.min[j] = np.fmin(self.min[j], col[0])
+            self.max[j] = np.fmax(self.max[j], col[-1])
+            if self.track_quantiles:
+                self.summaries[j] = _merge_summary(self.summaries[j], (col, np.ones(len(col))), self.size)
+            if self.distinct_limit and len(self.distinct[j]) <= self.distinct_limit:
+                uniques = col[np.r_[True, col[1:] != col[:-1]]]
+                self.distinct[j] = np.union1d(self.distinct[j], uniques[:self.distinct_limit + 1])[:self.distinct_limit + 1]
+
+    def merge(self, other):
+        """Adds another sketch of the same columns (e.g. built on another chunk); returns self."""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self._start(other.columns)
+        self.exact_skew = None
+        self.moments = _merge_moments(self.moments, other.moments)
+        self.count += other.count
+        self.nan_count += other.nan_count
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        for j in range(len(self.columns)):
+            if self.track_quantiles and other.summaries[j] is not None:
+                self.summaries[j] = _merge_summary(self.summaries[j], other.summaries[j], self.size)
+            if self.distinct_limit:
+                self.distinct[j] = np.union1d(self.distinct[j], other.distinct[j])[:self.distinct_limit + 1]
+        return self
+
+    def split(self):
+        """One single-column sketch per column (copies)."""
+        parts = []
+        for j in range(len(self.columns)):
+            part = ColumnSketch(self.track_quantiles, self.distinct_limit, self.size, self.exact)
+            part.columns = self.columns[j:j + 1]
+            if self.exact_skew is not None:
+                part.exact_skew = self.exact_skew[j:j + 1].copy()
+            for name in ("count", "nan_count", "min", "max"):
+                setattr(part, name, getattr(self, name)[j:j + 1].copy())
+            part.moments = tuple(m[j:j + 1].copy() for m in self.moments)
+            part.summaries = [self.summaries[j]]
+            part.distinct = [self.distinct[j]]
+            parts.append(part)
+        return parts
+
+    @classmethod
+    def stack(cls, parts, columns):
+        """A sketch of columns from single-column sketches of them (see split())."""
+        exact = bool(parts) and all(p.exact for p in parts)
+        sketch = cls(
+            all(p.track_quantiles for p in parts),
+            min((p.distinct_limit for p in parts), default=0),
+            None if exact else max((p.size for p in parts), default=None),
+            exact,
+        )
+        sketch.columns = columns
+        if exact and all(p.exact_skew is not None for p in parts):
+            sketch.exact_skew = np.concatenate([p.exact_skew for p in parts])
+        for name in ("count", "nan_count", "min", "max"):
+            setattr(sketch, name, np.concatenate([getattr(p, name) for p in parts]) if parts else np.zeros(0))
+        sketch.moments = tuple(np.concatenate([p.moments[i] for p in parts]) if parts else np.zeros(0) for i in range(4))
+        sketch.summaries = [p.summaries[0] for p in parts]
+        sketch.distinct = [p.distinct[0] for p in parts]
+        return sketch
+
+    def nunique(self):
+        """Distinct non-missing values per column, capped at distinct_limit + 1."""
+        return np.array([len(d) for d in self.distinct])
+
+    def skew(self):
+        """Sample skewness per column, as pandas' .skew() computes it."""
+        if self.exact_skew is not None:
+            return self.exact_skew
+        n, _, m2, m3 = self.moments
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m2, m3 = m2 / n, m3 / n
+            m2 = np.where(np.abs(m2) < 1e-14, 0.0, m2)
+            m3 = np.where(np.abs(m3) < 1e-14, 0.0, m3)
+            skew = np.sqrt(n * (n - 1)) / (n - 2) * m3 / m2 ** 1.5
+        skew = np.where(m2 == 0, 0.0, skew)
+        return np.where(n < 3, np.nan, skew)
+
+    def quantiles(self, levels, method="linear"):
+        """Quantiles at levels in [0, 1] (see percentiles())."""
+        return self.percentiles(np.asarray(levels, dtype=float) * 100, method)
+
+    def percentiles(self, q, method="linear"):
+        """
+        (len(q), columns) array of percentiles. method="linear" matches
+        pandas / np.percentile's default, "averaged_inverted_cdf" matches
+        KBinsDiscretizer's quantile bin edges. NaN for columns without values.
+        """
+        q = np.asarray(q, dtype=float)
+        levels = q / 100
+        out = np.full((len(q), len(self.columns)), np.nan)
+        for j, summary in enumerate(self.summaries):
+            if summary is None or len(summary[0]) == 0:
+                continue
+            values, weights = summary
+            if len(values) == self.count[j]:
+                # Every value is still there: exactly what np.percentile gives
+                out[:, j] = np.percentile(values, q, method=method)
+                continue
+            cum = np.cumsum(weights)
+            total = cum[-1]
+            if method == "linear":
+                # Unit weights: position i sits at rank i + 0.5, so this is numpy's (n - 1) * q interpolation
+                result = np.interp(levels * (total - 1) + 0.5, cum - weights / 2, values)
+            elif method == "averaged_inverted_cdf":
+                target = levels * total
+                idx = np.minimum(np.searchsorted(cum, target, side="left"), len(values) - 1)
+                nxt = np.minimum(idx + 1, len(values) - 1)
+                on_step = np.isclose(cum[idx], target, rtol=0, atol=1e-9 * total)
+                result = np.where(on_step, (values[idx] + values[nxt]) / 2, values[idx])
+            else:
+                raise ValueError(f"Unknown quantile method: {method}")
+            out[:, j] = np.clip(result, self.min[j], self.max[j])
+        return out
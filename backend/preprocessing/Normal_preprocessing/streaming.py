@@ -0,0 +1,238 @@
+# backend/preprocessing/Normal_preprocessing/streaming.py
+import os
+import time
+import pickle
+import shutil
+import tempfile
+import importlib
+
+from progress_events import emit
+from telemetry import span
+
+# Streaming mode: runs the component chain over CSV chunks, for datasets
+# that don't fit in memory. A component opts in with module-level
+#
+#   STREAMING = True
+#   def partial_fit(state, chunk)   # optional: fit pass, collects statistics into the state dict
+#   def finish_fit(state)           # optional: once, after the fit pass
+#   def transform(state, chunk)     # returns the output chunk (may update state)
+#   def finish_transform(state)     # optional: once, after the transform pass
+#
+# and declares STREAMING = False when it needs every row at once. Each step
+# gets a fresh state dict (holding "work_dir", a directory it may keep
+# scratch files in until the run ends), reads its input chunk by chunk for the fit pass
+# (when it has one) and again for the transform pass, which writes its
+# output chunks to a spill file (pickled DataFrames, so dtypes survive) in
+# a temporary directory next to the output. The input CSV is parsed once
+# into the first spill file; the last one is written to the output CSV
+# chunk by chunk. A failed step stops the run with StreamingError (after
+# its spill files are removed); the handler then runs the chain in memory
+# when the file is under PAPAD_STREAM_MIN_MB (a forced stream of a small
+# file), and otherwise reports the error and exits non-zero.
+#
+# PAPAD_STREAM=auto (default) streams when the dataset file is larger than
+# PAPAD_STREAM_MIN_MB (default 1024) and every selected step can stream;
+# PAPAD_STREAM=1 or --stream on the command line streams whenever every step
+# can, PAPAD_STREAM=0 never. PAPAD_STREAM_CHUNK_ROWS sets the chunk size.
+
+STREAM_FLAG = "--stream"
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_MIN_MB = 1024
+
+
+def stream_flag(argv):
+    """Removes --stream from a handler's argv; returns (argv, whether it was given)."""
+    if STREAM_FLAG not in argv:
+        return argv, False
+    return [arg for arg in argv if arg != STREAM_FLAG], True
+
+
+def _env_number(name, default, cast):
+    try:
+        return cast(os.environ.get(name, default))
+    except ValueError:
+        print(f"   [WARNING] Invalid {name}. Using {default}.")
+        return default
+
+
+def chunk_rows():
+    return max(1, _env_number("PAPAD_STREAM_CHUNK_ROWS", DEFAULT_CHUNK_ROWS, int))
+
+
+def can_stream(python_file):
+    try:
+        mod = importlib.import_module(f"preprocessing.Normal_preprocessing.components.{python_file}")
+    except ImportError:
+        return False
+    return getattr(mod, "STREAMING", False)
+
+
+def under_threshold(dataset_path):
+    """Whether the file is smaller than PAPAD_STREAM_MIN_MB (small enough to load at once)."""
+    min_mb = _env_number("PAPAD_STREAM_MIN_MB", DEFAULT_MIN_MB, float)
+    try:
+        return os.path.getsize(dataset_path) < min_mb * 1024 * 1024
+    except OSError:
+        return True
+
+
+def should_stream(dataset_path, python_files, forced=False):
+    """Whether to run this chain in streaming mode (see the module comment)."""
+    mode = os.environ.get("PAPAD_STREAM", "auto").strip().lower()
+    if forced:
+        mode = "1"
+    if mode in ("0", "false", "no", "off"):
+        return False
+    if mode not in ("1", "true", "yes", "on") and under_threshold(dataset_path):
+        return False
+
+    blocking = [name for name in python_files if not can_stream(name)]
+    if blocking:
+        print(f"[WARNING] Not streaming: {', '.join(blocking)} need(s) the whole dataset in memory.")
+        return False
+    return True
+
+
+class StreamingError(Exception):
+    """A step failed in streaming mode."""
+
+
+class ChunkSpill:
+    """DataFrame chunks pickled one after another into a file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.columns = 0
+        self._file = open(path, "wb")
+        self._written = False
+        self._empty = None
+
+    @property
+    def shape(self):
+        return self.rows, self.columns
+
+    def write(self, chunk):
+        if len(chunk) == 0:
+            # Kept only to give an output with no rows its columns
+            if not self._written:
+                self._empty = chunk
+            return
+        pickle.dump(chunk, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._written = True
+        self.rows += len(chunk)
+        self.columns = chunk.shape[1]
+
+    def close(self):
+        if not self._written and self._empty is not None:
+            pickle.dump(self._empty, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.columns = self._empty.shape[1]
+        self._file.close()
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def remove(self):
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def write_csv(spill, path):
+    first = True
+    for chunk in spill:
+        chunk.to_csv(path, mode="w" if first else "a", header=first, index=False)
+        first = False
+
+
+def run_step(mod, source, target):
+    """Fit pass (if the component has one), then the transform pass into target."""
+    state = {"work_dir": os.path.dirname(os.path.abspath(target.path))}
+    if hasattr(mod, "partial_fit"):
+        for chunk in source:
+            if len(chunk):
+                mod.partial_fit(state, chunk)
+    if hasattr(mod, "finish_fit"):
+        mod.finish_fit(state)
+    for chunk in source:
+        target.write(mod.transform(state, chunk) if len(chunk) else chunk)
+    if hasattr(mod, "finish_transform"):
+        mod.finish_transform(state)
+    target.close()
+
+
+def run_streaming(dataset_path, steps, output_path, log_dir=None):
+    """
+    Runs steps -- (index, module id, label, component file) -- over the
+    dataset chunk by chunk and writes the result to output_path.
+    """
+    from dataset_loader import read_chunks
+
+    work_dir = tempfile.mkdtemp(prefix="papad_stream_", dir=os.path.dirname(os.path.abspath(output_path)))
+    current = output = None
+    try:
+        rows_per_chunk = chunk_rows()
+        print(f"Streaming mode: {rows_per_chunk:,} rows per chunk.")
+        n_rows, chunks = read_chunks(dataset_path, rows_per_chunk)
+        current = ChunkSpill(os.path.join(work_dir, "input.pkl"))
+        for chunk in chunks:
+            current.write(chunk)
+        current.close()
+        emit("dataset_loaded", rows=n_rows, columns=current.columns, mode="stream")
+
+        for i, module_id, module_label, python_file in steps:
+            print(f"Running {module_label} (id={module_id})...")
+            emit("step_start", step=module_id, label=module_label, index=i)
+            started = time.time()
+            output = ChunkSpill(os.path.join(work_dir, f"step_{i}.pkl"))
+
+            try:
+                mod = importlib.import_module(
+                    f"preprocessing.Normal_preprocessing.components.{python_file}"
+                )
+                with span(
+                    "preprocessing.apply", data=current, profile=f"apply_{i}_{python_file}",
+                    step=module_id, component=python_file, stream=True,
+                ) as s:
+                    run_step(mod, current, output)
+                    s.output(output)
+            except Exception as e:
+                print(f"[ERROR] Failed running {module_label}: {e}")
+                emit("step_end", step=module_id, index=i, status="failed", duration=round(time.time() - started, 3))
+                raise StreamingError(f"{module_label}: {e}") from e
+
+            current.remove()
+            current = output
+            emit(
+                "step_end", step=module_id, index=i, status="done", duration=round(time.time() - started, 3),
+                rows=current.rows, columns=current.columns
+            )
+
+            if log_dir:
+                try:
+                    clean_name = module_label.replace(" ", "_").lower()
+                    safe_name = f"{i}_{clean_name}.csv"
+                    write_csv(current, os.path.join(log_dir, safe_name))
+                    print(f"   --> Saved log: {safe_name}")
+                except Exception as e:
+                    print(f"[WARNING] Failed to save log {safe_name}: {e}")
+
+        try:
+            write_csv(current, output_path)
+            print("Preprocessing done. Saved:", output_path)
+        except Exception as e:
+            print(f"[ERROR] Failed to save final output: {e}")
+    finally:
+        # Open spill files first (Windows can't remove them while open)
+        for spill in (current, output):
+            if spill is not None:
+                spill.remove()
+        shutil.rmtree(work_dir, ignore_errors=True)
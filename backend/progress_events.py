@@ -0,0 +1,72 @@
+# backend/progress_events.py
+import os
+import json
+import time
+from contextlib import contextmanager
+from telemetry import peak_rss_mb
+
+# Structured progress events for the Node routes, printed to stdout as one
+# JSON object per line (NDJSON) between the usual free-form log lines:
+#
+#   {"event": "stage_start", "stage": "automl", "elapsed": 0.41, "peak_rss_mb": 212.3}
+#   {"event": "candidate_end", "candidate": "kmeans", "status": "done", "metrics": {...}, "ranking": [...]}
+#
+# Every event has "event", "elapsed" (seconds since the job started) and
+# "peak_rss_mb" (peak resident memory of the job and its finished child
+# processes; null where the OS doesn't report it). Lines from candidate
+# worker processes go to the same stdout. PAPAD_EVENTS=0 turns them off.
+#
+# Events: stage_start / stage_end (duration, status), step_start / step_end
+# (preprocessing modules), plan (the rewrites of the preprocessing step
+# list), model_start / model_end, race_round,
+# candidate_start / candidate_end (with the ranking so far), score (one
+# per hyperparameter setting a model tries), output_start / output_end.
+
+EVENT_KEY = "event"
+
+_job_start = time.time()
+
+
+def enabled():
+    return os.environ.get("PAPAD_EVENTS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def reset_clock():
+    """Starts "elapsed" at 0 for a new job (the warm worker reuses this module)."""
+    global _job_start
+    _job_start = time.time()
+
+
+def _plain(value):
+    """JSON fallback for numpy scalars / arrays and other odd values."""
+    if hasattr(value, "item") and getattr(value, "ndim", 0) == 0:
+        return value.item()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def emit(event, **fields):
+    """Prints one event line (flushed right away, so it streams)."""
+    if not enabled():
+        return
+    peak = peak_rss_mb(children=True)
+    record = {EVENT_KEY: event, "elapsed": round(time.time() - _job_start, 3),
+              "peak_rss_mb": round(peak, 1) if peak is not None else None}
+    record.update(fields)
+    print(json.dumps(record, default=_plain), flush=True)
+
+
+@contextmanager
+def stage(name, **fields):
+    """Wraps a block in stage_start / stage_end events."""
+    emit("stage_start", stage=name, **fields)
+    start = time.time()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        emit("stage_end", stage=name, duration=round(time.time() - start, 3), status=status)
@@ -0,0 +1,192 @@
+// pythonWorker.js
+// Client for the warm Python worker (worker_service.py). The routes run their
+// handler scripts through runInWorker() and fall back to spawning a fresh
+// `python -u` process when the worker is disabled, not up yet, or doesn't
+// serve that script. Also parses the scripts' progress events.
+const path = require("path");
+const fs = require("fs");
+const http = require("http");
+const { spawn } = require("child_process");
+
+const rootDir = __dirname;
+const WORKER_HOST = "127.0.0.1";
+const WORKER_PORT = parseInt(process.env.PYTHON_WORKER_PORT || "5055", 10);
+const WORKER_ENABLED = process.env.PYTHON_WORKER !== "0";
+
+// Portable Python Resolver
+function resolvePythonExecutable() {
+    if (process.env.PYTHON_EXECUTABLE) {
+        return process.env.PYTHON_EXECUTABLE;
+    }
+    const venvPython = process.platform === "win32"
+        ? path.join(rootDir, "venv", "Scripts", "python.exe")
+        : path.join(rootDir, "venv", "bin", "python");
+
+    if (fs.existsSync(venvPython)) return venvPython;
+    return process.platform === "win32" ? "python" : "python3";
+}
+
+let workerProcess = null;
+
+const startWorker = () => {
+  if (!WORKER_ENABLED || workerProcess) return;
+
+  const pythonExecutable = resolvePythonExecutable();
+  workerProcess = spawn(
+    pythonExecutable,
+    ["-u", "worker_service.py", "--port", String(WORKER_PORT)],
+    { cwd: rootDir, stdio: ["ignore", "inherit", "inherit"] }
+  );
+  console.log(`🐍 [Worker] Starting warm Python worker on port ${WORKER_PORT}...`);
+
+  workerProcess.on("error", (err) => {
+    console.error(`⚠️ [Worker] Could not start (${err.message}). Scripts will be spawned per request.`);
+    workerProcess = null;
+  });
+  workerProcess.on("exit", (code) => {
+    console.log(`⚠️ [Worker] Exited with code ${code}. Scripts will be spawned per request.`);
+    workerProcess = null;
+  });
+
+  process.on("exit", () => {
+    if (workerProcess) workerProcess.kill();
+  });
+};
+
+const unavailable = (reason) => {
+  const err = new Error(`Python worker unavailable: ${reason}`);
+  err.workerUnavailable = true;
+  return err;
+};
+
+// Runs a script in the worker; resolves with its exit code. Rejects with
+// err.workerUnavailable set when the job never started, so the caller can spawn instead.
+const runInWorker = (scriptPath, args, onStdout, onStderr) => {
+  return new Promise((resolve, reject) => {
+    if (!WORKER_ENABLED) return reject(unavailable("disabled"));
+
+    const body = JSON.stringify({ script: scriptPath, args });
+    let started = false;
+    const req = http.request(
+      {
+        host: WORKER_HOST,
+        port: WORKER_PORT,
+        path: "/run",
+        method: "POST",
+        headers: { "Content-Type": "application/json", "Content-Length": Buffer.byteLength(body) },
+      },
+      (res) => {
+        started = true;
+        if (res.statusCode !== 200) {
+          res.resume();
+          return reject(unavailable(`status ${res.statusCode}`));
+        }
+
+        // NDJSON events: {"stream": "stdout"|"stderr", "data": ...} ... {"exit": code}
+        res.setEncoding("utf8");
+        let buffer = "";
+        let exitCode = null;
+
+        res.on("data", (chunk) => {
+          buffer += chunk;
+          let newline;
+          while ((newline = buffer.indexOf("\n")) !== -1) {
+            const line = buffer.slice(0, newline);
+            buffer = buffer.slice(newline + 1);
+            if (!line.trim()) continue;
+
+            let event;
+            try {
+              event = JSON.parse(line);
+            } catch (e) {
+              // Not one of the worker's NDJSON events (truncated, or another service on the port)
+              res.destroy();
+              return reject(new Error(`Unexpected response from the Python worker: ${line.slice(0, 200)}`));
+            }
+            if (event.exit !== undefined) exitCode = event.exit;
+            else if (event.stream === "stderr") onStderr(event.data);
+            else onStdout(event.data);
+          }
+        });
+        res.on("end", () => {
+          if (exitCode === null) reject(new Error("Python worker closed the connection before the job finished"));
+          else resolve(exitCode);
+        });
+        res.on("error", reject);
+      }
+    );
+
+    // Only a job that never started may be retried with spawn
+    req.on("error", (err) => reject(started ? err : unavailable(err.message)));
+    req.end(body);
+  });
+};
+
+// --- Progress events (progress_events.py) ---
+// Scripts print NDJSON event lines ({"event": ...}) between their normal logs.
+
+const parseEvent = (line) => {
+  const text = line.trim();
+  if (!text.startsWith('{"event"')) return null;
+  try {
+    return JSON.parse(text);
+  } catch (e) {
+    return null;
+  }
+};
+
+// Splits stdout chunks into lines: event lines go to onEvent, everything else to onText
+const splitProgressEvents = (onText, onEvent) => {
+  let partial = "";
+  const push = (str) => {
+    partial += str;
+    let newline;
+    while ((newline = partial.indexOf("\n")) !== -1) {
+      const line = partial.slice(0, newline + 1);
+      partial = partial.slice(newline + 1);
+      const event = parseEvent(line);
+      if (event) onEvent(event);
+      else onText(line);
+    }
+  };
+  push.flush = () => {
+    if (partial) onText(partial);
+    partial = "";
+  };
+  return push;
+};
+
+// One console line for the events worth logging (the scripts log the rest themselves)
+const describeEvent = (event) => {
+  const mem = event.peak_rss_mb != null ? `, peak ${event.peak_rss_mb} MB` : "";
+  if (event.event === "stage_end") {
+    return `   ⏱️ ${event.stage} ${event.status} in ${event.duration}s${mem}`;
+  }
+  if (event.event === "candidate_end") {
+    const top = (event.ranking || []).slice(0, 3).map((r) => r.candidate).join(" > ");
+    return `   📊 ${event.candidate} ${event.status} (${event.duration}s)${top ? ` | ranking so far: ${top}` : ""}`;
+  }
+  return null;
+};
+
+// Latest progress per branch, served by GET /progress while a pipeline runs
+const MAX_EVENTS_PER_BRANCH = 200;
+const progress = {};
+
+const recordProgress = (branchName, event) => {
+  const branch = progress[branchName] || (progress[branchName] = { events: [], ranking: [] });
+  branch.events.push(event);
+  if (branch.events.length > MAX_EVENTS_PER_BRANCH) branch.events.shift();
+  if (event.event === "stage_start") branch.stage = event.stage;
+  if (event.ranking) branch.ranking = event.ranking;
+  if (event.event === "stage_start" && event.stage === "automl") branch.ranking = [];
+};
+
+const resetProgress = (branchName) => {
+  progress[branchName] = { events: [], ranking: [] };
+};
+
+module.exports = {
+  startWorker, runInWorker, resolvePythonExecutable,
+  splitProgressEvents, describeEvent, recordProgress, resetProgress, progress,
+};
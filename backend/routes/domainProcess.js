@@ -5,25 +5,14 @@ const fs = require("fs");
 const { spawn } = require("child_process");
 const dotenv = require("dotenv");
 const { upload, uploadDir } = require("../middleware/upload");
+const { runInWorker, resolvePythonExecutable, splitProgressEvents, describeEvent, recordProgress, resetProgress } = require("../pythonWorker");
 
 dotenv.config();
 
 // 1. Define Root Dir (Go up one level from 'routes' to 'backend')
 const rootDir = path.join(__dirname, "..");
 
-// 2. Portable Python Resolver
-function resolvePythonExecutable() {
-    if (process.env.PYTHON_EXECUTABLE) {
-        return process.env.PYTHON_EXECUTABLE;
-    }
-    const venvPython = process.platform === "win32"
-        ? path.join(rootDir, "venv", "Scripts", "python.exe")
-        : path.join(rootDir, "venv", "bin", "python");
-
-    if (fs.existsSync(venvPython)) return venvPython;
-    return process.platform === "win32" ? "python" : "python3";
-}
-
+// 2. Portable Python Resolver (shared with the warm worker)
 const pythonExecutable = resolvePythonExecutable();
 console.log(`🐍 [DomainProcess] Using Python: ${pythonExecutable}`);
 
@@ -39,15 +28,13 @@ const loadJsonSafe = (filePath) => {
 };
 
 // --- Helper: Run Python Script ---
-const runPythonScript = (scriptPath, args) => {
+const runPythonScript = (scriptPath, args, onEvent = null) => {
   return new Promise((resolve, reject) => {
-    const python = spawn(pythonExecutable, ["-u", scriptPath, ...args]);
     let output = "";
     let errorOutput = "";
     let isPrintingJson = false;
 
-    python.stdout.on("data", (data) => { 
-        const str = data.toString();
+    const onText = (str) => { 
         output += str;
         
         if (str.includes("__JSON_START__")) {
@@ -69,18 +56,38 @@ const runPythonScript = (scriptPath, args) => {
                 process.stdout.write(str);
             }
         }
-    });
+    };
+
+    const onStderr = (str) => { errorOutput += str; };
 
-    python.stderr.on("data", (data) => { errorOutput += data.toString(); });
+    // Progress event lines are logged briefly and handed to onEvent, never mixed into the output
+    const onStdout = splitProgressEvents(onText, (event) => {
+        const line = describeEvent(event);
+        if (line) console.log(line);
+        if (onEvent) onEvent(event);
+    });
 
-    python.on("close", (code) => {
+    const onClose = (code) => {
+      onStdout.flush();
       if (code === 0) resolve(output);
       else {
         const shortError = errorOutput.split('\n').filter(l => l.trim() !== '').slice(-3).join('\n');
         console.error(`[Py-Err] ${scriptPath} exited with code ${code}. Details:\n${shortError}`);
         reject(new Error(errorOutput || `Script exited with code ${code}`));
       }
-    });
+    };
+
+    // Warm worker first (no import cost); spawn a fresh process if it isn't available
+    runInWorker(scriptPath, args, onStdout, onStderr)
+      .then(onClose)
+      .catch((err) => {
+        if (!err.workerUnavailable) return reject(err);
+
+        const python = spawn(pythonExecutable, ["-u", scriptPath, ...args]);
+        python.stdout.on("data", (data) => onStdout(data.toString()));
+        python.stderr.on("data", (data) => onStderr(data.toString()));
+        python.on("close", onClose);
+      });
   });
 };
 
@@ -150,6 +157,10 @@ router.post("/execute-approved-plan", upload.single("dataset"), async (req, res)
     const preprocessedPath = path.join(rootDir, outputCsvName);
     
     if (!fs.existsSync(logDirPath)) fs.mkdirSync(logDirPath, { recursive: true });
+
+    // Progress events of this plan's scripts, served by GET /progress
+    resetProgress(branchName);
+    const onEvent = (event) => recordProgress(branchName, event);
   
     console.log(`\n🏥 Executing Medical Plan on ${branchName}...`);
   
@@ -157,7 +168,8 @@ router.post("/execute-approved-plan", upload.single("dataset"), async (req, res)
       // 1. Run Preprocessing Logic
       await runPythonScript(
         "preprocessing/Domain_based_preprocessing/medical_plan_executor.py",
-        [datasetPath, JSON.stringify(plan), preprocessedPath, logDirPath]
+        [datasetPath, JSON.stringify(plan), preprocessedPath, logDirPath],
+        onEvent
       );
 
       // 2. Build Graph Visualization
@@ -220,7 +232,8 @@ router.post("/execute-approved-plan", upload.single("dataset"), async (req, res)
 
           const output = await runPythonScript(
             "model_selectionAndTraining/model_handler.py",
-            [preprocessedPath, JSON.stringify(payload)]
+            [preprocessedPath, JSON.stringify(payload)],
+            onEvent
           );
   
           const jsonStart = output.indexOf("__JSON_START__");
@@ -243,7 +256,8 @@ router.post("/execute-approved-plan", upload.single("dataset"), async (req, res)
         try {
           const output = await runPythonScript(
             "output_section/output_handler.py",
-            [preprocessedPath, trainedModelPath, JSON.stringify(oList)]
+            [preprocessedPath, trainedModelPath, JSON.stringify(oList)],
+            onEvent
           );
           const jsonStart = output.indexOf("__JSON_START__");
           const jsonEnd = output.indexOf("__JSON_END__");
@@ -4,6 +4,7 @@ const path = require("path");
 const fs = require("fs");
 const { spawn } = require("child_process");
 const { upload } = require("../middleware/upload");
+const { runInWorker, splitProgressEvents, describeEvent, recordProgress, resetProgress, progress } = require("../pythonWorker");
 
 const rootDir = path.join(__dirname, "..");
 
@@ -68,17 +69,15 @@ const generateGraphData = (pList, mList, oList) => {
   return { nodes, edges };
 };
 
-const runPythonScript = (scriptPath, args) => {
+const runPythonScript = (scriptPath, args, onEvent = null) => {
   return new Promise((resolve, reject) => {
-    const python = spawn("python", ["-u", scriptPath, ...args]);
     let output = "";
     let errorOutput = "";
     
     // Flag to track if we are currently inside the JSON data block
     let isPrintingJson = false;
 
-    python.stdout.on("data", (data) => { 
-        const str = data.toString();
+    const onText = (str) => { 
         output += str; // Always capture full output for logic
         
         // --- SMART LOGGING ---
@@ -107,11 +106,19 @@ const runPythonScript = (scriptPath, args) => {
                 process.stdout.write(str);
             }
         }
-    });
+    };
+
+    const onStderr = (str) => { errorOutput += str; };
 
-    python.stderr.on("data", (data) => { errorOutput += data.toString(); });
+    // Progress event lines are logged briefly and handed to onEvent, never mixed into the output
+    const onStdout = splitProgressEvents(onText, (event) => {
+        const line = describeEvent(event);
+        if (line) console.log(line);
+        if (onEvent) onEvent(event);
+    });
 
-    python.on("close", (code) => {
+    const onClose = (code) => {
+      onStdout.flush();
       if (code === 0) {
         resolve(output);
       } else {
@@ -119,7 +126,19 @@ const runPythonScript = (scriptPath, args) => {
         console.error(`[Py-Err] ${scriptPath} exited with code ${code}. Details:\n${shortError}`);
         reject(new Error(errorOutput || `Script exited with code ${code}`));
       }
-    });
+    };
+
+    // Warm worker first (no import cost); spawn a fresh process if it isn't available
+    runInWorker(scriptPath, args, onStdout, onStderr)
+      .then(onClose)
+      .catch((err) => {
+        if (!err.workerUnavailable) return reject(err);
+
+        const python = spawn("python", ["-u", scriptPath, ...args]);
+        python.stdout.on("data", (data) => onStdout(data.toString()));
+        python.stderr.on("data", (data) => onStderr(data.toString()));
+        python.on("close", onClose);
+      });
   });
 };
 
@@ -137,11 +156,16 @@ const processBranch = async (branchName, datasetPath, pList, mList, oList) => {
   const allModules = loadJsonSafe("preprocessing/Normal_preprocessing/normal_preprocessing_modules.json");
   const modulesToUse = pList.map(id => allModules.find(m => m.id === id)).filter(Boolean);
 
+  // Progress events of this branch's scripts, served by GET /progress
+  resetProgress(branchName);
+  const onEvent = (event) => recordProgress(branchName, event);
+
   // A. PREPROCESSING
   try {
     await runPythonScript(
       "preprocessing/Normal_preprocessing/normal_preprocessing_handler.py",
-      [datasetPath, JSON.stringify(modulesToUse), preprocessedPath, logDirPath]
+      [datasetPath, JSON.stringify(modulesToUse), preprocessedPath, logDirPath],
+      onEvent
     );
     console.log(`   ✅ Preprocessing Complete.`);
   } catch (err) {
@@ -160,7 +184,8 @@ const processBranch = async (branchName, datasetPath, pList, mList, oList) => {
       if (selectedModels.length > 0) {
         const output = await runPythonScript(
           "model_selectionAndTraining/model_handler.py",
-          [preprocessedPath, JSON.stringify(selectedModels)]
+          [preprocessedPath, JSON.stringify(selectedModels)],
+          onEvent
         );
 
         const jsonStart = output.indexOf("__JSON_START__");
@@ -191,7 +216,8 @@ const processBranch = async (branchName, datasetPath, pList, mList, oList) => {
         try {
           const output = await runPythonScript(
             "output_section/output_handler.py",
-            [preprocessedPath, trainedModelPath, JSON.stringify(oList)]
+            [preprocessedPath, trainedModelPath, JSON.stringify(oList)],
+            onEvent
           );
 
           const jsonStart = output.indexOf("__JSON_START__");
@@ -241,4 +267,9 @@ router.post("/preprocess-normal", upload.single("dataset"), async (req, res) =>
   }
 });
 
+// Live progress of the running branches (stage, recent events, AutoML ranking so far)
+router.get("/progress", (req, res) => {
+  res.json(progress);
+});
+
 module.exports = { router, processBranch };
\ No newline at end of file
@@ -6,6 +6,7 @@ const dotenv = require("dotenv");
 dotenv.config();
 
 const { upload } = require("./middleware/upload");
+const { startWorker } = require("./pythonWorker");
 const resourceRoutes = require("./routes/resources");
 
 // 1. Import Normal Processing Routes & Helper
@@ -111,6 +112,9 @@ app.post("/run-config", upload.single("dataset"), async (req, res) => {
   }
 });
 
+// Warm Python worker for the preprocessing / training / output scripts (PYTHON_WORKER=0 disables)
+startWorker();
+
 app.listen(PORT, () => {
   console.log(`✅ Backend running at http://localhost:${PORT}`);
 });
\ No newline at end of file
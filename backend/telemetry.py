@@ -0,0 +1,366 @@
+# backend/telemetry.py
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import argparse
+import itertools
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+# Timing spans for the whole pipeline, written to a trace file per job.
+#
+#   with span("preprocessing.apply", data=df, component="scaling") as s:
+#       df = mod.apply(df)
+#       s.output(df)
+#
+#   @traced("metrics.calculate")
+#   def calculate_metrics_batch(X, ...): ...
+#
+# A span records wall time, CPU time (this process), the process's peak RSS
+# when it ends and how much that peak grew during the span, plus rows /
+# columns in and out when it is given data (anything with .shape or len()).
+# Spans nest: each one knows its parent.
+#
+# start_trace(job) (called by each handler's main()) opens
+# traces/<job>_<timestamp>_<pid>.jsonl: a header line, then one line per
+# finished span, appended by whichever process ran it -- AutoML candidate
+# workers inherit the path through PAPAD_TRACE_FILE. Lines are in completion
+# order; `python telemetry.py diff A B` compares two traces per span name. PAPAD_TRACE=0 turns tracing off, PAPAD_TRACE_DIR
+# moves the files and PAPAD_TRACE_KEEP (default 50) caps how many are kept.
+#
+# Profiling: with PAPAD_PROFILE=1 (or --profile on a handler's command line)
+# the spans opened with profile=<label> -- each model train and each
+# preprocessing apply -- also run under cProfile and leave <label>.prof
+# plus <label>.txt (the PAPAD_PROFILE_TOP hottest functions, default 30) in
+# the run's log directory: the preprocessing log dir when there is one,
+# otherwise <trace>_profiles/ next to the trace (PAPAD_PROFILE_DIR
+# overrides both). Load a .prof with `python -m pstats` or snakeviz.
+
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces")
+TRACE_FILE_ENV = "PAPAD_TRACE_FILE"
+DEFAULT_KEEP = 50
+PROFILE_FLAG = "--profile"
+PROFILE_RUN_DIR_ENV = "PAPAD_PROFILE_RUN_DIR"
+DEFAULT_PROFILE_TOP = 30
+
+_ids = itertools.count(1)
+_local = threading.local()
+
+
+def enabled():
+    return os.environ.get("PAPAD_TRACE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def profiling_enabled():
+    return os.environ.get("PAPAD_PROFILE", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def profile_flag(argv):
+    """Removes --profile from a handler's argv (turning profiling on) and returns the rest."""
+    if PROFILE_FLAG not in argv:
+        return argv
+    os.environ["PAPAD_PROFILE"] = "1"
+    return [arg for arg in argv if arg != PROFILE_FLAG]
+
+
+def trace_path():
+    """The current job's trace file, or None when no trace is being written."""
+    return os.environ.get(TRACE_FILE_ENV) if enabled() else None
+
+
+def peak_rss_mb(children=False):
+    """
+    Peak resident memory of this process in MB (children=True: or of its
+    largest finished child process, if bigger); None where the OS doesn't report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _shape(data):
+    """(rows, columns) of a DataFrame / array / sequence, or (None, None)."""
+    shape = getattr(data, "shape", None)
+    if shape is not None and len(shape) >= 1:
+        return int(shape[0]), int(shape[1]) if len(shape) > 1 else 1
+    try:
+        return len(data), None
+    except TypeError:
+        return None, None
+
+
+def _write(record):
+    path = trace_path()
+    if not path:
+        return
+    line = json.dumps(record, default=str) + "\n"
+    try:
+        # One write per line in append mode, so lines from parallel
+        # candidate processes don't interleave
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def _prune(directory, keep):
+    files = sorted(glob.glob(os.path.join(directory, "*.jsonl")), key=os.path.getmtime)
+    for path in files[:max(0, len(files) - keep)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        shutil.rmtree(_profiles_next_to(path), ignore_errors=True)
+
+
+def _profiles_next_to(trace):
+    return os.path.splitext(trace)[0] + "_profiles"
+
+
+def start_trace(job, argv=None, log_dir=None):
+    """
+    Opens a new trace file for this job and returns its path (None when
+    tracing is off). `log_dir` is where this run's profiles go, if it has one.
+    """
+    os.environ.pop(TRACE_FILE_ENV, None)
+    if log_dir:
+        os.environ[PROFILE_RUN_DIR_ENV] = os.path.abspath(log_dir)
+    else:
+        os.environ.pop(PROFILE_RUN_DIR_ENV, None)
+    if not enabled():
+        return None
+
+    directory = os.environ.get("PAPAD_TRACE_DIR") or TRACE_DIR
+    try:
+        keep = int(os.environ.get("PAPAD_TRACE_KEEP", DEFAULT_KEEP))
+    except ValueError:
+        keep = DEFAULT_KEEP
+    try:
+        os.makedirs(directory, exist_ok=True)
+        _prune(directory, max(0, keep - 1))
+    except OSError as e:
+        print(f"[WARNING] Tracing disabled: {e}")
+        return None
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, f"{job}_{stamp}_{os.getpid()}.jsonl")
+    os.environ[TRACE_FILE_ENV] = path
+    _write({
+        "trace": job,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "argv": list(argv or [])[1:],
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+    })
+    return path
+
+
+def profile_dir():
+    """Where this run's profiles are written."""
+    directory = os.environ.get("PAPAD_PROFILE_DIR") or os.environ.get(PROFILE_RUN_DIR_ENV)
+    if directory:
+        return directory
+    path = trace_path()
+    return _profiles_next_to(path) if path else os.path.join(TRACE_DIR, "profiles")
+
+
+_profiling = False
+
+
+def _start_profile():
+    """A running cProfile.Profile, or None when profiling is off or one is already running."""
+    global _profiling
+    if not profiling_enabled() or _profiling:
+        return None
+    import cProfile
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        return None  # another profiler (e.g. the caller's own) is active
+    _profiling = True
+    return profile
+
+
+def _save_profile(profile, label):
+    """Writes <label>.prof and the <label>.txt summary; returns the .prof path."""
+    global _profiling
+    profile.disable()
+    _profiling = False
+
+    import pstats
+    try:
+        top = int(os.environ.get("PAPAD_PROFILE_TOP", DEFAULT_PROFILE_TOP))
+    except ValueError:
+        top = DEFAULT_PROFILE_TOP
+    safe_label = "".join(c if c.isalnum() or c in "-_." else "_" for c in label)
+    directory = profile_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        prof_path = os.path.join(directory, f"{safe_label}.prof")
+        profile.dump_stats(prof_path)
+        with open(os.path.join(directory, f"{safe_label}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"{label}: top {top} functions by cumulative time\n\n")
+            stats = pstats.Stats(profile, stream=f)
+            stats.sort_stats("cumulative").print_stats(top)
+            f.write(f"\n{label}: top {top} functions by own time\n\n")
+            stats.sort_stats("tottime").print_stats(top)
+    except OSError as e:
+        print(f"[WARNING] Could not save profile {label}: {e}")
+        return None
+    print(f"   [PROFILE] {label} -> {prof_path}")
+    return prof_path
+
+
+class Span:
+    def __init__(self, name, data=None, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.id = f"{os.getpid()}-{next(_ids)}"
+        self.parent = None
+        self.rows_in, self.columns_in = _shape(data) if data is not None else (None, None)
+        self.rows_out = self.columns_out = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def output(self, data):
+        """Records the rows / columns the span produced."""
+        self.rows_out, self.columns_out = _shape(data)
+        return data
+
+
+@contextmanager
+def span(name, data=None, profile=None, **attrs):
+    """Times a block; see the module comment. `profile` labels its cProfile capture."""
+    s = Span(name, data, **attrs)
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    s.parent = stack[-1].id if stack else None
+    stack.append(s)
+
+    status = "ok"
+    profiler = _start_profile() if profile else None
+    rss_before = peak_rss_mb()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield s
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        stack.pop()
+        if profiler is not None:
+            s.attrs["profile"] = _save_profile(profiler, profile)
+        rss_after = peak_rss_mb()
+        record = {
+            "span": s.name,
+            "id": s.id,
+            "parent": s.parent,
+            "pid": os.getpid(),
+            "status": status,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss_mb": round(rss_after, 1) if rss_after is not None else None,
+            "rss_growth_mb": round(rss_after - rss_before, 1) if rss_after is not None else None,
+            "rows_in": s.rows_in,
+            "columns_in": s.columns_in,
+            "rows_out": s.rows_out,
+            "columns_out": s.columns_out,
+        }
+        record.update(s.attrs)
+        _write(record)
+
+
+def traced(name):
+    """Decorator form of span(); rows/columns in are taken from the first argument."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, data=args[0] if args else None) as s:
+                return s.output(func(*args, **kwargs))
+        return wrapper
+    return decorate
+
+
+# ----------------------------------------------------------------------
+# Comparing traces
+# ----------------------------------------------------------------------
+
+def load_trace(path):
+    """Returns (header, spans) of a trace file."""
+    header, spans = {}, []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "trace" in record:
+                header = record
+            else:
+                spans.append(record)
+    return header, spans
+
+
+def summarize(spans):
+    """{span name: {count, wall_s, cpu_s, peak_rss_mb}} (totals / max)."""
+    summary = {}
+    for s in spans:
+        entry = summary.setdefault(s["span"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": 0.0})
+        entry["count"] += 1
+        entry["wall_s"] += s.get("wall_s") or 0.0
+        entry["cpu_s"] += s.get("cpu_s") or 0.0
+        entry["peak_rss_mb"] = max(entry["peak_rss_mb"], s.get("peak_rss_mb") or 0.0)
+    return summary
+
+
+def diff(path_a, path_b):
+    """Prints the per-span totals of two traces side by side."""
+    a, b = summarize(load_trace(path_a)[1]), summarize(load_trace(path_b)[1])
+    print(f"{'span':<28} {'count':>11} {'wall A':>9} {'wall B':>9} {'change':>8} {'peak MB A':>10} {'peak MB B':>10}")
+    for name in sorted(set(a) | set(b)):
+        ea = a.get(name, {"count": 0, "wall_s": 0.0, "peak_rss_mb": 0.0})
+        eb = b.get(name, {"count": 0, "wall_s": 0.0, "peak_rss_mb": 0.0})
+        change = f"{(eb['wall_s'] / ea['wall_s'] - 1) * 100:+.0f}%" if ea["wall_s"] > 0 else "new"
+        counts = f"{ea['count']}/{eb['count']}"
+        print(
+            f"{name:<28} {counts:>11} {ea['wall_s']:>8.3f}s {eb['wall_s']:>8.3f}s {change:>8} "
+            f"{ea['peak_rss_mb']:>10.1f} {eb['peak_rss_mb']:>10.1f}"
+        )
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Inspect pipeline trace files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("summary", help="per-span totals of one trace")
+    show.add_argument("trace")
+    compare = commands.add_parser("diff", help="compare two traces per span name")
+    compare.add_argument("trace_a")
+    compare.add_argument("trace_b")
+    options = parser.parse_args(argv[1:])
+
+    if options.command == "summary":
+        header, spans = load_trace(options.trace)
+        print(json.dumps({"trace": header, "spans": summarize(spans)}, indent=1))
+    else:
+        diff(options.trace_a, options.trace_b)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Same import roots the handlers use: backend/ (and the training package)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, "model_selectionAndTraining")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# No progress events / traces from the code under test
+os.environ.setdefault("PAPAD_EVENTS", "0")
+os.environ.setdefault("PAPAD_TRACE", "0")
@@ -0,0 +1,68 @@
+import contextlib
+import importlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.cluster import DBSCAN
+from sklearn.datasets import make_blobs
+
+from models.artifacts import load_artifact, save_model
+from models.feature_store import FeatureMatrix
+
+
+def test_all_noise_dbscan_predicts_noise(tmp_path):
+    X, _ = make_blobs(200, n_features=3, random_state=0)
+    model = DBSCAN(eps=1e-6, min_samples=5).fit(X)
+    core = model.core_sample_indices_
+    assert len(core) == 0
+
+    # Saved the way models/dbscan.py saves it: core samples as the reference rows
+    path = save_model(model, str(tmp_path / "dbscan_model.pkl"), feature_names=["a", "b", "c"],
+                      predictor_rows=X[core], predictor_labels=model.labels_[core], max_distance=model.eps)
+    artifact = load_artifact(path)
+
+    labels = artifact.predict(pd.DataFrame(X, columns=["a", "b", "c"]))
+    np.testing.assert_array_equal(labels, np.full(len(X), -1))
+
+
+MODELS = ["kmeans", "minibatch_kmeans", "k_medoids", "gmm", "dbscan", "optics", "hierarchical",
+          "meanshift", "birch", "affinity_propagation", "spectral"]
+
+
+@pytest.fixture
+def blobs():
+    X, _ = make_blobs(150, n_features=3, centers=3, cluster_std=0.6, random_state=1)
+    df = pd.DataFrame(X, columns=["a", "b", "c"])
+    df["flag"] = df["a"] > df["a"].median()  # bool columns are features too
+    return df
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_artifact_round_trip(name, tmp_path, monkeypatch, blobs):
+    if name == "k_medoids":
+        pytest.importorskip("sklearn_extra")
+    module = importlib.import_module(f"models.{name}")
+
+    # Keep what train() hands save_model, to compare the loaded artifact against
+    saved = {}
+
+    def capture(model, path, **kwargs):
+        saved.update(kwargs, model=model)
+        return save_model(model, path, **kwargs)
+
+    monkeypatch.setattr(module, "save_model", capture)
+    features = FeatureMatrix.from_frame(blobs)
+    save_path = str(tmp_path / f"{name}_model.pkl")
+    with contextlib.redirect_stdout(io.StringIO()):
+        module.train(None, None, None, None, None, None, "target", save_path, features=features)
+
+    artifact = load_artifact(save_path)
+    assert artifact.feature_names == ["a", "b", "c", "flag"]
+    if saved.get("predictor_rows") is not None:
+        # Models without predict(): the reference rows keep their own labels
+        rows = np.asarray(saved["predictor_rows"])
+        np.testing.assert_array_equal(artifact.predict(rows), saved["predictor_labels"])
+    else:
+        np.testing.assert_array_equal(artifact.predict(blobs), saved["model"].predict(features.array))
@@ -0,0 +1,44 @@
+import random
+
+import find_best_model
+
+# Metrics per candidate, with ties so the order of equal ranks matters too
+METRICS = {
+    "kmeans": {"silhouette_score": 0.61, "calinski_harabasz_score": 410.0, "davies_bouldin_score": 0.52},
+    "minibatch_kmeans": {"silhouette_score": 0.61, "calinski_harabasz_score": 410.0, "davies_bouldin_score": 0.52},
+    "gmm": {"silhouette_score": 0.58, "calinski_harabasz_score": 430.0, "davies_bouldin_score": 0.55},
+    "birch": {"silhouette_score": 0.40, "calinski_harabasz_score": 200.0, "davies_bouldin_score": 0.90},
+    "dbscan": {"silhouette_score": 0.58, "calinski_harabasz_score": 150.0, "davies_bouldin_score": 0.40},
+    "hierarchical": {"silhouette_score": 0.55, "calinski_harabasz_score": 430.0, "davies_bouldin_score": 0.55},
+}
+NAMES = list(METRICS)
+
+
+def ranking(completion_order):
+    """(winner, ranked candidate names) for results that came in in completion_order."""
+    results = {}
+    for name in completion_order:  # dict order = completion order, as in train_all_candidates
+        results[name] = {"model": name, "label": name.title(), "metrics": dict(METRICS[name]),
+                         "path": f"candidate_{name}", "internal_name": name}
+    candidates = find_best_model.collect_candidates(results, NAMES, quiet=True)
+    table = find_best_model.rank_candidates(candidates)
+    order = [candidates[int(i)]["internal_name"] for i in table["index"]]
+    return order[0], order
+
+
+def test_ranking_ignores_completion_order():
+    expected = ranking(NAMES)
+    rng = random.Random(0)
+    for _ in range(50):
+        shuffled = NAMES[:]
+        rng.shuffle(shuffled)
+        assert ranking(shuffled) == expected
+
+
+def test_racing_is_opt_in(monkeypatch):
+    monkeypatch.delenv("PAPAD_AUTOML_RACE", raising=False)
+    assert not find_best_model.resolve_race()
+    assert find_best_model.resolve_race(True)
+    monkeypatch.setenv("PAPAD_AUTOML_RACE", "1")
+    assert find_best_model.resolve_race()
+    assert not find_best_model.resolve_race(False)
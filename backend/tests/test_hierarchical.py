@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.datasets import make_blobs
+
+from models.hierarchical import cut_tree
+
+ROWS = 300
+
+
+@pytest.mark.parametrize("linkage", ["ward", "average", "single"])
+def test_cut_tree_matches_agglomerative_clustering(linkage):
+    X, _ = make_blobs(ROWS, n_features=3, centers=5, cluster_std=2.0, random_state=0)
+    tree = AgglomerativeClustering(n_clusters=2, linkage=linkage, compute_full_tree=True).fit(X)
+
+    for k in list(range(1, 16)) + [ROWS - 1, ROWS]:
+        expected = AgglomerativeClustering(n_clusters=k, linkage=linkage).fit(X).labels_
+        labels = cut_tree(tree.children_, tree.n_leaves_, k)
+        # Same partition; clusters may be numbered differently
+        np.testing.assert_array_equal(pd.factorize(labels)[0], pd.factorize(expected)[0], err_msg=f"k={k}")
@@ -0,0 +1,66 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from preprocessing.Normal_preprocessing import normal_preprocessing_handler as handler
+
+# (module ids, whether the step logs must match too). A moved remove_duplicates
+# logs the frames of the order the steps ran in, so only the output is compared there.
+CHAINS = {
+    "reorder_skip_fuse": (["np7", "np1", "np1", "np2", "np8", "np9", "np9"], False),
+    "skip_fuse": (["np2", "np2", "np8", "np9", "np9", "np7", "np7"], True),
+}
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    rng = np.random.default_rng(3)
+    n = 2000
+    df = pd.DataFrame({
+        "a": rng.integers(0, 4, n),
+        "b": rng.choice([0.5, 1.5, 2.5, np.nan], n),
+        "e": rng.exponential(size=n).round(1),
+        "t": rng.choice(["x", "y", "z"], n),
+    })
+    df = pd.concat([df, df.iloc[:300]], ignore_index=True)  # duplicate rows for remove_duplicates
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def run_handler(tmp_path, monkeypatch, dataset, chain, plan):
+    """Runs the handler on dataset; returns {file name: bytes} of its output and step logs."""
+    run_dir = tmp_path / f"plan_{plan}"
+    run_dir.mkdir()
+    # The handler's cleanup deletes branch_* files next to it; point it at the run dir
+    monkeypatch.setattr(handler, "ROOT_DIR", str(run_dir))
+    monkeypatch.setattr(handler, "current_script_dir", str(run_dir))
+    monkeypatch.setenv("PAPAD_PLAN", plan)
+    monkeypatch.setenv("PAPAD_DATASET_CACHE", "0")
+
+    output, log_dir = run_dir / "out.csv", run_dir / "logs"
+    modules = json.dumps([{"id": module_id} for module_id in chain])
+    handler.main(["handler", str(dataset), modules, str(output), str(log_dir)])
+
+    files = {"output": output.read_bytes()}
+    for name in os.listdir(log_dir):
+        files[name] = (log_dir / name).read_bytes()
+    return files
+
+
+@pytest.mark.parametrize("name", CHAINS)
+def test_plan_output_is_byte_identical(name, tmp_path, monkeypatch, dataset, capsys):
+    chain, compare_logs = CHAINS[name]
+    naive = run_handler(tmp_path, monkeypatch, dataset, chain, "0")
+    capsys.readouterr()
+    planned = run_handler(tmp_path, monkeypatch, dataset, chain, "1")
+    assert "Plan: " in capsys.readouterr().out
+
+    assert planned["output"] == naive["output"]
+    assert sorted(planned) == sorted(naive)  # every step still writes its log
+    if compare_logs:
+        for log_name, data in naive.items():
+            assert planned[log_name] == data, log_name
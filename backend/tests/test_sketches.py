@@ -0,0 +1,83 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import KBinsDiscretizer
+
+from preprocessing.Normal_preprocessing.sketches import ColumnSketch
+from preprocessing.Normal_preprocessing.components import binning, log_transform, outlier_removal_iqr
+
+ROWS = 20_000  # well past the default sketch size (4096)
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "normal": rng.normal(size=ROWS),
+        "heavy": rng.standard_t(2, size=ROWS),
+        "skewed": rng.exponential(size=ROWS),
+        "ints": rng.integers(0, 50, size=ROWS),
+        "rounded": rng.normal(size=ROWS).round(1),
+    })
+    df["target"] = rng.integers(0, 2, size=ROWS)
+    return df
+
+
+def test_exact_sketch_matches_pandas(frame):
+    X = frame.iloc[:, :-1]
+    sketch = ColumnSketch(distinct_limit=5, exact=True).update(X)
+
+    np.testing.assert_array_equal(sketch.quantiles([0.25, 0.75]), X.quantile([0.25, 0.75]).to_numpy())
+    np.testing.assert_array_equal(sketch.skew(), X.skew().to_numpy())
+    levels = np.linspace(0, 100, 6)
+    expected = np.column_stack([np.percentile(X[c], levels, method="averaged_inverted_cdf") for c in X])
+    np.testing.assert_array_equal(sketch.percentiles(levels, method="averaged_inverted_cdf"), expected)
+
+
+def test_sketched_path_stays_close_to_exact(frame):
+    X = frame.iloc[:, :-1]
+    exact = ColumnSketch(exact=True).update(X)
+    sketched = ColumnSketch(size=256)
+    for start in range(0, ROWS, 1000):  # chunk by chunk, as in streaming mode
+        sketched.merge(ColumnSketch(size=256).update(X.iloc[start:start + 1000]))
+
+    # Rank error: the sketched quartiles sit within a couple of percent of the exact ones
+    for level, approx in zip([0.25, 0.75], sketched.quantiles([0.25, 0.75])):
+        below = (X.to_numpy() < approx).mean(axis=0)
+        at_or_below = (X.to_numpy() <= approx).mean(axis=0)  # differs from below on ties
+        assert np.all(below < level + 0.02) and np.all(at_or_below > level - 0.02)
+    np.testing.assert_allclose(sketched.skew(), exact.skew(), rtol=1e-6)
+
+
+def test_outlier_removal_matches_pandas_quartiles(frame):
+    X = frame.iloc[:, :-1]
+    Q1, Q3 = X.quantile(0.25), X.quantile(0.75)
+    IQR = Q3 - Q1
+    expected = frame[((X >= Q1 - 1.5 * IQR) & (X <= Q3 + 1.5 * IQR)).all(axis=1)]
+
+    pd.testing.assert_frame_equal(outlier_removal_iqr.apply(frame), expected)
+
+
+def test_binning_matches_kbins_discretizer(frame):
+    X = frame.iloc[:, :-1]
+    cols = [c for c in X if X[c].nunique() > binning.N_BINS]
+    expected = X.copy()
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="Bins whose width are too small")
+        expected[cols] = KBinsDiscretizer(n_bins=binning.N_BINS, encode="ordinal", strategy="quantile").fit_transform(X[cols])
+    expected["target"] = frame["target"]
+
+    pd.testing.assert_frame_equal(binning.apply(frame), expected)
+
+
+def test_log_transform_matches_pandas_skew(frame):
+    X = frame.iloc[:, :-1]
+    skewed = X.skew()
+    cols = [c for c in skewed[skewed.abs() > 1].index if (X[c] >= 0).all()]
+    expected = X.copy()
+    expected[cols] = np.log1p(expected[cols])
+    expected["target"] = frame["target"]
+
+    pd.testing.assert_frame_equal(log_transform.apply(frame), expected)
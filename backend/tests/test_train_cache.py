@@ -0,0 +1,48 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import make_blobs
+
+from models import kmeans
+from models.artifacts import load_artifact
+from models.feature_store import FeatureMatrix
+from models.train_cache import cache_key, cached_train
+
+
+@pytest.fixture
+def features(tmp_path, monkeypatch):
+    monkeypatch.setenv("PAPAD_TRAIN_CACHE", "1")
+    monkeypatch.setenv("PAPAD_TRAIN_CACHE_DIR", str(tmp_path / "training_cache"))
+    X, _ = make_blobs(200, n_features=3, centers=3, random_state=2)
+    return FeatureMatrix.from_frame(pd.DataFrame(X, columns=["a", "b", "c"]))
+
+
+def test_second_run_is_a_cache_hit(tmp_path, features):
+    def train(save_path):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return kmeans.train(None, None, None, None, None, None, "target", save_path, features=features)
+
+    first_path = str(tmp_path / "first" / "kmeans_model.pkl")
+    (tmp_path / "first").mkdir()
+    first = cached_train("kmeans", first_path, features, lambda: train(first_path))
+
+    def fail():
+        raise AssertionError("train() ran on a cache hit")
+
+    second_path = str(tmp_path / "second" / "kmeans_model.pkl")
+    (tmp_path / "second").mkdir()
+    second = cached_train("kmeans", second_path, features, fail)
+
+    assert second == first
+    np.testing.assert_array_equal(
+        load_artifact(second_path).predict(features.array), load_artifact(first_path).predict(features.array)
+    )
+
+
+def test_key_follows_the_distance_budget(features, monkeypatch):
+    key = cache_key(features, "hierarchical")
+    monkeypatch.setenv("PAPAD_DISTANCE_CACHE_MB", "16")
+    assert cache_key(features, "hierarchical") != key
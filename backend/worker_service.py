@@ -0,0 +1,424 @@
+"""
+Long-lived Python worker for the Node backend.
+
+Spawning `python -u <handler>.py` for every preprocessing, training and
+output call pays the pandas / scikit-learn / sklearn_extra (and h2o)
+import cost and re-reads the module registries every time. This service
+imports all of that once and runs the same handlers as jobs:
+
+    POST /run      {"script": "model_selectionAndTraining/model_handler.py", "args": [...]}
+    GET  /health
+
+/run streams NDJSON lines back while the job runs:
+
+    {"stream": "stdout" | "stderr", "data": "..."}   output, as it is printed
+    {"exit": <code>}                                 last line, like a process exit code
+
+On POSIX every job runs in a child forked from a warm copy of this process,
+so jobs start with everything imported, run in parallel and cannot leak
+state (cwd, sys.argv, globals) into each other. The children are forked by a
+zygote: a single-threaded process forked once, after the preload and before
+the server starts any threads, so no child is forked from the multithreaded
+server (with another thread possibly holding a lock mid-fork). Where fork is
+not available the jobs run in this process, one at a time.
+
+Started by the Node server (see pythonWorker.js); it only listens on
+127.0.0.1. Run by hand with:  python worker_service.py [--port 5055]
+"""
+import os
+import sys
+import json
+import codecs
+import argparse
+import importlib
+import importlib.util
+import queue
+import selectors
+import signal
+import socket
+import threading
+import traceback
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PORT = 5055
+
+# Scripts the Node routes can run here, relative to ROOT_DIR. Anything else
+# gets a 404 and the route falls back to spawning a process.
+JOBS = {
+    "preprocessing/Normal_preprocessing/normal_preprocessing_handler.py": "normal_preprocessing_handler",
+    "model_selectionAndTraining/model_handler.py": "model_handler",
+    "output_section/output_handler.py": "output_handler",
+}
+
+# Imported up front on top of the handlers, which import their heavy
+# dependencies lazily (inside main() / on the code path that needs them)
+WARM_IMPORTS = ["numpy", "pandas", "chardet", "sklearn.model_selection", "find_best_model"]
+
+_handlers = {}
+_job_lock = threading.Lock()
+
+
+def load_handler(script):
+    """Imports a handler script once (as a module, so its main() isn't run)."""
+    if script not in _handlers:
+        path = os.path.join(ROOT_DIR, script)
+        script_dir = os.path.dirname(path)
+        if script_dir not in sys.path:
+            sys.path.append(script_dir)
+        spec = importlib.util.spec_from_file_location(JOBS[script], path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[JOBS[script]] = module
+        spec.loader.exec_module(module)
+        _handlers[script] = module
+    return _handlers[script]
+
+
+def _load_registry(path):
+    try:
+        with open(os.path.join(ROOT_DIR, path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[WARNING] Could not read {path}: {e}")
+        return []
+
+
+def preload():
+    """Imports the handlers and every module their registries point to."""
+    for script in JOBS:
+        try:
+            load_handler(script)
+        except Exception as e:
+            print(f"[WARNING] Could not preload {script}: {e}")
+
+    modules = list(WARM_IMPORTS)
+    for m in _load_registry("preprocessing/Normal_preprocessing/normal_preprocessing_modules.json"):
+        name = m["name"].lower().replace(" ", "_").replace("-", "_")
+        modules.append(f"preprocessing.Normal_preprocessing.components.{name}")
+    for m in _load_registry("model_selectionAndTraining/model_names.json"):
+        if m.get("type") == "model" and m["name"] != "best_cluster_algo":
+            modules.append(f"models.{m['name']}")
+    for o in _load_registry("output_section/output_options.json"):
+        modules.append(f"scripts.{o['name']}")
+
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"[WARNING] Could not preload {name}: {e}")
+
+
+def _run_main(script, args):
+    """Runs a handler's main() like `python <script> <args>`; returns the exit code."""
+    try:
+        load_handler(script).main([script] + list(args))
+        return 0
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+def _event(**fields):
+    return json.dumps(fields) + "\n"
+
+
+def _read_line(sock):
+    """One JSON line from a job's status socket (None once it is closed)."""
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = sock.recv(1)
+        if not chunk:
+            return None
+        data += chunk
+    return json.loads(data)
+
+
+def _run_child(status, out_w, err_w):
+    """Body of a job child: output goes to the pipes, then exit without returning."""
+    code = 1
+    try:
+        request = _read_line(status)
+        status.close()
+        os.dup2(out_w, 1)
+        os.dup2(err_w, 2)
+        os.close(out_w)
+        os.close(err_w)
+        # Unbuffered, like `python -u`, so output streams while the job runs
+        sys.stdout.reconfigure(write_through=True)
+        sys.stderr.reconfigure(write_through=True)
+        os.chdir(ROOT_DIR)
+        sys.argv = [request["script"]] + list(request["args"])
+        code = _run_main(request["script"], request["args"])
+    finally:
+        os._exit(code)
+
+
+def _zygote_loop(control):
+    """
+    Forks a child per job request on `control` and reports its pid and exit
+    code on the job's status socket. Returns when the server closes `control`.
+    """
+    # Ctrl-C is the server's to handle; the zygote goes when the server does
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_w, False)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    signal.set_wakeup_fd(wake_w, warn_on_full_buffer=False)
+
+    sel = selectors.DefaultSelector()
+    sel.register(control, selectors.EVENT_READ)
+    sel.register(wake_r, selectors.EVENT_READ)
+    jobs = {}
+
+    while True:
+        for key, _ in sel.select():
+            if key.fileobj is control:
+                # One byte per request, carrying (stdout, stderr, status) fds
+                message, fds, _, _ = socket.recv_fds(control, 1, 3)
+                if not message:
+                    return
+                out_w, err_w, status_fd = fds
+                status = socket.socket(fileno=status_fd)
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    signal.set_wakeup_fd(-1)
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    signal.signal(signal.SIGINT, signal.default_int_handler)
+                    sel.close()
+                    control.close()
+                    os.close(wake_r)
+                    os.close(wake_w)
+                    for other in jobs.values():
+                        other.close()
+                    _run_child(status, out_w, err_w)
+                os.close(out_w)
+                os.close(err_w)
+                try:
+                    status.sendall(_event(pid=pid).encode("utf-8"))
+                except OSError:
+                    pass
+                jobs[pid] = status
+            else:
+                try:
+                    os.read(wake_r, 4096)
+                except BlockingIOError:
+                    pass
+                # Reap every finished child and pass its exit code on
+                while jobs:
+                    pid, status_code = os.waitpid(-1, os.WNOHANG)
+                    if pid == 0:
+                        break
+                    status = jobs.pop(pid, None)
+                    if status is None:
+                        continue
+                    try:
+                        status.sendall(_event(exit=os.waitstatus_to_exitcode(status_code)).encode("utf-8"))
+                    except OSError:
+                        pass
+                    status.close()
+
+
+class Zygote:
+    """
+    Single-threaded process the job children are forked from. Start it
+    before anything starts a thread (i.e. before the server runs).
+    """
+
+    def __init__(self):
+        self.control, theirs = socket.socketpair()
+        self.lock = threading.Lock()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.pid = os.fork()
+        if self.pid == 0:
+            code = 0
+            try:
+                self.control.close()
+                _zygote_loop(theirs)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        theirs.close()
+
+    def start(self, script, args, out_w, err_w):
+        """Has the zygote fork a child for the job; returns the job's status socket."""
+        ours, theirs = socket.socketpair()
+        try:
+            ours.sendall(_event(script=script, args=list(args)).encode("utf-8"))
+            with self.lock:
+                socket.send_fds(self.control, [b"j"], [out_w, err_w, theirs.fileno()])
+        except BaseException:
+            ours.close()
+            raise
+        finally:
+            theirs.close()
+        return ours
+
+    def run(self, script, args):
+        """Runs a job in a child of the zygote and yields its output events."""
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        try:
+            status = self.start(script, args, out_w, err_w)
+        except BaseException:
+            for fd in (out_r, err_r):
+                os.close(fd)
+            raise
+        finally:
+            os.close(out_w)
+            os.close(err_w)
+
+        decoders = {
+            out_r: ("stdout", codecs.getincrementaldecoder("utf-8")(errors="replace")),
+            err_r: ("stderr", codecs.getincrementaldecoder("utf-8")(errors="replace")),
+        }
+        sel = selectors.DefaultSelector()
+        for fd in decoders:
+            sel.register(fd, selectors.EVENT_READ)
+
+        pid = None
+        finished = False
+        try:
+            started = _read_line(status)
+            if started is None:
+                raise RuntimeError("the worker zygote is not running")
+            pid = started["pid"]
+
+            while sel.get_map():
+                for key, _ in sel.select():
+                    data = os.read(key.fd, 65536)
+                    stream, decoder = decoders[key.fd]
+                    if not data:
+                        sel.unregister(key.fd)
+                        os.close(key.fd)
+                        text = decoder.decode(b"", final=True)
+                    else:
+                        text = decoder.decode(data)
+                    if text:
+                        yield _event(stream=stream, data=text)
+
+            ended = _read_line(status)
+            finished = True
+            yield _event(exit=ended["exit"] if ended else 1)
+        finally:
+            sel.close()
+            for fd in list(decoders):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+            if not finished and pid is not None:
+                # The client went away; don't leave the job running (the zygote reaps it)
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            status.close()
+
+
+class _StreamWriter:
+    """File-like object that turns writes into events on a queue."""
+
+    def __init__(self, stream, events):
+        self.stream = stream
+        self.events = events
+        self.encoding = "utf-8"
+
+    def write(self, text):
+        if text:
+            self.events.put(_event(stream=self.stream, data=text))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def run_in_process(script, args):
+    """Runs a job in this process (one at a time) and yields its output events."""
+    events = queue.Queue()
+
+    def target():
+        with _job_lock:
+            saved = (sys.stdout, sys.stderr, sys.argv, os.getcwd())
+            sys.stdout = _StreamWriter("stdout", events)
+            sys.stderr = _StreamWriter("stderr", events)
+            sys.argv = [script] + list(args)
+            try:
+                os.chdir(ROOT_DIR)
+                code = _run_main(script, args)
+            finally:
+                sys.stdout, sys.stderr, sys.argv = saved[:3]
+                os.chdir(saved[3])
+        events.put(_event(exit=code))
+        events.put(None)
+
+    threading.Thread(target=target, daemon=True).start()
+    while True:
+        event = events.get()
+        if event is None:
+            return
+        yield event
+
+
+def create_app(zygote=None):
+    from fastapi import FastAPI, HTTPException
+    from fastapi.responses import StreamingResponse
+    from pydantic import BaseModel
+
+    class Job(BaseModel):
+        script: str
+        args: list[str] = []
+
+    app = FastAPI()
+    run_job = zygote.run if zygote is not None else run_in_process
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "pid": os.getpid(), "jobs": sorted(JOBS)}
+
+    @app.post("/run")
+    def run(job: Job):
+        script = job.script.replace("\\", "/")
+        if script not in JOBS:
+            raise HTTPException(status_code=404, detail=f"{job.script} is not served by the worker")
+        return StreamingResponse(run_job(script, job.args), media_type="application/x-ndjson")
+
+    return app
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Warm Python worker for the Node backend")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PYTHON_WORKER_PORT", DEFAULT_PORT)))
+    options = parser.parse_args(argv[1:])
+
+    import uvicorn
+
+    sys.stdout.reconfigure(encoding="utf-8")
+    os.chdir(ROOT_DIR)
+    if ROOT_DIR not in sys.path:
+        sys.path.append(ROOT_DIR)
+    preload()
+    zygote = Zygote() if hasattr(os, "fork") else None
+
+    print(f"[Worker] Ready on 127.0.0.1:{options.port} (pid {os.getpid()})", flush=True)
+    uvicorn.run(create_app(zygote), host="127.0.0.1", port=options.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main(sys.argv)